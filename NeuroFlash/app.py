@@ -1,12 +1,34 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify
-from flask_mysqldb import MySQL
+from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, Response, stream_with_context, make_response
+from storage import create_storage
 from werkzeug.security import generate_password_hash, check_password_hash
 import traceback
+import hashlib
+import base64
 import config # Make sure config.py exists and is configured
 from functools import wraps
 import json
 from datetime import datetime, timedelta, date
 import os # Added for show_env, ensure it's used or remove show_env
+import atexit
+import threading
+import time
+import bisect
+import secrets
+from collections import Counter
+from due_queue import DueQueueIndex
+from review_log_buffer import ReviewLogBuffer
+from cache import TTLCache
+from rank_index import LeaderboardRankIndex
+from metrics import RequestMetrics
+from sql_audit import SqlAudit
+import scheduler
+import search_index
+
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:  # orjson is optional; its JSONDecodeError subclasses json's
+    json_loads = json.loads
 
 app = Flask(__name__)
 
@@ -16,10 +38,315 @@ app.config['MYSQL_PASSWORD'] = config.DB_PASSWORD
 app.config['MYSQL_DB'] = config.DB_NAME
 app.config['MYSQL_PORT'] = config.DB_PORT
 app.config['MYSQL_CURSORCLASS'] = 'DictCursor'
+app.config['MYSQL_POOL_MIN_SIZE'] = config.DB_POOL_MIN_SIZE
+app.config['MYSQL_POOL_MAX_SIZE'] = config.DB_POOL_MAX_SIZE
+app.config['MYSQL_POOL_MAX_LIFETIME'] = config.DB_POOL_MAX_LIFETIME_SECONDS
+app.config['MYSQL_POOL_HEALTH_CHECK_AFTER'] = config.DB_POOL_HEALTH_CHECK_AFTER_SECONDS
+app.config['MYSQL_POOL_CHECKOUT_TIMEOUT'] = config.DB_POOL_CHECKOUT_TIMEOUT_SECONDS
 
 app.secret_key = config.SECRET_KEY
 
-mysql = MySQL(app)
+# MySQL by default, or embedded SQLite with DB_BACKEND=sqlite; see storage.py.
+mysql = create_storage(app)
+
+def db_pool_gauges():
+    pool_stats = mysql.pool.stats()
+    return {
+        'neuroflash_db_pool_connections': ('Open pooled database connections.', pool_stats['size']),
+        'neuroflash_db_pool_in_use': ('Pooled connections checked out.', pool_stats['in_use']),
+        'neuroflash_db_pool_wait_seconds_total': ('Time requests spent waiting for a connection.', pool_stats['wait_seconds_total']),
+    }
+
+request_metrics = RequestMetrics(app, mysql, extra_gauges=db_pool_gauges) if config.METRICS_ENABLED else None
+
+sql_audit = None
+if config.SQL_AUDIT_ENABLED:
+    sql_audit = SqlAudit(app, mysql, log_path=config.SQL_AUDIT_LOG, slow_ms=config.SQL_AUDIT_SLOW_MS,
+                         repeat_threshold=config.SQL_AUDIT_REPEAT_THRESHOLD)
+
+due_queue = DueQueueIndex(max_age_seconds=config.DUE_QUEUE_MAX_AGE_SECONDS,
+                          max_decks=config.DUE_QUEUE_MAX_DECKS)
+
+DEFAULT_SETTINGS = {
+    'new_cards_per_day': 20,
+    'max_reviews_per_day': 100,
+    'learning_steps': '1,10',
+    'ease_bonus': scheduler.DEFAULT_EASE_BONUS
+}
+
+rank_index = LeaderboardRankIndex()
+
+settings_cache = TTLCache(maxsize=config.SETTINGS_CACHE_MAX_USERS, ttl=config.SETTINGS_CACHE_TTL_SECONDS)
+
+# note_id -> (raw field_values JSON, parsed dict). See parse_field_values_utility.
+note_content_cache = TTLCache(maxsize=config.NOTE_CONTENT_CACHE_MAX_NOTES)
+
+# (user_id, deck_id, session_id) -> shuffled flashcard ids. See api_get_study_cards.
+study_sessions = TTLCache(maxsize=config.STUDY_SESSION_MAX_SESSIONS, ttl=config.STUDY_SESSION_TTL_SECONDS)
+
+USER_SETTINGS_SQL = """
+    SELECT new_cards_per_day, max_reviews_per_day, learning_steps, ease_bonus
+    FROM settings
+    WHERE user_id = %s
+"""
+
+def cache_user_settings(user_id, row):
+    user_settings = dict(DEFAULT_SETTINGS)
+    if row:
+        user_settings.update({key: value for key, value in row.items() if value is not None})
+    settings_cache.set(user_id, user_settings)
+    return dict(user_settings)
+
+def get_user_settings(cur, user_id):
+    # Settings only change through api_update_profile, which invalidates this
+    # cache; the TTL bounds staleness when another worker made the change.
+    user_settings = settings_cache.get(user_id)
+    if user_settings is None:
+        cur.execute(USER_SETTINGS_SQL, (user_id,))
+        return cache_user_settings(user_id, cur.fetchone())
+    return dict(user_settings)
+
+MASTERED_EASE_FACTOR = 2.8
+# ease_factor is a single-precision FLOAT on MySQL (2.8 is stored as 2.7999999523)
+# and a double on SQLite. Comparing against a hair under 2.8 gives the same
+# answer for both, in SQL and in Python.
+MASTERED_EASE_THRESHOLD = MASTERED_EASE_FACTOR - 1e-6
+CARD_TYPES = ('new', 'learning', 'review')
+USER_COUNTER_COLUMNS = ('total_decks', 'total_cards', 'cards_mastered', 'new_cards', 'learning_cards', 'review_cards')
+
+# Per-user card counters over flashcards f JOIN notes n, exactly as the
+# dashboard used to compute them on every load.
+CARD_COUNTER_AGGREGATES = f"""
+    COUNT(f.id) AS total_cards,
+    COALESCE(SUM(f.card_type = 'review' AND f.ease_factor >= {MASTERED_EASE_THRESHOLD}), 0) AS cards_mastered,
+    COALESCE(SUM(f.card_type = 'new'), 0) AS new_cards,
+    COALESCE(SUM(f.card_type = 'learning'), 0) AS learning_cards,
+    COALESCE(SUM(f.card_type = 'review'), 0) AS review_cards
+"""
+
+def is_mastered_card(card_type, ease_factor):
+    return card_type == 'review' and ease_factor is not None and ease_factor >= MASTERED_EASE_THRESHOLD
+
+def count_card(counters, card_type, ease_factor, sign=1):
+    counters['total_cards'] += sign
+    if card_type in CARD_TYPES:
+        counters[card_type + '_cards'] += sign
+    if is_mastered_card(card_type, ease_factor):
+        counters['cards_mastered'] += sign
+    return counters
+
+def stored_card_counters(cur, user_id, where_sql, params):
+    # Counters for the user's flashcards matching `where_sql`, read before they are deleted.
+    cur.execute(f"""
+        SELECT {CARD_COUNTER_AGGREGATES}
+        FROM flashcards f
+        JOIN notes n ON f.note_id = n.id
+        WHERE n.user_id = %s AND {where_sql}
+    """, (user_id, *params))
+    row = cur.fetchone() or {}
+    return Counter({column: int(row.get(column) or 0) for column in USER_COUNTER_COLUMNS if column in row})
+
+def bump_user_counters(cur, user_id, counters, sign=1):
+    # Apply counter deltas in the caller's transaction; reconcile_user_counters() repairs drift.
+    deltas = {column: sign * counters[column] for column in USER_COUNTER_COLUMNS if counters.get(column)}
+    if not deltas:
+        return
+    columns = ', '.join(deltas)
+    updates = ', '.join(f"{column} = {column} + VALUES({column})" for column in deltas)
+    cur.execute(
+        f"INSERT INTO user_stats (user_id, {columns}) VALUES (%s{', %s' * len(deltas)}) "
+        f"ON DUPLICATE KEY UPDATE {updates}",
+        (user_id, *deltas.values())
+    )
+
+def bump_data_versions(cur, user_id, deck_ids=()):
+    # Invalidates the ETags of the user's list endpoints (deck_id 0) and of the
+    # given decks' card lists. Call inside the writing transaction.
+    scopes = [0] + sorted({deck_id for deck_id in deck_ids if deck_id})
+    cur.execute(
+        f"INSERT INTO data_versions (user_id, deck_id, version) VALUES {', '.join(['(%s, %s, 1)'] * len(scopes))} "
+        "ON DUPLICATE KEY UPDATE version = version + 1",
+        tuple(value for deck_id in scopes for value in (user_id, deck_id))
+    )
+
+def reconcile_user_counters(cur, first_user_id, last_user_id):
+    """Recompute the materialized counters for users in [first_user_id, last_user_id]."""
+    cur.execute(f"""
+        INSERT INTO user_stats (user_id, total_decks, total_cards, cards_mastered, new_cards, learning_cards, review_cards)
+        SELECT u.id,
+               COALESCE(d.total_decks, 0),
+               COALESCE(c.total_cards, 0),
+               COALESCE(c.cards_mastered, 0),
+               COALESCE(c.new_cards, 0),
+               COALESCE(c.learning_cards, 0),
+               COALESCE(c.review_cards, 0)
+        FROM users u
+        LEFT JOIN (
+            SELECT user_id, COUNT(*) AS total_decks
+            FROM decks
+            WHERE user_id BETWEEN %s AND %s
+            GROUP BY user_id
+        ) d ON d.user_id = u.id
+        LEFT JOIN (
+            SELECT n.user_id, {CARD_COUNTER_AGGREGATES}
+            FROM flashcards f
+            JOIN notes n ON f.note_id = n.id
+            WHERE n.user_id BETWEEN %s AND %s
+            GROUP BY n.user_id
+        ) c ON c.user_id = u.id
+        WHERE u.id BETWEEN %s AND %s
+        ON DUPLICATE KEY UPDATE
+            total_decks = VALUES(total_decks), total_cards = VALUES(total_cards),
+            cards_mastered = VALUES(cards_mastered), new_cards = VALUES(new_cards),
+            learning_cards = VALUES(learning_cards), review_cards = VALUES(review_cards)
+    """, (first_user_id, last_user_id) * 3)
+    return cur.rowcount
+
+def deck_card_delta(deltas, deck_id, card_type, ease_factor, due_date, sign=1):
+    # deltas: {deck_id: {'counts': Counter, 'due': Counter keyed by due_date}}.
+    # Only learning/review cards are bucketed by due date; new cards have new_count.
+    delta = deltas.setdefault(deck_id, {'counts': Counter(), 'due': Counter()})
+    delta['counts']['card_count'] += sign
+    if card_type == 'new':
+        delta['counts']['new_count'] += sign
+    elif due_date is not None:
+        delta['due'][due_date] += sign
+    if is_mastered_card(card_type, ease_factor):
+        delta['counts']['mastered_count'] += sign
+    return deltas
+
+def apply_deck_deltas(cur, deltas, last_studied=None):
+    aggregate_rows = []
+    due_rows = []
+    for deck_id, delta in deltas.items():
+        counts = delta['counts']
+        if any(counts.values()) or last_studied is not None:
+            aggregate_rows.append((deck_id, counts['card_count'], counts['mastered_count'], counts['new_count'], last_studied))
+        due_rows.extend((deck_id, due_date, cards) for due_date, cards in delta['due'].items() if cards)
+    bulk_insert(cur, "INSERT INTO deck_aggregates (deck_id, card_count, mastered_count, new_count, last_studied)",
+                aggregate_rows, suffix="""
+                ON DUPLICATE KEY UPDATE
+                    card_count = card_count + VALUES(card_count),
+                    mastered_count = mastered_count + VALUES(mastered_count),
+                    new_count = new_count + VALUES(new_count),
+                    last_studied = COALESCE(GREATEST(last_studied, VALUES(last_studied)), VALUES(last_studied), last_studied)
+                """)
+    bulk_insert(cur, "INSERT INTO deck_due_counts (deck_id, due_date, cards)", due_rows,
+                suffix=" ON DUPLICATE KEY UPDATE cards = cards + VALUES(cards)")
+
+def bump_deck_new_cards(cur, deck_id, count):
+    apply_deck_deltas(cur, {deck_id: {'counts': Counter(card_count=count, new_count=count), 'due': Counter()}})
+
+def reconcile_deck_aggregates(cur, first_user_id, last_user_id):
+    """Rebuild deck_aggregates and deck_due_counts for decks owned by users in the id range."""
+    cur.execute("""
+        INSERT INTO deck_aggregates (deck_id, card_count, mastered_count, new_count, last_studied)
+        SELECT d.id,
+               COUNT(f.id),
+               COALESCE(SUM(f.card_type = 'review' AND f.ease_factor >= %s), 0),
+               COALESCE(SUM(f.card_type = 'new'), 0),
+               MAX(f.last_reviewed)
+        FROM decks d
+        LEFT JOIN flashcards f ON f.deck_id = d.id
+        WHERE d.user_id BETWEEN %s AND %s
+        GROUP BY d.id
+        ON DUPLICATE KEY UPDATE
+            card_count = VALUES(card_count), mastered_count = VALUES(mastered_count),
+            new_count = VALUES(new_count), last_studied = VALUES(last_studied)
+    """, (MASTERED_EASE_THRESHOLD, first_user_id, last_user_id))
+    cur.execute("""
+        DELETE ddc FROM deck_due_counts ddc
+        JOIN decks d ON d.id = ddc.deck_id
+        WHERE d.user_id BETWEEN %s AND %s
+    """, (first_user_id, last_user_id))
+    cur.execute("""
+        INSERT INTO deck_due_counts (deck_id, due_date, cards)
+        SELECT f.deck_id, f.due_date, COUNT(*)
+        FROM flashcards f
+        JOIN decks d ON d.id = f.deck_id
+        WHERE d.user_id BETWEEN %s AND %s AND f.card_type <> 'new' AND f.due_date IS NOT NULL
+        GROUP BY f.deck_id, f.due_date
+    """, (first_user_id, last_user_id))
+
+def reconcile_all_counters(cur, chunk_size=1000):
+    # One short transaction per id range so the job never holds locks for long.
+    cur.execute("SELECT COALESCE(MAX(id), 0) AS max_id FROM users")
+    max_user_id = cur.fetchone()['max_id']
+    for first_user_id in range(1, max_user_id + 1, chunk_size):
+        last_user_id = first_user_id + chunk_size - 1
+        reconcile_user_counters(cur, first_user_id, last_user_id)
+        reconcile_deck_aggregates(cur, first_user_id, last_user_id)
+        # Corrected counters must not be hidden behind a cached ETag.
+        cur.execute("UPDATE data_versions SET version = version + 1 WHERE user_id BETWEEN %s AND %s AND deck_id = 0",
+                    (first_user_id, last_user_id))
+        mysql.connection.commit()
+    return max_user_id
+
+def user_counters_reconciler():
+    while True:
+        time.sleep(config.USER_COUNTERS_RECONCILE_SECONDS)
+        try:
+            with app.app_context():
+                cur = mysql.connection.cursor()
+                try:
+                    reconcile_all_counters(cur)
+                finally:
+                    cur.close()
+        except Exception:
+            traceback.print_exc()
+
+if config.USER_COUNTERS_RECONCILE_SECONDS > 0:
+    threading.Thread(target=user_counters_reconciler, name='user-counters-reconciler', daemon=True).start()
+
+def insert_review_logs(cur, rows, ignore=False):
+    placeholders = ', '.join(['(%s, %s, %s, %s, %s, %s, %s, %s)'] * len(rows))
+    cur.execute(
+        f"""
+        INSERT {'IGNORE ' if ignore else ''}INTO review_logs (flashcard_id, user_id, rating, review_time, intervals_before, intervals_after, ease_factor_before, ease_factor_after)
+        VALUES {placeholders}
+        """,
+        tuple(value for row in rows for value in row)
+    )
+
+def flush_review_log_rows(rows):
+    # Runs on the flusher thread, outside any request.
+    with app.app_context():
+        cur = mysql.connection.cursor()
+        try:
+            # IGNORE: a card deleted while its log row was buffered must not fail the whole batch.
+            insert_review_logs(cur, rows, ignore=True)
+            mysql.connection.commit()
+        except Exception:
+            mysql.connection.rollback()
+            raise
+        finally:
+            cur.close()
+
+review_log_buffer = None
+if config.REVIEW_LOG_WRITE_BEHIND:
+    review_log_buffer = ReviewLogBuffer(flush_review_log_rows,
+                                        max_rows=config.REVIEW_LOG_BUFFER_MAX_ROWS,
+                                        batch_size=config.REVIEW_LOG_BATCH_SIZE,
+                                        flush_interval=config.REVIEW_LOG_FLUSH_INTERVAL_SECONDS)
+    review_log_buffer.start()
+    atexit.register(review_log_buffer.stop)
+
+def stage_review_logs(cur, rows):
+    # Part of the review transaction unless write-behind is enabled.
+    if review_log_buffer is None:
+        insert_review_logs(cur, rows)
+
+def release_review_logs(cur, rows):
+    # Called after the review transaction commits.
+    if review_log_buffer is not None and not review_log_buffer.offer(rows):
+        # Buffer is full: write synchronously rather than drop the logs. The review
+        # itself is already committed, so a failure here must not fail the request.
+        try:
+            insert_review_logs(cur, rows)
+            mysql.connection.commit()
+        except Exception:
+            mysql.connection.rollback()
+            traceback.print_exc()
 
 def login_required(f):
     @wraps(f)
@@ -35,6 +362,56 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def admin_required(f):
+    # Maintenance jobs and internals, for operators rather than users: guarded
+    # by the ADMIN_TOKEN shared secret, and refused when none is configured.
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not config.ADMIN_TOKEN or not secrets.compare_digest(
+                request.headers.get('Authorization', ''), f'Bearer {config.ADMIN_TOKEN}'):
+            return jsonify(success=False, errors={'auth': 'Admin token required.'}), 403
+        return f(*args, **kwargs)
+    return decorated_function
+
+def conditional_get(deck_arg=None):
+    """Serve an ETag from data_versions and answer If-None-Match with 304.
+
+    The ETag covers the user's version (and the deck's, when the route has
+    `deck_arg`). Versions are read before the view runs, so a write racing
+    the view can only make the ETag older than the payload, never newer.
+    It also covers today's date: due counts change at midnight without a write.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            user_id = session['user_id']
+            deck_id = kwargs.get(deck_arg, 0) if deck_arg else 0
+            cur = mysql.connection.cursor()
+            try:
+                cur.execute(
+                    "SELECT deck_id, version FROM data_versions WHERE user_id = %s AND deck_id IN (0, %s)",
+                    (user_id, deck_id)
+                )
+                versions = {row['deck_id']: row['version'] for row in cur.fetchall()}
+            finally:
+                cur.close()
+            etag = hashlib.sha1(
+                f"{request.full_path}|{user_id}|{date.today().isoformat()}|"
+                f"{versions.get(0, 0)}|{deck_id}:{versions.get(deck_id, 0)}".encode()
+            ).hexdigest()[:20]
+
+            if request.if_none_match.contains_weak(etag):
+                response = app.response_class(status=304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag, weak=True)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return decorated_function
+    return decorator
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -44,18 +421,37 @@ def index():
 def leaderboard_page():
     return render_template('leaderboard.html')
 
-@app.route('/api/admin/populate-leaderboard', methods=['POST'])
-@login_required # Ensure only authorized users can do this if it's sensitive
-def admin_populate_leaderboard_snapshot():
-    cur = None
+LEADERBOARD_SNAPSHOT_LOCK = 'neuroflash_leaderboard_snapshot_refresh'
+
+# Same definition as leaderboard_snapshots in "database sql schema.txt".
+# CREATE TABLE ... LIKE would copy the indexes but not the foreign key, and
+# the swap would then drop it from the live table for good.
+LEADERBOARD_SNAPSHOTS_NEXT_DDL = """
+    CREATE TABLE leaderboard_snapshots_next (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        captured_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        user_id INT NOT NULL,
+        username VARCHAR(50) NOT NULL,
+        points INT NOT NULL,
+        `rank` INT NOT NULL,
+        FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+        INDEX idx_leaderboard_snapshots_rank (`rank`, user_id)
+    )
+"""
+
+def refresh_leaderboard_snapshot(cur):
+    # Builds the next snapshot in a shadow table and swaps it in with one atomic
+    # RENAME, so readers never see an empty or half-built leaderboard. GET_LOCK
+    # keeps concurrent refreshes (several workers, manual POSTs) from colliding.
+    cur.execute("SELECT GET_LOCK(%s, 0) AS acquired", (LEADERBOARD_SNAPSHOT_LOCK,))
+    lock = cur.fetchone()
+    if not lock or not lock['acquired']:
+        return None
     try:
-        cur = mysql.connection.cursor()
-
-        # Clear out the old snapshot before creating a new one
-        cur.execute("TRUNCATE TABLE leaderboard_snapshots;")
-
-        sql_populate_mysql8 = """
-            INSERT INTO leaderboard_snapshots (user_id, username, points, `rank`, captured_at)
+        cur.execute("DROP TABLE IF EXISTS leaderboard_snapshots_next")
+        cur.execute(LEADERBOARD_SNAPSHOTS_NEXT_DDL)
+        cur.execute("""
+            INSERT INTO leaderboard_snapshots_next (user_id, username, points, `rank`, captured_at)
             SELECT
                 u.id AS user_id,
                 u.username,
@@ -66,13 +462,47 @@ def admin_populate_leaderboard_snapshot():
             JOIN user_stats us ON u.id = us.user_id
             WHERE us.points > 0  -- Only include users who have earned points
             ORDER BY us.points DESC
-            LIMIT 1000;          -- Limit the size of the snapshot
-        """
+            LIMIT %s
+        """, (config.LEADERBOARD_SNAPSHOT_SIZE,))
+        rows_inserted = cur.rowcount
+        mysql.connection.commit()
 
-        cur.execute(sql_populate_mysql8)
+        cur.execute("DROP TABLE IF EXISTS leaderboard_snapshots_old")
+        cur.execute("""
+            RENAME TABLE leaderboard_snapshots TO leaderboard_snapshots_old,
+                         leaderboard_snapshots_next TO leaderboard_snapshots
+        """)
+        cur.execute("DROP TABLE leaderboard_snapshots_old")
+        return rows_inserted
+    finally:
+        cur.execute("SELECT RELEASE_LOCK(%s)", (LEADERBOARD_SNAPSHOT_LOCK,))
+        cur.fetchall()
 
-        rows_inserted = cur.rowcount # Get how many rows were inserted
-        mysql.connection.commit()
+def leaderboard_snapshot_refresher():
+    while True:
+        time.sleep(config.LEADERBOARD_SNAPSHOT_REFRESH_SECONDS)
+        try:
+            with app.app_context():
+                cur = mysql.connection.cursor()
+                try:
+                    refresh_leaderboard_snapshot(cur)
+                finally:
+                    cur.close()
+        except Exception:
+            traceback.print_exc()
+
+if config.LEADERBOARD_SNAPSHOT_REFRESH_SECONDS > 0:
+    threading.Thread(target=leaderboard_snapshot_refresher, name='leaderboard-snapshot-refresher', daemon=True).start()
+
+@app.route('/api/admin/populate-leaderboard', methods=['POST'])
+@login_required # Ensure only authorized users can do this if it's sensitive
+def admin_populate_leaderboard_snapshot():
+    cur = None
+    try:
+        cur = mysql.connection.cursor()
+        rows_inserted = refresh_leaderboard_snapshot(cur)
+        if rows_inserted is None:
+            return jsonify(success=False, errors={'general': 'A leaderboard snapshot refresh is already running.'}), 409
 
         return jsonify(success=True, message=f"Leaderboard snapshot updated successfully. {rows_inserted} entries processed."), 200
 
@@ -86,106 +516,261 @@ def admin_populate_leaderboard_snapshot():
             cur.close()      
 
 
-@app.route('/api/leaderboard', methods=['GET'])
-@login_required
-def api_get_leaderboard():
-    user_id = session.get('user_id')
-    page = request.args.get('page', 1, type=int)
-    limit = max(1, request.args.get('limit', 50, type=int))
-    offset = (page - 1) * limit
+@app.route('/api/admin/review-log-buffer', methods=['GET'])
+@admin_required
+def admin_review_log_buffer_stats():
+    if review_log_buffer is None:
+        return jsonify(success=True, enabled=False)
+    return jsonify(success=True, enabled=True, stats=review_log_buffer.stats())
+
+
+@app.route('/api/admin/db-pool', methods=['GET'])
+@admin_required
+def admin_db_pool_stats():
+    return jsonify(success=True, stats=mysql.pool.stats())
 
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    # Scraped by Prometheus, so no session login; guard it with METRICS_TOKEN
+    # when the port is reachable from outside.
+    if request_metrics is None:
+        return jsonify(success=False, errors={'general': 'Metrics are disabled.'}), 404
+    if config.METRICS_TOKEN and not secrets.compare_digest(
+            request.headers.get('Authorization', ''), f'Bearer {config.METRICS_TOKEN}'):
+        return jsonify(success=False, errors={'auth': 'Invalid metrics token.'}), 401
+    return Response(request_metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/api/admin/stats/reconcile', methods=['POST'])
+@admin_required
+def admin_reconcile_user_counters():
     cur = None
     try:
         cur = mysql.connection.cursor()
+        max_user_id = reconcile_all_counters(cur)
+        return jsonify(success=True, message=f"Dashboard counters reconciled for user ids up to {max_user_id}.")
 
-        # Query to count total users with points for pagination
-        cur.execute("""
-            SELECT COUNT(u.id) as total_entries
-            FROM users u
-            JOIN user_stats us ON u.id = us.user_id
-            WHERE us.points > 0
-        """)
-        total_entries_data = cur.fetchone()
-        total_entries = total_entries_data['total_entries'] if total_entries_data else 0
+    except Exception as e:
+        mysql.connection.rollback()
+        traceback.print_exc()
+        return jsonify(success=False, errors={'general': f'An error occurred while reconciling dashboard counters: {str(e)}'}), 500
+    finally:
+        if cur:
+            cur.close()
 
-        total_pages = 0
-        if total_entries > 0:
-            total_pages = (total_entries + limit - 1) // limit
-        
-        if page > total_pages and total_pages > 0: # Adjust page if out of bounds
-            page = total_pages
-            offset = (page - 1) * limit
-        elif total_entries == 0:
-            page = 1
-            offset = 0
 
+@app.route('/api/admin/stats/backfill-review-rollups', methods=['POST'])
+@admin_required
+def admin_backfill_review_rollups():
+    # Days before today only: today's rollup is already maintained by the review path.
+    cur = None
+    try:
+        cur = mysql.connection.cursor()
+        cur.execute("SELECT COALESCE(MAX(id), 0) AS max_id FROM users")
+        max_user_id = cur.fetchone()['max_id']
+        before_date = date.today()
+        for first_user_id in range(1, max_user_id + 1, 1000):
+            backfill_review_rollups(cur, first_user_id, first_user_id + 999, before_date)
+            mysql.connection.commit()
+        return jsonify(success=True, message=f"Daily review rollups backfilled up to {before_date.isoformat()} for user ids up to {max_user_id}.")
 
-       
-        leaderboard_query_mysql8 = """
-            SELECT
-                u.id as user_id,
-                u.username,
-                us.points,
-                RANK() OVER (ORDER BY us.points DESC) AS `rank`
-            FROM users u
-            JOIN user_stats us ON u.id = us.user_id
-            WHERE us.points > 0
-            ORDER BY us.points DESC, u.username ASC
-            LIMIT %s OFFSET %s
-        """
-        leaderboard_query_older_mysql = """
-            SELECT
-                u.id as user_id,
-                u.username,
-                us.points
-                -- Rank will be assigned in Python based on order
-            FROM users u
-            JOIN user_stats us ON u.id = us.user_id
-            WHERE us.points > 0
-            ORDER BY us.points DESC, u.username ASC
-            LIMIT %s OFFSET %s
-        """
-        
-        cur.execute(leaderboard_query_mysql8, (limit, offset))
-        leaderboard_data = cur.fetchall()
+    except Exception as e:
+        mysql.connection.rollback()
+        traceback.print_exc()
+        return jsonify(success=False, errors={'general': f'An error occurred while backfilling review rollups: {str(e)}'}), 500
+    finally:
+        if cur:
+            cur.close()
 
 
+@app.route('/api/admin/search-index/rebuild', methods=['POST'])
+@admin_required
+def admin_rebuild_search_index():
+    # Backfills one user's note_terms for notes written before the index existed
+    # (or after a tokenizer change).
+    user_id = request.args.get('user_id', type=int)
+    if not user_id or user_id <= 0:
+        return jsonify(success=False, errors={'user_id': 'A user_id query parameter is required.'}), 400
+    cur = None
+    try:
+        cur = mysql.connection.cursor()
+        cur.execute("DELETE FROM note_terms WHERE user_id = %s", (user_id,))
+        notes_indexed = 0
+        postings_written = 0
+        last_note_id = 0
+        while True:
+            cur.execute(
+                "SELECT id, field_values FROM notes WHERE user_id = %s AND id > %s ORDER BY id LIMIT %s",
+                (user_id, last_note_id, BULK_INSERT_CHUNK_SIZE)
+            )
+            notes = cur.fetchall()
+            if not notes:
+                break
+            postings_written += index_note_terms(
+                cur, user_id, [(note['id'], parse_field_values_utility(note['field_values'], note['id'])) for note in notes])
+            notes_indexed += len(notes)
+            last_note_id = notes[-1]['id']
+        mysql.connection.commit()
+        return jsonify(success=True, notes_indexed=notes_indexed, postings_written=postings_written)
+
+    except Exception as e:
+        mysql.connection.rollback()
+        traceback.print_exc()
+        return jsonify(success=False, errors={'general': f'An error occurred while rebuilding the search index: {str(e)}'}), 500
+    finally:
+        if cur:
+            cur.close()
+
+
+LEADERBOARD_ROWS_SQL = """
+    SELECT u.id AS user_id, u.username, us.points
+    FROM users u
+    JOIN user_stats us ON u.id = us.user_id
+    WHERE us.points > 0
+"""
+
+def load_leaderboard_rows():
+    cur = mysql.connection.cursor()
+    try:
+        cur.execute(LEADERBOARD_ROWS_SQL)
+        return cur.fetchall()
+    finally:
+        cur.close()
+
+def rank_index_reseeder():
+    # Seed as the worker starts so the first leaderboard request doesn't pay for
+    # the load. add_points keeps the index current on this worker; the periodic
+    # reseed picks up points earned through other workers.
+    try:
+        with app.app_context():
+            rank_index.ensure_loaded(load_leaderboard_rows)
+    except Exception:
+        traceback.print_exc()
+    while config.RANK_INDEX_RESEED_SECONDS > 0:
+        time.sleep(config.RANK_INDEX_RESEED_SECONDS)
+        try:
+            with app.app_context():
+                rank_index.reseed(load_leaderboard_rows)
+        except Exception:
+            traceback.print_exc()
+
+threading.Thread(target=rank_index_reseeder, name='rank-index-reseeder', daemon=True).start()
+
+
+def parse_leaderboard_cursor(cursor):
+    # Cursor is "<rank>:<user_id>" of the last row already served; empty means first page.
+    if not cursor:
+        return 0, 0
+    rank_part, _, user_part = cursor.partition(':')
+    return int(rank_part), int(user_part)
+
+LEADERBOARD_SNAPSHOT_PAGE_SQL = """
+    SELECT user_id, username, points, `rank`, captured_at
+    FROM leaderboard_snapshots
+    WHERE `rank` > %s OR (`rank` = %s AND user_id > %s)
+    ORDER BY `rank` ASC, user_id ASC
+    LIMIT %s
+"""
+
+LEADERBOARD_SNAPSHOT_USER_SQL = """
+    SELECT user_id, username, points, `rank`
+    FROM leaderboard_snapshots
+    WHERE user_id = %s
+"""
+
+def leaderboard_snapshot_payload(rows, cursor, limit, current_user_rank_info):
+    # rows: up to limit + 1 rows of LEADERBOARD_SNAPSHOT_PAGE_SQL; the extra one only signals another page.
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = f"{rows[-1]['rank']}:{rows[-1]['user_id']}" if has_more else None
+    captured_at = rows[0]['captured_at'] if rows else None
+    return {
+        'success': True,
+        'leaderboard': [
+            {'user_id': row['user_id'], 'username': row['username'], 'points': row['points'], 'rank': row['rank']}
+            for row in rows
+        ],
+        'current_user_rank': current_user_rank_info,
+        'pagination': {
+            'limit': limit,
+            'cursor': cursor or None,
+            'next_cursor': next_cursor,
+            'captured_at': captured_at.isoformat() if captured_at else None
+        },
+    }
+
+def leaderboard_from_snapshot(user_id, cursor, limit):
+    try:
+        after_rank, after_user_id = parse_leaderboard_cursor(cursor)
+    except ValueError:
+        return jsonify(success=False, errors={'cursor': 'Invalid cursor.'}), 400
+
+    cur = None
+    try:
+        cur = mysql.connection.cursor()
+        cur.execute(LEADERBOARD_SNAPSHOT_PAGE_SQL, (after_rank, after_rank, after_user_id, limit + 1))
+        rows = cur.fetchall()
+
         current_user_rank_info = None
         if user_id:
-            current_user_rank_query_mysql8 = """
-                SELECT user_id, username, points, `rank`
-                FROM (
-                    SELECT
-                        u.id AS user_id,
-                        u.username,
-                        us.points,
-                        RANK() OVER (ORDER BY us.points DESC) AS `rank`
-                    FROM users u
-                    JOIN user_stats us ON u.id = us.user_id
-                    WHERE us.points > 0
-                ) AS ranked_users
-                WHERE user_id = %s
-            """
-            cur.execute(current_user_rank_query_mysql8, (user_id,))
+            cur.execute(LEADERBOARD_SNAPSHOT_USER_SQL, (user_id,))
             current_user_rank_info = cur.fetchone()
 
-        return jsonify(
-            success=True,
-            leaderboard=leaderboard_data,
-            current_user_rank=current_user_rank_info,
-            pagination={
-                'page': page,
-                'limit': limit,
-                'total_entries': total_entries,
-                'total_pages': total_pages
-            }
-        )
+        return jsonify(leaderboard_snapshot_payload(rows, cursor, limit, current_user_rank_info))
     except Exception as e:
         traceback.print_exc()
         return jsonify(success=False, errors={'general': f'An error occurred fetching leaderboard: {str(e)}'}), 500
     finally:
         if cur:
             cur.close()
+
+
+def leaderboard_index_payload(user_id, page, limit):
+    # Reads the live rank index; the caller makes sure it is loaded.
+    total_entries = rank_index.total()
+
+    total_pages = 0
+    if total_entries > 0:
+        total_pages = (total_entries + limit - 1) // limit
+
+    if page > total_pages and total_pages > 0: # Adjust page if out of bounds
+        page = total_pages
+    elif total_entries == 0:
+        page = 1
+    offset = (page - 1) * limit
+
+    return {
+        'success': True,
+        'leaderboard': rank_index.page(offset, limit),
+        'current_user_rank': rank_index.rank_of(user_id) if user_id else None,
+        'pagination': {
+            'page': page,
+            'limit': limit,
+            'total_entries': total_entries,
+            'total_pages': total_pages
+        },
+    }
+
+@app.route('/api/leaderboard', methods=['GET'])
+@login_required
+def api_get_leaderboard():
+    user_id = session.get('user_id')
+    page = max(1, request.args.get('page', 1, type=int))
+    limit = max(1, request.args.get('limit', 50, type=int))
+
+    # ?cursor=... (empty for the first page) reads the periodic snapshot with
+    # keyset pagination; ?page=N keeps reading the live rank index.
+    if 'cursor' in request.args:
+        return leaderboard_from_snapshot(user_id, request.args.get('cursor', '').strip(), min(limit, 500))
+
+    try:
+        rank_index.ensure_loaded(load_leaderboard_rows)
+        return jsonify(leaderboard_index_payload(user_id, page, limit))
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify(success=False, errors={'general': f'An error occurred fetching leaderboard: {str(e)}'}), 500
+
 @app.route('/reviews')
 @login_required
 def reviews():
@@ -201,16 +786,10 @@ def auth():
 def dashboard():
     return render_template('dashboard.html')
 
-@app.route('/api/tags', methods=['GET'])
-@login_required
-def api_get_tags():
-    user_id = session.get('user_id')
-    if not user_id:
-        return jsonify(success=False, errors={'general': 'Authentication required'}), 401
-
-    cur = None
-    try:
-        cur = mysql.connection.cursor()
+def load_user_tags(cur, user_id, deck_tag_rows=None):
+    # Tags on the user's notes or decks, by name. Pass the deck tag rows from
+    # load_deck_list() to skip the deck half of the query.
+    if deck_tag_rows is None:
         cur.execute("""
             SELECT DISTINCT t.id, t.name 
             FROM tags t
@@ -225,25 +804,58 @@ def api_get_tags():
             WHERE d.user_id = %s
             ORDER BY name ASC
         """, (user_id, user_id))
-        tags = cur.fetchall()
-        return jsonify(success=True, tags=tags if tags else [])
+        return list(cur.fetchall())
+
+    cur.execute("""
+        SELECT DISTINCT t.id, t.name 
+        FROM tags t
+        INNER JOIN note_tags nt ON t.id = nt.tag_id
+        INNER JOIN notes n ON nt.note_id = n.id
+        WHERE n.user_id = %s
+    """, (user_id,))
+    tags_by_id = {row['id']: row['name'] for row in cur.fetchall()}
+    tags_by_id.update((row['id'], row['name']) for row in deck_tag_rows)
+    return [{'id': tag_id, 'name': name} for tag_id, name in sorted(tags_by_id.items(), key=lambda item: item[1])]
+
+@app.route('/api/tags', methods=['GET'])
+@login_required
+@conditional_get()
+def api_get_tags():
+    user_id = session.get('user_id')
+    if not user_id:
+        return jsonify(success=False, errors={'general': 'Authentication required'}), 401
+
+    cur = None
+    try:
+        cur = mysql.connection.cursor()
+        return jsonify(success=True, tags=load_user_tags(cur, user_id))
     except Exception as e:
         return jsonify(success=False, errors={'general': f'An error occurred while fetching tags: {str(e)}'}), 500
     finally:
         if cur:
             cur.close()
 
-def parse_field_values_utility(field_values_json):
+def parse_field_values_utility(field_values_json, note_id=None):
+    # With a note_id the parsed result is cached and shared between callers, so
+    # treat it as read-only. A hit is only served when the raw JSON is identical,
+    # which also covers edits made by other workers.
+    if note_id is not None and isinstance(field_values_json, str):
+        cached = note_content_cache.get(note_id)
+        if cached is not None and cached[0] == field_values_json:
+            return cached[1]
+        field_values = parse_field_values_utility(field_values_json)
+        note_content_cache.set(note_id, (field_values_json, field_values))
+        return field_values
     if field_values_json is None:
         return {'Front': 'Error: No data provided', 'Back': ''}
     try:
         if isinstance(field_values_json, str):
             try:
-                return json.loads(field_values_json)
+                return json_loads(field_values_json)
             except json.JSONDecodeError:
                 if field_values_json.startswith('"') and field_values_json.endswith('"'):
                     try:
-                        return json.loads(json.loads(field_values_json)) 
+                        return json_loads(json_loads(field_values_json)) 
                     except json.JSONDecodeError:
                         pass
                 return {'Front': 'Error: Malformed content data', 'Back': ''}
@@ -254,6 +866,144 @@ def parse_field_values_utility(field_values_json):
         return {'Front': 'Error loading content due to an unexpected issue', 'Back': ''}
 
 
+CARD_SEARCH_DEFAULT_LIMIT = 200
+CARD_SEARCH_MAX_LIMIT = 1000
+
+def card_search_key(card_row, ranked):
+    # Keyset of a result row: (score,) created_at, note_id, flashcard_id.
+    key = (card_row['created_at'], card_row['note_id'], card_row['flashcard_id'])
+    return (int(card_row['score']),) + key if ranked else key
+
+def encode_card_search_cursor(after):
+    key = [value.isoformat() if isinstance(value, datetime) else value for value in after]
+    return base64.urlsafe_b64encode(json.dumps(key, separators=(',', ':')).encode()).decode().rstrip('=')
+
+def decode_card_search_cursor(cursor, ranked):
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        if ranked:
+            score, created_at, note_id, flashcard_id = key
+            return int(score), datetime.fromisoformat(created_at), int(note_id), int(flashcard_id)
+        created_at, note_id, flashcard_id = key
+        return datetime.fromisoformat(created_at), int(note_id), int(flashcard_id)
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor.')
+
+def load_note_tag_names(cur, note_ids):
+    # One query for the whole page instead of a correlated GROUP_CONCAT per row.
+    note_ids = list(dict.fromkeys(note_ids))
+    tags_by_note = {}
+    for note_id_chunk in chunked(note_ids, NOTE_ID_CHUNK_SIZE):
+        placeholders = ','.join(['%s'] * len(note_id_chunk))
+        cur.execute(f"""
+            SELECT nt.note_id, t.name
+            FROM note_tags nt
+            JOIN tags t ON t.id = nt.tag_id
+            WHERE nt.note_id IN ({placeholders})
+            ORDER BY t.name
+        """, tuple(note_id_chunk))
+        for row in cur.fetchall():
+            tags_by_note.setdefault(row['note_id'], []).append(row['name'])
+    return {note_id: ', '.join(names) for note_id, names in tags_by_note.items()}
+
+def search_cards_page(cur, user_id, search_query_term, tag_ids, deck_ids, after, limit):
+    """Return (cards, next_after) for one page of the card browser, best match and newest first.
+
+    `after` is the keyset of the last row already served (None for the first
+    page); next_after is None once there are no more rows.
+    """
+    sql_query = """
+        SELECT 
+            n.id as note_id, 
+            f.id as flashcard_id,
+            n.field_values, 
+            n.created_at,
+            d.name as deck_name,
+            d.id as deck_id,
+            f.card_type,
+            f.due_date{score_column}
+        FROM notes n
+        JOIN flashcards f ON n.id = f.note_id   
+        JOIN decks d ON f.deck_id = d.id
+    """
+    params = []
+    conditions = ["n.user_id = %s"]
+    order_by = "n.created_at DESC, n.id DESC, f.id DESC"
+
+    search_terms = search_index.query_terms(search_query_term)
+    ranked = bool(search_terms)
+    if ranked:
+        # Served by the note_terms inverted index instead of scanning the JSON text.
+        match_sql, match_params = search_index.search_match_subquery(user_id, search_terms)
+        sql_query += f" JOIN ({match_sql}) AS m ON m.note_id = n.id"
+        params.extend(match_params)
+        order_by = "m.score DESC, " + order_by
+    sql_query = sql_query.format(score_column=",\n            m.score" if ranked else "")
+    params.append(user_id)
+
+    if search_query_term and not ranked:
+        # Nothing indexable (e.g. only punctuation): fall back to a substring scan.
+        conditions.append("(n.field_values LIKE %s)")
+        params.append(f"%{search_query_term}%")
+
+    if tag_ids:
+        placeholders = ','.join(['%s'] * len(tag_ids))
+        conditions.append(f"n.id IN (SELECT nt_sub.note_id FROM note_tags nt_sub WHERE nt_sub.tag_id IN ({placeholders}))")
+        params.extend(tag_ids)
+
+    if deck_ids:
+        deck_placeholders = ','.join(['%s'] * len(deck_ids))
+        conditions.append(f"d.id IN ({deck_placeholders})")
+        params.extend(deck_ids)
+
+    if after:
+        if ranked:
+            after_score, after_created_at, after_note_id, after_flashcard_id = after
+        else:
+            after_created_at, after_note_id, after_flashcard_id = after
+        keyset = ("(n.created_at < %s OR (n.created_at = %s AND "
+                  "(n.id < %s OR (n.id = %s AND f.id < %s))))")
+        keyset_params = [after_created_at, after_created_at, after_note_id, after_note_id, after_flashcard_id]
+        if ranked:
+            keyset = f"(m.score < %s OR (m.score = %s AND {keyset}))"
+            keyset_params = [after_score, after_score] + keyset_params
+        conditions.append(keyset)
+        params.extend(keyset_params)
+
+    sql_query += f"""
+        WHERE {' AND '.join(conditions)}
+        ORDER BY {order_by}
+        LIMIT %s
+    """
+    params.append(limit + 1)
+
+    cur.execute(sql_query, tuple(params))
+    cards_raw = cur.fetchall()
+    has_more = len(cards_raw) > limit
+    cards_raw = cards_raw[:limit]
+    next_after = card_search_key(cards_raw[-1], ranked) if has_more else None
+
+    tags_by_note = load_note_tag_names(cur, [card_raw['note_id'] for card_raw in cards_raw])
+
+    results = []
+    for card_data in cards_raw:
+        field_values = parse_field_values_utility(card_data.get('field_values'), card_data.get('note_id'))
+        due_date = card_data.get('due_date')
+
+        results.append({
+            'note_id': card_data.get('note_id'),
+            'flashcard_id': card_data.get('flashcard_id'),
+            'front': field_values.get('Front', 'N/A'),
+            'back': field_values.get('Back', 'N/A'),
+            'deck_name': card_data.get('deck_name'),
+            'deck_id': card_data.get('deck_id'),
+            'card_type': card_data.get('card_type'),
+            'due_date': due_date.strftime('%Y-%m-%d') if due_date else 'N/A',
+            'tags': tags_by_note.get(card_data['note_id'], '')
+        })
+    return results, next_after
+
+
 @app.route('/api/cards/search', methods=['GET'])
 @login_required
 def api_search_cards():
@@ -264,95 +1014,60 @@ def api_search_cards():
     search_query_term = request.args.get('query', '').strip()
     tag_ids_str = request.args.get('tags', '') 
     deck_id_str = request.args.get('deck_id', '').strip() 
+    cursor = request.args.get('cursor', '').strip()
+    limit = min(max(1, request.args.get('limit', CARD_SEARCH_DEFAULT_LIMIT, type=int)), CARD_SEARCH_MAX_LIMIT)
+    # format=ndjson streams every match from the cursor onwards, one card per line.
+    stream = request.args.get('format') == 'ndjson'
+    ranked = bool(search_index.query_terms(search_query_term))
+
+    tag_ids = []
+    if tag_ids_str:
+        try:
+            tag_ids = [int(tid) for tid in tag_ids_str.split(',') if tid.strip()]
+        except ValueError:
+            return jsonify(success=False, errors={'tags': 'Invalid tag ID format. Ensure IDs are numbers.'}), 400
 
-    cur = None
-    try:
-        cur = mysql.connection.cursor()
-        sql_query_base = """
-            SELECT 
-                n.id as note_id, 
-                f.id as flashcard_id,
-                n.field_values, 
-                d.name as deck_name,
-                d.id as deck_id,
-                f.card_type,
-                f.due_date,
-                (SELECT GROUP_CONCAT(DISTINCT t_sub.name SEPARATOR ', ') 
-                 FROM tags t_sub
-                 JOIN note_tags nt_sub ON t_sub.id = nt_sub.tag_id
-                 WHERE nt_sub.note_id = n.id) as note_tags 
-            FROM notes n
-            JOIN flashcards f ON n.id = f.note_id   
-            JOIN decks d ON f.deck_id = d.id
-            WHERE n.user_id = %s 
-        """
-        params = [user_id]
-        conditions = [] 
-
-        if search_query_term:
-            conditions.append("(n.field_values LIKE %s)")
-            params.append(f"%{search_query_term}%")
+    deck_ids = []
+    if deck_id_str:
+        try:
+            deck_ids = [int(did) for did in deck_id_str.split(',') if did.strip()]
+        except ValueError:
+            return jsonify(success=False, errors={'deck_id': 'Invalid deck ID format. Ensure IDs are numbers.'}), 400
 
-        tag_ids = []
-        if tag_ids_str:
-            try:
-                tag_ids = [int(tid) for tid in tag_ids_str.split(',') if tid.strip()]
-            except ValueError:
-                return jsonify(success=False, errors={'tags': 'Invalid tag ID format. Ensure IDs are numbers.'}), 400
-            
-            if tag_ids:
-                placeholders = ','.join(['%s'] * len(tag_ids))
-                conditions.append(f"n.id IN (SELECT nt_sub.note_id FROM note_tags nt_sub WHERE nt_sub.tag_id IN ({placeholders}))")
-                params.extend(tag_ids)
+    after = None
+    if cursor:
+        try:
+            after = decode_card_search_cursor(cursor, ranked)
+        except ValueError:
+            return jsonify(success=False, errors={'cursor': 'Invalid cursor.'}), 400
 
-        deck_ids = []
-        if deck_id_str:
+    if stream:
+        def generate():
+            cur = mysql.connection.cursor()
             try:
-                deck_ids = [int(did) for did in deck_id_str.split(',') if did.strip()]
-            except ValueError:
-                return jsonify(success=False, errors={'deck_id': 'Invalid deck ID format. Ensure IDs are numbers.'}), 400
-
-            if deck_ids:
-                deck_placeholders = ','.join(['%s'] * len(deck_ids))
-                conditions.append(f"d.id IN ({deck_placeholders})")
-                params.extend(deck_ids)
+                page_after = after
+                while True:
+                    cards, page_after = search_cards_page(
+                        cur, user_id, search_query_term, tag_ids, deck_ids, page_after, CARD_SEARCH_MAX_LIMIT)
+                    for card in cards:
+                        yield json.dumps(card) + '\n'
+                    if page_after is None:
+                        break
+            finally:
+                cur.close()
+
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
 
-        if conditions:
-            sql_query = sql_query_base + " AND " + " AND ".join(conditions)
-        else:
-            sql_query = sql_query_base
-
-        sql_query += """
-            GROUP BY n.id, f.id, d.name, d.id, f.card_type, f.due_date 
-            ORDER BY n.created_at DESC
-            LIMIT 200 
-        """ 
-
-        cur.execute(sql_query, tuple(params))
-        cards_raw = cur.fetchall()
-
-        results = []
-        for card_raw in cards_raw:
-            if not card_raw:
-                continue
-                
-            card_data = dict(card_raw)
-            field_values = parse_field_values_utility(card_data.get('field_values'))
-            due_date = card_data.get('due_date')
-            
-            results.append({
-                'note_id': card_data.get('note_id'),
-                'flashcard_id': card_data.get('flashcard_id'),
-                'front': field_values.get('Front', 'N/A'),
-                'back': field_values.get('Back', 'N/A'),
-                'deck_name': card_data.get('deck_name'),
-                'deck_id': card_data.get('deck_id'),
-                'card_type': card_data.get('card_type'),
-                'due_date': due_date.strftime('%Y-%m-%d') if due_date else 'N/A',
-                'tags': card_data.get('note_tags', '')
-            })
-        
-        return jsonify(success=True, cards=results)
+    cur = None
+    try:
+        cur = mysql.connection.cursor()
+        results, next_after = search_cards_page(
+            cur, user_id, search_query_term, tag_ids, deck_ids, after, limit)
+        return jsonify(success=True, cards=results, pagination={
+            'limit': limit,
+            'cursor': cursor or None,
+            'next_cursor': encode_card_search_cursor(next_after) if next_after else None
+        })
 
     except Exception as e:
         return jsonify(success=False, errors={'general': f'An error occurred while searching cards: {str(e)}'}), 500
@@ -380,10 +1095,17 @@ def api_delete_deck(deck_id):
         if not deck:
             return jsonify(success=False, errors={'deck': 'Deck not found or you do not have permission to delete it.'}), 404
 
+        counters = stored_card_counters(cur, user_id, "f.deck_id = %s", (deck_id,))
+        counters['total_decks'] = 1
         cur.execute("DELETE FROM decks WHERE id = %s", (deck_id,))
+        deleted = cur.rowcount
+        if deleted > 0:
+            bump_user_counters(cur, user_id, counters, sign=-1)
+            bump_data_versions(cur, user_id, [deck_id])
         mysql.connection.commit()
+        due_queue.invalidate_deck(deck_id)
 
-        if cur.rowcount > 0:
+        if deleted > 0:
             return jsonify(success=True, message='Deck deleted successfully', deleted_deck_id=deck_id)
         else:
             return jsonify(success=False, message='Deck could not be deleted or was already deleted.'), 400
@@ -397,6 +1119,28 @@ def api_delete_deck(deck_id):
             cur.close()
 
 
+def load_dashboard_stats(cur, user_id):
+    # Counters are maintained by the write paths (see bump_user_counters), so
+    # this is a single primary-key read.
+    cur.execute("""
+        SELECT points, review_streak_days, total_decks, total_cards, cards_mastered,
+               new_cards, learning_cards, review_cards
+        FROM user_stats
+        WHERE user_id = %s
+    """, (user_id,))
+    user_stats_data = cur.fetchone() or {}
+
+    return {
+        'total_decks': user_stats_data.get('total_decks') or 0,
+        'cards_mastered': user_stats_data.get('cards_mastered') or 0,
+        'points': user_stats_data.get('points') or 0,
+        'review_streak_days': user_stats_data.get('review_streak_days') or 0,
+        'total_cards': user_stats_data.get('total_cards') or 0,
+        'new_cards': user_stats_data.get('new_cards') or 0,
+        'learning_cards': user_stats_data.get('learning_cards') or 0,
+        'review_cards': user_stats_data.get('review_cards') or 0
+    }
+
 @app.route('/api/stats/dashboard', methods=['GET'])
 @login_required
 def api_get_dashboard_stats():
@@ -407,37 +1151,7 @@ def api_get_dashboard_stats():
     cur = None
     try:
         cur = mysql.connection.cursor()
-        
-        cur.execute("SELECT COUNT(*) as total_decks FROM decks WHERE user_id = %s", (user_id,))
-        total_decks_data = cur.fetchone()
-        total_decks = total_decks_data['total_decks'] if total_decks_data else 0
-
-        cur.execute("""
-            SELECT COUNT(DISTINCT f.id) as cards_mastered
-            FROM flashcards f
-            JOIN notes n ON f.note_id = n.id
-            WHERE n.user_id = %s AND f.card_type = 'review' AND f.ease_factor >= 2.8
-        """, (user_id,))
-        cards_mastered_data = cur.fetchone()
-        cards_mastered = cards_mastered_data['cards_mastered'] if cards_mastered_data else 0
-
-        cur.execute("SELECT points, review_streak_days FROM user_stats WHERE user_id = %s", (user_id,))
-        user_stats_data = cur.fetchone()
-        
-        current_points = 0
-        review_streak_days = 0
-        if user_stats_data:
-            current_points = user_stats_data.get('points', 0) 
-            review_streak_days = user_stats_data.get('review_streak_days', 0)
-        
-        dashboard_stats = {
-            'total_decks': total_decks,
-            'cards_mastered': cards_mastered,
-            'points': current_points,
-            'review_streak_days': review_streak_days 
-        }
-
-        return jsonify(success=True, stats=dashboard_stats)
+        return jsonify(success=True, stats=load_dashboard_stats(cur, user_id))
 
     except Exception as e:
         traceback.print_exc()
@@ -446,6 +1160,8 @@ def api_get_dashboard_stats():
         if cur:
             cur.close()
 
+PERFORMANCE_RANGES = {'30': 30, '90': 90, '365': 365, 'all': None}
+
 @app.route('/api/stats/performance', methods=['GET'])
 @login_required
 def api_get_performance_stats():
@@ -453,39 +1169,73 @@ def api_get_performance_stats():
     if not user_id:
         return jsonify(success=False, errors={'general': 'Authentication required'}), 401
 
+    range_arg = request.args.get('range', '30')
+    if range_arg not in PERFORMANCE_RANGES:
+        return jsonify(success=False, errors={'range': 'Invalid range. Expected 30, 90, 365 or all.'}), 400
+    mode = request.args.get('mode', 'chart')
+    if mode not in ('chart', 'heatmap'):
+        return jsonify(success=False, errors={'mode': 'Invalid mode. Expected chart or heatmap.'}), 400
+
     cur = None
     try:
         cur = mysql.connection.cursor()
         today = date.today()
-        thirty_days_ago = today - timedelta(days=30)
+        range_days = PERFORMANCE_RANGES[range_arg]
+
+        if range_days is None:
+            # A plain column read (not MIN()) keeps the DATE type on every backend.
+            cur.execute("""
+                SELECT review_date FROM review_daily_rollups
+                WHERE user_id = %s ORDER BY review_date LIMIT 1
+            """, (user_id,))
+            first_row = cur.fetchone()
+            start_day = min(first_row['review_date'], today) if first_row else today
+        else:
+            start_day = today - timedelta(days=range_days)
 
+        # One row per active day from the rollup (a primary-key range read)
+        # instead of grouping raw review_logs.
         cur.execute("""
-            SELECT 
-                DATE(review_time) as review_date,
-                COUNT(*) as total_reviews,
-                AVG(rating) as average_rating
-            FROM review_logs
-            WHERE user_id = %s AND review_time >= %s
-            GROUP BY DATE(review_time)
+            SELECT review_date, review_count, rating_sum, time_spent_ms
+            FROM review_daily_rollups
+            WHERE user_id = %s AND review_date >= %s
             ORDER BY review_date ASC
-        """, (user_id, thirty_days_ago))
-        daily_stats_raw = cur.fetchall()
+        """, (user_id, start_day))
+        daily_stats_dict = {day['review_date']: day for day in cur.fetchall()}
+
+        total_reviews = sum(day['review_count'] for day in daily_stats_dict.values())
+        total_rating_sum = sum(day['rating_sum'] for day in daily_stats_dict.values())
+        totals = {
+            'reviews': total_reviews,
+            'average_rating': round(total_rating_sum / total_reviews, 2) if total_reviews else None,
+            'time_spent_seconds': sum(day['time_spent_ms'] for day in daily_stats_dict.values()) // 1000
+        }
+        period = {'range': range_arg, 'start': start_day.strftime('%Y-%m-%d'), 'end': today.strftime('%Y-%m-%d')}
+
+        if mode == 'heatmap':
+            # Sparse: only days with reviews, for a calendar heatmap.
+            heatmap = [
+                {
+                    'date': review_date.strftime('%Y-%m-%d'),
+                    'count': day['review_count'],
+                    'time_spent_seconds': day['time_spent_ms'] // 1000
+                }
+                for review_date, day in daily_stats_dict.items() if day['review_count']
+            ]
+            return jsonify(success=True, heatmap=heatmap, totals=totals, period=period)
 
         dates = []
         review_counts = []
         average_ratings = []
-        daily_stats_dict = {str(day['review_date']): day for day in daily_stats_raw if day and 'review_date' in day}
-
-        for i in range(31):
-            day = thirty_days_ago + timedelta(days=i)
-            day_str = day.strftime('%Y-%m-%d')
-            dates.append(day_str)
-
-            stats_for_day = daily_stats_dict.get(day_str)
-            if stats_for_day:
-                review_counts.append(stats_for_day.get('total_reviews', 0))
-                avg_rating = stats_for_day.get('average_rating')
-                average_ratings.append(round(float(avg_rating), 2) if avg_rating is not None else None)
+
+        for i in range((today - start_day).days + 1):
+            day = start_day + timedelta(days=i)
+            dates.append(day.strftime('%Y-%m-%d'))
+
+            stats_for_day = daily_stats_dict.get(day)
+            if stats_for_day and stats_for_day['review_count']:
+                review_counts.append(stats_for_day['review_count'])
+                average_ratings.append(round(stats_for_day['rating_sum'] / stats_for_day['review_count'], 2))
             else:
                 review_counts.append(0)
                 average_ratings.append(None)
@@ -513,7 +1263,7 @@ def api_get_performance_stats():
                 }
             ]
         }
-        return jsonify(success=True, performance_data=performance_data)
+        return jsonify(success=True, performance_data=performance_data, totals=totals, period=period)
 
     except Exception as e:
         return jsonify(success=False, errors={'general': f'An error occurred fetching performance stats: {str(e)}'}), 500
@@ -616,6 +1366,8 @@ def edit_deck_page(deck_id):
         if cur:
             cur.close()
 
+NOTE_ID_CHUNK_SIZE = 1000
+
 @app.route('/api/decks/create-custom', methods=['POST'])
 @login_required
 def api_create_custom_deck():
@@ -645,27 +1397,30 @@ def api_create_custom_deck():
         )
         new_deck_id = cur.lastrowid
 
+        # Ownership filter and insert in one statement per chunk instead of a
+        # SELECT plus an INSERT per selected note.
         flashcards_created_count = 0
-        for note_id in note_ids:
-            cur.execute("SELECT id FROM notes WHERE id = %s AND user_id = %s", (note_id, user_id))
-            note = cur.fetchone()
-            if not note:
-                continue
-
+        for note_id_chunk in chunked(list(dict.fromkeys(note_ids)), NOTE_ID_CHUNK_SIZE):
+            placeholders = ','.join(['%s'] * len(note_id_chunk))
             cur.execute(
-                """
+                f"""
                 INSERT INTO flashcards (note_id, deck_id, card_type, due_date, ease_factor, reps, intervals, last_reviewed)
-                VALUES (%s, %s, 'new', CURDATE(), 2.5, 0, 0, NULL) 
+                SELECT n.id, %s, 'new', CURDATE(), 2.5, 0, 0, NULL
+                FROM notes n
+                WHERE n.user_id = %s AND n.id IN ({placeholders})
                 """,
-                (note_id, new_deck_id)
+                (new_deck_id, user_id, *note_id_chunk)
             )
-            if cur.rowcount > 0:
-                flashcards_created_count += 1
+            flashcards_created_count += cur.rowcount
         
         if flashcards_created_count == 0:
             mysql.connection.rollback()
             return jsonify(success=False, errors={'note_ids': 'No valid cards could be added to the new deck.'}), 400
 
+        bump_user_counters(cur, user_id, Counter(total_decks=1, total_cards=flashcards_created_count,
+                                                 new_cards=flashcards_created_count))
+        bump_deck_new_cards(cur, new_deck_id, flashcards_created_count)
+        bump_data_versions(cur, user_id)
         mysql.connection.commit()
 
         cur.execute("""
@@ -684,7 +1439,8 @@ def api_create_custom_deck():
             new_deck_data = dict(new_deck_data)
             new_deck_data['mastered_percentage'] = 0 
 
-        return jsonify(success=True, message=f'Deck "{deck_name}" created with {flashcards_created_count} cards.', deck=new_deck_data), 201
+        return jsonify(success=True, message=f'Deck "{deck_name}" created with {flashcards_created_count} cards.',
+                       created_count=flashcards_created_count, deck=new_deck_data), 201
 
     except Exception as e:
         mysql.connection.rollback()
@@ -694,6 +1450,7 @@ def api_create_custom_deck():
 
 @app.route('/api/decks/<int:deck_id>/cards', methods=['GET'])
 @login_required
+@conditional_get(deck_arg='deck_id')
 def api_get_deck_cards(deck_id):
     user_id = session['user_id']
     cur = mysql.connection.cursor()
@@ -737,7 +1494,7 @@ def api_get_deck_cards(deck_id):
                 continue
                 
             card_data = dict(card_raw)
-            field_values = parse_field_values_utility(card_data.get('field_values'))
+            field_values = parse_field_values_utility(card_data.get('field_values'), card_data.get('note_id'))
             
             cards_list.append({
                 'note_id': card_data['note_id'],
@@ -778,13 +1535,18 @@ def api_update_note(note_id):
         if not note:
             return jsonify(success=False, errors={'note': 'Note not found or access denied'}), 404
 
-        field_values_json = json.dumps({'Front': front_text, 'Back': back_text})
+        field_values = {'Front': front_text, 'Back': back_text}
+        field_values_json = json.dumps(field_values)
 
         cur.execute(
             "UPDATE notes SET field_values = %s WHERE id = %s",
             (field_values_json, note_id)
         )
+        reindex_note_terms(cur, user_id, note_id, field_values)
+        cur.execute("SELECT DISTINCT deck_id FROM flashcards WHERE note_id = %s", (note_id,))
+        bump_data_versions(cur, user_id, [row['deck_id'] for row in cur.fetchall()])
         mysql.connection.commit()
+        note_content_cache.pop(note_id)
         
         updated_card_data = {
             'note_id': note_id,
@@ -810,10 +1572,22 @@ def api_delete_note(note_id):
         if not note:
             return jsonify(success=False, errors={'note': 'Note not found or access denied'}), 404
 
+        counters = stored_card_counters(cur, user_id, "f.note_id = %s", (note_id,))
+        cur.execute("SELECT deck_id, card_type, ease_factor, due_date FROM flashcards WHERE note_id = %s", (note_id,))
+        deck_deltas = {}
+        for card in cur.fetchall():
+            deck_card_delta(deck_deltas, card['deck_id'], card['card_type'], card['ease_factor'], card['due_date'], sign=-1)
         cur.execute("DELETE FROM notes WHERE id = %s", (note_id,))
+        deleted = cur.rowcount
+        if deleted > 0:
+            bump_user_counters(cur, user_id, counters, sign=-1)
+            apply_deck_deltas(cur, deck_deltas)
+            bump_data_versions(cur, user_id, deck_deltas)
         mysql.connection.commit()
+        due_queue.remove_note(note_id)
+        note_content_cache.pop(note_id)
 
-        if cur.rowcount > 0:
+        if deleted > 0:
             return jsonify(success=True, message='Note and associated flashcards deleted successfully')
         else:
             return jsonify(success=False, message='Note could not be deleted or was already deleted'), 400
@@ -856,13 +1630,15 @@ def api_add_card_to_deck(deck_id):
                 '{"Default Card": {"front_template": "{{Front}}", "back_template": "{{Back}}"}}')
             )
 
-        field_values_json = json.dumps({'Front': front_text, 'Back': back_text})
+        field_values = {'Front': front_text, 'Back': back_text}
+        field_values_json = json.dumps(field_values)
 
         cur.execute(
             "INSERT INTO notes (user_id, note_type_id, field_values) VALUES (%s, %s, %s)",
             (user_id, default_note_type_id, field_values_json)
         )
         note_id = cur.lastrowid
+        index_note_terms(cur, user_id, [(note_id, field_values)])
 
         cur.execute(
             "INSERT INTO flashcards (note_id, deck_id, card_type, due_date, ease_factor, reps, intervals) "
@@ -870,10 +1646,16 @@ def api_add_card_to_deck(deck_id):
             (note_id, deck_id)
         )
         flashcard_id = cur.lastrowid
+        bump_user_counters(cur, user_id, count_card(Counter(), 'new', 2.5))
+        bump_deck_new_cards(cur, deck_id, 1)
+        bump_data_versions(cur, user_id, [deck_id])
         mysql.connection.commit()
 
-        cur.execute("SELECT due_date FROM flashcards WHERE id = %s", (flashcard_id,))
+        cur.execute("SELECT due_date, created_at FROM flashcards WHERE id = %s", (flashcard_id,))
         flashcard_info = cur.fetchone()
+        if flashcard_info:
+            due_queue.upsert_card(deck_id, flashcard_id, 'new', flashcard_info.get('due_date'), 2.5,
+                                  note_id=note_id, created_at=flashcard_info.get('created_at'))
         due_date_str = (flashcard_info['due_date'].strftime('%Y-%m-%d') 
                         if flashcard_info and flashcard_info.get('due_date') 
                         else datetime.today().strftime('%Y-%m-%d'))
@@ -903,6 +1685,7 @@ def profile():
 
 @app.route('/api/profile', methods=['GET'])
 @login_required
+@conditional_get()
 def api_get_profile():
     user_id = session['user_id']
     cur = None
@@ -918,20 +1701,7 @@ def api_get_profile():
         if not user_data:
              return jsonify(success=False, errors={'general': 'User not found'}), 404
 
-        cur.execute("""
-            SELECT new_cards_per_day, max_reviews_per_day, learning_steps, ease_bonus
-            FROM settings
-            WHERE user_id = %s
-        """, (user_id,))
-        settings_data = cur.fetchone()
-
-        if not settings_data:
-             settings_data = {
-                 'new_cards_per_day': 20,
-                 'max_reviews_per_day': 100,
-                 'learning_steps': '1,10',
-                 'ease_bonus': 1.3
-             }
+        settings_data = get_user_settings(cur, user_id)
 
         cur.execute("SELECT points FROM user_stats WHERE user_id = %s", (user_id,))
         user_stats = cur.fetchone()
@@ -1014,15 +1784,15 @@ def api_update_profile():
         """, (user_id,))
         existing_settings = cur.fetchone()
 
+        current_settings = dict(DEFAULT_SETTINGS)
+        if existing_settings:
+            current_settings.update({key: value for key, value in existing_settings.items() if value is not None})
+
         settings_to_save = {
-            'new_cards_per_day': new_cards_per_day if new_cards_per_day is not None else 
-                                (existing_settings['new_cards_per_day'] if existing_settings else 20),
-            'max_reviews_per_day': max_reviews_per_day if max_reviews_per_day is not None else 
-                                   (existing_settings['max_reviews_per_day'] if existing_settings else 100),
-            'learning_steps': learning_steps if learning_steps is not None else 
-                             (existing_settings['learning_steps'] if existing_settings else '1,10'),
-            'ease_bonus': ease_bonus if ease_bonus is not None else 
-                         (existing_settings['ease_bonus'] if existing_settings else 1.3)
+            'new_cards_per_day': new_cards_per_day if new_cards_per_day is not None else current_settings['new_cards_per_day'],
+            'max_reviews_per_day': max_reviews_per_day if max_reviews_per_day is not None else current_settings['max_reviews_per_day'],
+            'learning_steps': learning_steps if learning_steps is not None else current_settings['learning_steps'],
+            'ease_bonus': ease_bonus if ease_bonus is not None else current_settings['ease_bonus']
         }
         
         try:
@@ -1053,8 +1823,12 @@ def api_update_profile():
             (user_id, settings_to_save['new_cards_per_day'], settings_to_save['max_reviews_per_day'], 
              settings_to_save['learning_steps'], settings_to_save['ease_bonus'])
         )
+        bump_data_versions(cur, user_id)
 
         mysql.connection.commit()
+        settings_cache.pop(user_id)
+        if username is not None:
+            rank_index.rename(user_id, username)
 
         cur.execute("""
             SELECT id, username, email, date_of_birth, gender, country, city, created_at
@@ -1063,12 +1837,7 @@ def api_update_profile():
         """, (user_id,))
         updated_user_data = cur.fetchone()
 
-        cur.execute("""
-            SELECT new_cards_per_day, max_reviews_per_day, learning_steps, ease_bonus
-            FROM settings
-            WHERE user_id = %s
-        """, (user_id,))
-        updated_settings_data = cur.fetchone()
+        updated_settings_data = get_user_settings(cur, user_id)
 
         updated_profile_data = dict(updated_user_data)
         updated_profile_data['settings'] = updated_settings_data
@@ -1209,6 +1978,65 @@ def show_env():
         "DB_NAME": os.getenv("DB_NAME"),
         "DB_HOST": os.getenv("DB_HOST"),
     }
+BULK_INSERT_CHUNK_SIZE = 500
+
+def chunked(items, size=BULK_INSERT_CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def bulk_insert(cur, insert_prefix, rows, row_template=None, suffix=''):
+    # One multi-row INSERT per chunk instead of one statement per row.
+    if not rows:
+        return 0
+    row_template = row_template or '(' + ', '.join(['%s'] * len(rows[0])) + ')'
+    inserted = 0
+    for chunk in chunked(rows):
+        cur.execute(
+            f"{insert_prefix} VALUES {', '.join([row_template] * len(chunk))}{suffix}",
+            tuple(value for row in chunk for value in row)
+        )
+        inserted += cur.rowcount
+    return inserted
+
+def resolve_tag_ids(cur, tag_names):
+    tag_names = list(dict.fromkeys(tag_names))
+    if not tag_names:
+        return []
+    bulk_insert(cur, "INSERT IGNORE INTO tags (name)", [(name,) for name in tag_names])
+    placeholders = ','.join(['%s'] * len(tag_names))
+    cur.execute(f"SELECT id FROM tags WHERE name IN ({placeholders})", tuple(tag_names))
+    return [row['id'] for row in cur.fetchall()]
+
+def insert_notes_bulk(cur, user_id, note_type_id, field_values_list):
+    # InnoDB gives every row of a multi-row INSERT with a known row count a
+    # consecutive block of auto-increment values (in every innodb_autoinc_lock_mode),
+    # starting at lastrowid and spaced by auto_increment_increment.
+    if not field_values_list:
+        return []
+    cur.execute("SELECT @@SESSION.auto_increment_increment AS step")
+    step = cur.fetchone()['step'] or 1
+    note_ids = []
+    for chunk in chunked(field_values_list):
+        cur.execute(
+            f"INSERT INTO notes (user_id, note_type_id, field_values) VALUES {', '.join(['(%s, %s, %s)'] * len(chunk))}",
+            tuple(value for field_values_json in chunk for value in (user_id, note_type_id, field_values_json))
+        )
+        first_id = cur.lastrowid
+        if not first_id or cur.rowcount != len(chunk):
+            return note_ids
+        note_ids.extend(first_id + offset * step for offset in range(len(chunk)))
+    return note_ids
+
+def index_note_terms(cur, user_id, notes):
+    # notes: iterable of (note_id, field_values dict); call inside the writing transaction.
+    rows = [row for note_id, field_values in notes
+            for row in search_index.posting_rows(user_id, note_id, field_values)]
+    return bulk_insert(cur, search_index.INSERT_PREFIX, rows)
+
+def reindex_note_terms(cur, user_id, note_id, field_values):
+    cur.execute("DELETE FROM note_terms WHERE note_id = %s", (note_id,))
+    return index_note_terms(cur, user_id, [(note_id, field_values)])
+
 @app.route('/api/decks', methods=['POST'])
 @login_required
 def api_create_deck():
@@ -1243,31 +2071,10 @@ def api_create_deck():
 
         if tags_str:
             tag_names = [tag.strip() for tag in tags_str if isinstance(tag, str) and tag.strip()]
-            for tag_name in tag_names:
-                cur.execute("SELECT id FROM tags WHERE name = %s", (tag_name,))
-                tag_result = cur.fetchone()
-                tag_id = None
-
-                if tag_result:
-                    tag_id = tag_result['id']
-                else:
-                    try:
-                        cur.execute("INSERT INTO tags (name) VALUES (%s)", (tag_name,))
-                        tag_id = cur.lastrowid
-                        if not tag_id:
-                             continue
-                    except Exception as e_insert:
-                         continue
-
-                if tag_id:
-                    try:
-                         cur.execute(
-                            "INSERT INTO deck_tags (deck_id, tag_id) VALUES (%s, %s)",
-                            (deck_id, tag_id)
-                         )
-                    except Exception as e_deck_tag:
-                         pass
-                    tag_ids_for_notes.append(tag_id)
+            tag_ids_for_notes = resolve_tag_ids(cur, tag_names)
+            if tag_ids_for_notes:
+                bulk_insert(cur, "INSERT IGNORE INTO deck_tags (deck_id, tag_id)",
+                            [(deck_id, tag_id) for tag_id in tag_ids_for_notes])
 
         default_note_type_id = 1 
         cur.execute("SELECT id FROM note_types WHERE id = %s", (default_note_type_id,))
@@ -1277,50 +2084,37 @@ def api_create_deck():
                 (default_note_type_id, 'Basic', '["Front", "Back"]', '{"Default Card": {"front_template": "{{Front}}", "back_template": "{{Back}}"}}')
             )
 
-        flashcards_created_count = 0
+        card_field_values = []
         for card_item in cards_data:
+            if not isinstance(card_item, dict):
+                continue
             front_text = card_item.get('front')
             back_text = card_item.get('back')
 
             if not front_text or not back_text:
                 continue 
 
-            field_values_json = json.dumps({'Front': front_text, 'Back': back_text})
+            card_field_values.append({'Front': front_text, 'Back': back_text})
 
-            cur.execute(
-                "INSERT INTO notes (user_id, note_type_id, field_values) VALUES (%s, %s, %s)",
-                (user_id, default_note_type_id, field_values_json)
-            )
-            note_id = cur.lastrowid
-            if not note_id:
-                 mysql.connection.rollback()
-                 return jsonify(success=False, errors={'general': 'Failed to create note for a card.'}), 500
-
-            if tag_ids_for_notes:
-                 note_tag_values = [(note_id, tag_id) for tag_id in tag_ids_for_notes]
-                 if note_tag_values:
-                     placeholders = ', '.join(['(%s, %s)'] * len(note_tag_values))
-                     flat_values = [item for sublist in note_tag_values for item in sublist]
-                     try:
-                         cur.execute(
-                            f"INSERT INTO note_tags (note_id, tag_id) VALUES {placeholders}",
-                            tuple(flat_values)
-                         )
-                     except Exception as e_note_tag:
-                         pass
-
-            cur.execute(
-                """
-                INSERT INTO flashcards (note_id, deck_id, card_type, due_date, ease_factor, reps, intervals)
-                VALUES (%s, %s, 'new', CURDATE(), 2.5, 0, 0) 
-                """,
-                (note_id, deck_id)
-            )
-            flashcard_id = cur.lastrowid
-            if not flashcard_id:
-                 mysql.connection.rollback()
-                 return jsonify(success=False, errors={'general': 'Failed to create flashcard entry.'}), 500
-            flashcards_created_count += 1
+        field_values_list = [json.dumps(field_values) for field_values in card_field_values]
+        note_ids = insert_notes_bulk(cur, user_id, default_note_type_id, field_values_list)
+        if len(note_ids) != len(field_values_list):
+            mysql.connection.rollback()
+            return jsonify(success=False, errors={'general': 'Failed to create notes for the cards.'}), 500
+        index_note_terms(cur, user_id, zip(note_ids, card_field_values))
+
+        if tag_ids_for_notes:
+            bulk_insert(cur, "INSERT IGNORE INTO note_tags (note_id, tag_id)",
+                        [(note_id, tag_id) for note_id in note_ids for tag_id in tag_ids_for_notes])
+
+        bulk_insert(cur, "INSERT INTO flashcards (note_id, deck_id, card_type, due_date, ease_factor, reps, intervals)",
+                    [(note_id, deck_id) for note_id in note_ids],
+                    row_template="(%s, %s, 'new', CURDATE(), 2.5, 0, 0)")
+        flashcards_created_count = len(note_ids)
+        bump_user_counters(cur, user_id, Counter(total_decks=1, total_cards=flashcards_created_count,
+                                                 new_cards=flashcards_created_count))
+        bump_deck_new_cards(cur, deck_id, flashcards_created_count)
+        bump_data_versions(cur, user_id)
 
         mysql.connection.commit()
 
@@ -1355,48 +2149,80 @@ def api_create_deck():
             cur.close()
 
 
+def load_deck_list(cur, user_id):
+    """Return (decks, deck_tag_rows) for the user's deck list, newest first.
+
+    deck_tag_rows are the (deck_id, id, name) rows behind each deck's tags,
+    returned so callers that also list tags can reuse them.
+    """
+    # Counts come from deck_aggregates/deck_due_counts, which the card and
+    # review write paths keep current, instead of counting flashcards per deck.
+    cur.execute("""
+        SELECT 
+            d.id, 
+            d.name, 
+            d.description, 
+            d.created_at,
+            COALESCE(da.card_count, 0) as card_count,
+            COALESCE(da.mastered_count, 0) as mastered_cards_in_deck,
+            COALESCE(da.new_count, 0) as new_count,
+            COALESCE(due.due_count, 0) as due_count,
+            da.last_studied
+        FROM decks d
+        LEFT JOIN deck_aggregates da ON da.deck_id = d.id
+        LEFT JOIN (
+            SELECT ddc.deck_id, SUM(ddc.cards) as due_count
+            FROM deck_due_counts ddc
+            JOIN decks dd ON dd.id = ddc.deck_id
+            WHERE dd.user_id = %s AND ddc.due_date <= CURDATE()
+            GROUP BY ddc.deck_id
+        ) due ON due.deck_id = d.id
+        WHERE d.user_id = %s
+        ORDER BY d.created_at DESC
+    """, (user_id, user_id))
+    
+    decks_raw = cur.fetchall()
+
+    cur.execute("""
+        SELECT dt.deck_id, t.id, t.name
+        FROM deck_tags dt
+        JOIN decks d ON d.id = dt.deck_id
+        JOIN tags t ON t.id = dt.tag_id
+        WHERE d.user_id = %s
+        ORDER BY t.name
+    """, (user_id,))
+    deck_tag_rows = cur.fetchall()
+    tags_by_deck = {}
+    for row in deck_tag_rows:
+        tags_by_deck.setdefault(row['deck_id'], []).append(row['name'])
+    
+    decks_with_progress = []
+    for deck_row in decks_raw:
+        deck_data = dict(deck_row)
+        deck_data['due_count'] = int(deck_data['due_count'])
+        deck_tags = tags_by_deck.get(deck_data['id'])
+        deck_data['tags'] = ', '.join(deck_tags) if deck_tags else None
+        
+        card_count = deck_data.get('card_count', 0)
+        mastered_count = deck_data.get('mastered_cards_in_deck', 0)
+
+        if card_count > 0:
+            deck_data['mastered_percentage'] = round((mastered_count / card_count) * 100, 0)
+        else:
+            deck_data['mastered_percentage'] = 0
+        
+        decks_with_progress.append(deck_data)
+
+    return decks_with_progress, deck_tag_rows
+
 @app.route('/api/decks', methods=['GET'])
 @login_required
+@conditional_get()
 def api_get_decks():
     user_id = session['user_id']
     cur = mysql.connection.cursor()
     try:
-        cur.execute("""
-            SELECT 
-                d.id, 
-                d.name, 
-                d.description, 
-                d.created_at,
-                (SELECT COUNT(*) FROM flashcards f WHERE f.deck_id = d.id) as card_count,
-                (SELECT COUNT(*) 
-                    FROM flashcards sf 
-                    WHERE sf.deck_id = d.id AND sf.card_type = 'review' AND sf.ease_factor >= 2.8
-                ) as mastered_cards_in_deck,
-                GROUP_CONCAT(DISTINCT t.name SEPARATOR ', ') as tags
-            FROM decks d
-            LEFT JOIN deck_tags dt ON d.id = dt.deck_id
-            LEFT JOIN tags t ON dt.tag_id = t.id
-            WHERE d.user_id = %s
-            GROUP BY d.id, d.name, d.description, d.created_at
-            ORDER BY d.created_at DESC
-        """, (user_id,))
-        
-        decks_raw = cur.fetchall()
-        
-        decks_with_progress = []
-        for deck_row in decks_raw:
-            deck_data = dict(deck_row)
-            
-            card_count = deck_data.get('card_count', 0)
-            mastered_count = deck_data.get('mastered_cards_in_deck', 0)
-
-            if card_count > 0:
-                deck_data['mastered_percentage'] = round((mastered_count / card_count) * 100, 0)
-            else:
-                deck_data['mastered_percentage'] = 0
-            
-            decks_with_progress.append(deck_data)
-
+        decks_with_progress, _ = load_deck_list(cur, user_id)
         return jsonify(success=True, decks=decks_with_progress)
 
     except Exception as e:
@@ -1404,10 +2230,133 @@ def api_get_decks():
         return jsonify(success=False, errors={'general': f'An error occurred: {str(e)}'}), 500
     finally:
         cur.close()
+
+@app.route('/api/dashboard/bootstrap', methods=['GET'])
+@login_required
+@conditional_get()
+def api_dashboard_bootstrap():
+    # Everything dashboard.js needs on first paint in one request. MySQLdb runs
+    # one statement at a time per connection, so the queries run back to back
+    # on a single pooled connection; the deck tags are shared with the tag list.
+    user_id = session['user_id']
+    cur = mysql.connection.cursor()
+    try:
+        decks, deck_tag_rows = load_deck_list(cur, user_id)
+        stats = load_dashboard_stats(cur, user_id)
+        tags = load_user_tags(cur, user_id, deck_tag_rows)
+        return jsonify(success=True, decks=decks, stats=stats, tags=tags)
+
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify(success=False, errors={'general': f'An error occurred loading the dashboard: {str(e)}'}), 500
+    finally:
+        cur.close()
         
+DECK_QUEUE_ROWS_SQL = """
+    SELECT id, note_id, card_type, due_date, ease_factor, created_at
+    FROM flashcards
+    WHERE deck_id = %s
+"""
+
+def load_deck_queue_rows(cur, deck_id):
+    cur.execute(DECK_QUEUE_ROWS_SQL, (deck_id,))
+    return cur.fetchall()
+
+STUDY_PAGE_DEFAULT_SIZE = 10
+STUDY_PAGE_MAX_SIZE = 100
+STUDY_SESSION_ID_LENGTH = 16
+
+def is_study_session_id(session_id):
+    return len(session_id) == STUDY_SESSION_ID_LENGTH and all(c in '0123456789abcdef' for c in session_id)
+
+def study_order_key(session_id, flashcard_id):
+    return hashlib.sha1(f'{session_id}:{flashcard_id}'.encode()).digest()
+
+def shuffle_study_cards(flashcard_ids, session_id):
+    # Sorting by a hash of (session, card) is a shuffle that any worker can
+    # reproduce from the session id, and it keeps the relative order of the
+    # remaining cards fixed when some of them drop out of the due set.
+    return sorted(flashcard_ids, key=lambda flashcard_id: study_order_key(session_id, flashcard_id))
+
+def study_session_card_ids(cur, user_id, deck_id, session_id):
+    user_settings = get_user_settings(cur, user_id)
+    new_card_ids, review_card_ids = due_queue.session_card_ids(
+        deck_id, lambda d_id: load_deck_queue_rows(cur, d_id), date.today(),
+        user_settings['new_cards_per_day'], user_settings['max_reviews_per_day'])
+    return shuffle_study_cards(new_card_ids + review_card_ids, session_id)
+
+def study_page_ids(card_ids, session_id, after, limit):
+    # `after` is the last flashcard id the client already has, so a page is a
+    # seek into the hash order rather than an offset that shifts on reviews.
+    start = 0
+    if after is not None:
+        keys = [study_order_key(session_id, flashcard_id) for flashcard_id in card_ids]
+        start = bisect.bisect_right(keys, study_order_key(session_id, after))
+    page_ids = card_ids[start:start + limit]
+    next_after = page_ids[-1] if start + limit < len(card_ids) else None
+    return page_ids, next_after
+
+def study_cards_query(user_id, deck_id, flashcard_ids):
+    placeholders = ','.join(['%s'] * len(flashcard_ids))
+    return f"""
+        SELECT
+            f.id as flashcard_id,
+            n.id as note_id,
+            n.field_values,
+            f.card_type,
+            f.due_date,
+            f.ease_factor,
+            f.intervals,
+            f.reps,
+            f.lapses
+        FROM flashcards f
+        JOIN notes n ON f.note_id = n.id
+        WHERE f.id IN ({placeholders}) AND f.deck_id = %s AND n.user_id = %s
+          AND (f.card_type = 'new' OR f.due_date <= CURDATE())
+    """, (*flashcard_ids, deck_id, user_id)
+
+def study_cards_payload(deck_id, rows, flashcard_ids):
+    # The due queue is per process, so a card reviewed through another worker
+    # can still be listed here; the query re-checks it against the database.
+    # A miss means this worker's queue for the deck is stale, so reload it.
+    cards_by_id = {row['flashcard_id']: row for row in rows}
+    if len(cards_by_id) < len(flashcard_ids):
+        due_queue.invalidate_deck(deck_id)
+    cards_for_study = []
+    for flashcard_id in flashcard_ids:
+        card_data = cards_by_id.get(flashcard_id)
+        if card_data is None:
+            continue
+        field_values = parse_field_values_utility(card_data.get('field_values'), card_data.get('note_id'))
+        cards_for_study.append({
+            'flashcard_id': card_data['flashcard_id'],
+            'note_id': card_data['note_id'],
+            'front': field_values.get('Front', ''),
+            'back': field_values.get('Back', ''),
+            'card_type': card_data.get('card_type'),
+            'due_date': card_data.get('due_date').strftime('%Y-%m-%d') if card_data.get('due_date') else None,
+            'ease_factor': card_data.get('ease_factor'),
+            'intervals': card_data.get('intervals'),
+            'reps': card_data.get('reps'),
+            'lapses': card_data.get('lapses'),
+        })
+    return cards_for_study
+
+def load_study_cards(cur, user_id, deck_id, flashcard_ids):
+    """Return the study payload for flashcard_ids, in the given order."""
+    if not flashcard_ids:
+        return []
+    cur.execute(*study_cards_query(user_id, deck_id, flashcard_ids))
+    return study_cards_payload(deck_id, cur.fetchall(), flashcard_ids)
+
+def study_page_limit():
+    return min(max(1, request.args.get('limit', STUDY_PAGE_DEFAULT_SIZE, type=int)), STUDY_PAGE_MAX_SIZE)
+
 @app.route('/api/study/session/<int:deck_id>', methods=['GET'])
 @login_required
 def api_get_study_cards(deck_id):
+    # Starts a session: the full shuffled id list plus content for the first
+    # page only. The client pulls the rest from api_get_study_page as it goes.
     user_id = session['user_id']
     cur = mysql.connection.cursor()
 
@@ -1417,82 +2366,50 @@ def api_get_study_cards(deck_id):
         if not deck:
             return jsonify(success=False, errors={'deck': 'Deck not found or access denied'}), 404
 
-        cur.execute("""
-            SELECT new_cards_per_day, max_reviews_per_day
-            FROM settings
-            WHERE user_id = %s
-        """, (user_id,))
-        user_settings = cur.fetchone()
+        limit = study_page_limit()
+        session_id = secrets.token_hex(STUDY_SESSION_ID_LENGTH // 2)
+        card_ids = study_session_card_ids(cur, user_id, deck_id, session_id)
+        study_sessions.set((user_id, deck_id, session_id), card_ids)
 
-        new_cards_limit = user_settings['new_cards_per_day'] if user_settings and user_settings['new_cards_per_day'] is not None else 20
-        review_cards_limit = user_settings['max_reviews_per_day'] if user_settings and user_settings['max_reviews_per_day'] is not None else 100
+        page_ids, next_after = study_page_ids(card_ids, session_id, None, limit)
+        cards_for_study = load_study_cards(cur, user_id, deck_id, page_ids)
 
-        today = date.today()
+        return jsonify(success=True, deck_id=deck_id, session_id=session_id, card_ids=card_ids,
+                       cards=cards_for_study, next_cursor=next_after)
 
-        new_cards_query = """
-            SELECT
-                f.id as flashcard_id,
-                n.id as note_id,
-                n.field_values,
-                f.card_type,
-                f.due_date,
-                f.ease_factor,
-                f.intervals,
-                f.reps,
-                f.lapses,
-                f.created_at
-            FROM flashcards f
-            JOIN notes n ON f.note_id = n.id
-            WHERE f.deck_id = %s AND n.user_id = %s AND f.card_type = 'new'
-            ORDER BY f.created_at DESC 
-            LIMIT %s
-        """
-        cur.execute(new_cards_query, (deck_id, user_id, new_cards_limit))
-        new_cards = cur.fetchall()
-
-        review_cards_query = """
-            SELECT
-                f.id as flashcard_id,
-                n.id as note_id,
-                n.field_values,
-                f.card_type,
-                f.due_date,
-                f.ease_factor,
-                f.intervals,
-                f.reps,
-                f.lapses
-            FROM flashcards f
-            JOIN notes n ON f.note_id = n.id
-            WHERE f.deck_id = %s AND n.user_id = %s AND f.card_type != 'new' AND f.due_date <= %s
-            ORDER BY f.due_date ASC, f.ease_factor ASC
-            LIMIT %s
-        """
-        cur.execute(review_cards_query, (deck_id, user_id, today, review_cards_limit))
-        review_cards = cur.fetchall()
-
-        all_cards_raw = list(new_cards) + list(review_cards)
-
-        cards_for_study = []
-        for card_raw in all_cards_raw:
-            card_data = dict(card_raw)
-            field_values = parse_field_values_utility(card_data.get('field_values'))
-            cards_for_study.append({
-                'flashcard_id': card_data['flashcard_id'],
-                'note_id': card_data['note_id'],
-                'front': field_values.get('Front', ''),
-                'back': field_values.get('Back', ''),
-                'card_type': card_data.get('card_type'),
-                'due_date': card_data.get('due_date').strftime('%Y-%m-%d') if card_data.get('due_date') else None,
-                'ease_factor': card_data.get('ease_factor'),
-                'intervals': card_data.get('intervals'),
-                'reps': card_data.get('reps'),
-                'lapses': card_data.get('lapses'),
-            })
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify(success=False, errors={'general': f'An error occurred: {str(e)}'}), 500
+    finally:
+        cur.close()
 
-        import random
-        random.shuffle(cards_for_study)
+@app.route('/api/study/session/<int:deck_id>/cards', methods=['GET'])
+@login_required
+def api_get_study_page(deck_id):
+    user_id = session['user_id']
+    session_id = request.args.get('session', '')
+    after = request.args.get('cursor', type=int)
+    if not is_study_session_id(session_id):
+        return jsonify(success=False, errors={'session': 'Invalid study session.'}), 400
+    if after is None and request.args.get('cursor'):
+        return jsonify(success=False, errors={'cursor': 'Invalid cursor.'}), 400
 
-        return jsonify(success=True, deck_id=deck_id, cards=cards_for_study)
+    cur = mysql.connection.cursor()
+    try:
+        card_ids = study_sessions.get((user_id, deck_id, session_id))
+        if card_ids is None:
+            # Expired, or started on another worker: rebuild the order from the
+            # session id. Cards reviewed since then are gone from the due set,
+            # which is fine because the cursor is past them.
+            cur.execute("SELECT id FROM decks WHERE id = %s AND user_id = %s", (deck_id, user_id))
+            if not cur.fetchone():
+                return jsonify(success=False, errors={'deck': 'Deck not found or access denied'}), 404
+            card_ids = study_session_card_ids(cur, user_id, deck_id, session_id)
+            study_sessions.set((user_id, deck_id, session_id), card_ids)
+
+        page_ids, next_after = study_page_ids(card_ids, session_id, after, study_page_limit())
+        cards_for_study = load_study_cards(cur, user_id, deck_id, page_ids)
+        return jsonify(success=True, deck_id=deck_id, cards=cards_for_study, next_cursor=next_after)
 
     except Exception as e:
         traceback.print_exc()
@@ -1500,6 +2417,174 @@ def api_get_study_cards(deck_id):
     finally:
         cur.close()
 
+RATING_MAP = {'hard': 1, 'good': 2, 'easy': 3}
+POINTS_BY_RATING = {1: 50, 2: 200, 3: 500}
+MAX_REVIEW_BATCH_SIZE = 500
+
+def parse_rating(rating_text):
+    if not isinstance(rating_text, str):
+        return None
+    return RATING_MAP.get(rating_text.lower())
+
+def parse_answered_at(value, now):
+    if value is None:
+        return now
+    if not isinstance(value, str):
+        raise ValueError('answered_at must be an ISO 8601 string')
+    answered_at = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+    if answered_at.tzinfo is not None:
+        answered_at = answered_at.astimezone().replace(tzinfo=None)
+    # Never trust a client clock that runs ahead of ours.
+    return min(answered_at, now)
+
+MAX_REVIEW_TIME_MS = 10 * 60 * 1000  # a card left open longer than this was not being studied
+
+def parse_time_spent_ms(value):
+    # Optional; anything unusable counts as no time rather than failing the review.
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+        return 0
+    return int(min(value, MAX_REVIEW_TIME_MS))
+
+def bump_review_rollups(cur, user_id, reviews):
+    """Add (review_date, rating, time_spent_ms) reviews to the user's daily rollups."""
+    days = {}
+    for review_date, rating, time_spent_ms in reviews:
+        day = days.setdefault(review_date, Counter())
+        day['review_count'] += 1
+        day['rating_sum'] += rating
+        day[f'rating_{rating}_count'] += 1
+        day['time_spent_ms'] += time_spent_ms
+    bulk_insert(
+        cur,
+        "INSERT INTO review_daily_rollups (user_id, review_date, review_count, rating_sum, "
+        "rating_1_count, rating_2_count, rating_3_count, time_spent_ms)",
+        [(user_id, review_date, day['review_count'], day['rating_sum'], day['rating_1_count'], day['rating_2_count'],
+          day['rating_3_count'], day['time_spent_ms'])
+         for review_date, day in sorted(days.items())],
+        suffix="""
+        ON DUPLICATE KEY UPDATE
+            review_count = review_count + VALUES(review_count),
+            rating_sum = rating_sum + VALUES(rating_sum),
+            rating_1_count = rating_1_count + VALUES(rating_1_count),
+            rating_2_count = rating_2_count + VALUES(rating_2_count),
+            rating_3_count = rating_3_count + VALUES(rating_3_count),
+            time_spent_ms = time_spent_ms + VALUES(time_spent_ms)
+        """
+    )
+    # Add milliseconds and derive the seconds from the running total, so sub-second
+    # reviews still add up. The seconds are assigned first: MySQL evaluates SET
+    # left to right, and both sides must see the old total_time_spent_ms.
+    time_spent_ms = sum(day['time_spent_ms'] for day in days.values())
+    if time_spent_ms:
+        cur.execute("""
+            UPDATE user_stats
+            SET total_time_spent_seconds = FLOOR((total_time_spent_ms + %s) / 1000),
+                total_time_spent_ms = total_time_spent_ms + %s
+            WHERE user_id = %s
+        """, (time_spent_ms, time_spent_ms, user_id))
+
+def backfill_review_rollups(cur, first_user_id, last_user_id, before_date):
+    # Review counts and ratings for days before `before_date`, rebuilt from
+    # review_logs. Logs carry no timing, so time_spent_ms is left as it is.
+    cur.execute("""
+        INSERT INTO review_daily_rollups (user_id, review_date, review_count, rating_sum,
+                                          rating_1_count, rating_2_count, rating_3_count)
+        SELECT user_id, DATE(review_time), COUNT(*), COALESCE(SUM(rating), 0),
+               COALESCE(SUM(rating = 1), 0), COALESCE(SUM(rating = 2), 0), COALESCE(SUM(rating = 3), 0)
+        FROM review_logs
+        WHERE user_id BETWEEN %s AND %s AND review_time < %s
+        GROUP BY user_id, DATE(review_time)
+        ON DUPLICATE KEY UPDATE
+            review_count = VALUES(review_count), rating_sum = VALUES(rating_sum),
+            rating_1_count = VALUES(rating_1_count), rating_2_count = VALUES(rating_2_count),
+            rating_3_count = VALUES(rating_3_count)
+    """, (first_user_id, last_user_id, before_date))
+
+REVIEW_FLASHCARD_SQL = """
+    SELECT f.*, n.user_id
+    FROM flashcards f
+    JOIN notes n ON f.note_id = n.id
+    WHERE f.id = %s
+"""
+
+def write_review(cur, user_id, flashcard, rating, ease_bonus, time_spent_ms):
+    # Only writes, so the async study path (asgi.py) can record these statements
+    # and replay them on its own connection. Call inside the review transaction.
+    today = date.today()
+    points_awarded = POINTS_BY_RATING[rating]
+    current_interval = flashcard['intervals']
+    current_ease_factor = flashcard['ease_factor']
+    last_reviewed_dt = datetime.now()
+
+    new_state = scheduler.schedule(flashcard, rating, ease_bonus)
+    new_card_type = new_state['card_type']
+    final_interval_days = new_state['intervals']
+    new_ease_factor = new_state['ease_factor']
+    next_due_date = today + timedelta(days=final_interval_days)
+
+    cur.execute(
+        """
+        UPDATE flashcards
+        SET
+            card_type = %s, due_date = %s, intervals = %s, ease_factor = %s,
+            reps = %s, lapses = %s, last_reviewed = %s
+        WHERE id = %s
+        """,
+        (new_card_type, next_due_date, final_interval_days, new_ease_factor,
+         new_state['reps'], new_state['lapses'], last_reviewed_dt, flashcard['id'])
+    )
+
+    log_rows = [(flashcard['id'], user_id, rating, last_reviewed_dt, current_interval, final_interval_days,
+                 current_ease_factor, new_ease_factor)]
+    stage_review_logs(cur, log_rows)
+
+    counters = count_card(Counter(), new_card_type, new_ease_factor)
+    count_card(counters, flashcard['card_type'], current_ease_factor, sign=-1)
+    bump_user_counters(cur, user_id, counters)
+    deck_deltas = deck_card_delta({}, flashcard['deck_id'], new_card_type, new_ease_factor, next_due_date)
+    deck_card_delta(deck_deltas, flashcard['deck_id'], flashcard['card_type'], current_ease_factor,
+                    flashcard['due_date'], sign=-1)
+    apply_deck_deltas(cur, deck_deltas, last_studied=last_reviewed_dt)
+    bump_data_versions(cur, user_id, [flashcard['deck_id']])
+
+    cur.execute(
+        """
+        INSERT INTO user_stats (user_id, points, total_reviews, last_reviewed_date)
+        VALUES (%s, %s, 1, %s)
+        ON DUPLICATE KEY UPDATE
+            points = points + VALUES(points),
+            total_reviews = total_reviews + 1,
+            last_reviewed_date = VALUES(last_reviewed_date)
+        """,
+        (user_id, points_awarded, today)
+    )
+    bump_review_rollups(cur, user_id, [(last_reviewed_dt.date(), rating, time_spent_ms)])
+    return {'points': points_awarded, 'new_state': new_state, 'due_date': next_due_date, 'log_rows': log_rows}
+
+def finish_review(user_id, username, flashcard, review):
+    # In-process indexes, updated once the review transaction has committed.
+    new_state = review['new_state']
+    rank_index.add_points(user_id, review['points'], username)
+    due_queue.upsert_card(flashcard['deck_id'], flashcard['id'], new_state['card_type'], review['due_date'],
+                          new_state['ease_factor'], note_id=flashcard['note_id'])
+
+def review_response(flashcard_id, review):
+    new_state = review['new_state']
+    return {
+        'success': True,
+        'message': f"Review recorded. You earned {review['points']} points!",
+        'flashcard_id': flashcard_id,
+        'points_earned': review['points'],
+        'new_state': {
+            'card_type': new_state['card_type'],
+            'due_date': review['due_date'].strftime('%Y-%m-%d'),
+            'intervals': new_state['intervals'],
+            'ease_factor': round(new_state['ease_factor'], 2),
+            'reps': new_state['reps'],
+            'lapses': new_state['lapses']
+        },
+    }
+
 @app.route('/api/study/review/<int:flashcard_id>', methods=['POST'])
 @login_required
 def api_submit_review(flashcard_id):
@@ -1509,141 +2594,207 @@ def api_submit_review(flashcard_id):
     if not data:
         return jsonify(success=False, errors={'general': 'Invalid request format, JSON expected'}), 400
 
-    rating_text = data.get('rating')
-    rating_text_lower = rating_text.lower() if rating_text else None
-    
-    rating_map = {'hard': 1, 'good': 2, 'easy': 3}
-    rating = rating_map.get(rating_text_lower)
+    rating = parse_rating(data.get('rating'))
 
     if rating is None:
         return jsonify(success=False, errors={'rating': 'Invalid rating provided. Expected "hard", "good", or "easy".'}), 400
 
-    points_awarded = 0
-    if rating == 3: 
-        points_awarded = 500
-    elif rating == 2:
-        points_awarded = 200
-    elif rating == 1:
-        points_awarded = 50
+    time_spent_ms = parse_time_spent_ms(data.get('time_spent_ms'))
 
     cur = None
     try:
         cur = mysql.connection.cursor()
-        today = date.today()
-
-        cur.execute("""
-            SELECT f.*, n.user_id
-            FROM flashcards f
-            JOIN notes n ON f.note_id = n.id
-            WHERE f.id = %s
-        """, (flashcard_id,))
+        cur.execute(REVIEW_FLASHCARD_SQL, (flashcard_id,))
         flashcard = cur.fetchone()
 
         if not flashcard or flashcard['user_id'] != user_id:
             return jsonify(success=False, errors={'flashcard': 'Flashcard not found or access denied'}), 404
 
-        cur.execute("""
-            SELECT learning_steps, ease_bonus
-            FROM settings
-            WHERE user_id = %s
-        """, (user_id,))
-        user_settings = cur.fetchone()
-        
-        default_ease_bonus = 1.3
-        ease_bonus = user_settings['ease_bonus'] if user_settings and user_settings.get('ease_bonus') is not None else default_ease_bonus
-
-        current_interval = flashcard['intervals']
-        current_ease_factor = flashcard['ease_factor']
-        current_reps = flashcard['reps']
-        current_lapses = flashcard['lapses']
-        current_card_type = flashcard['card_type']
-        last_reviewed_dt = datetime.now()
-
-        new_reps = current_reps + 1
-        new_lapses = current_lapses
-        new_card_type = current_card_type 
-        new_ease_factor = current_ease_factor
-        new_interval = current_interval
-
-        if rating == 3:
-            if current_card_type == 'new':
-                new_interval = 4 
-            elif current_card_type == 'learning':
-                new_interval = 1 
-            else:
-                new_interval = round(current_interval * current_ease_factor * ease_bonus)
-            new_ease_factor = current_ease_factor + 0.15
-            new_card_type = 'review'
-
-        elif rating == 2:
-            if current_card_type == 'new':
-                new_interval = 1 
-                new_card_type = 'learning' 
-            elif current_card_type == 'learning':
-                 new_interval = max(1, round(current_interval * 1.2)) 
-                 new_card_type = 'learning' 
-            else: 
-                new_interval = round(current_interval * current_ease_factor)
-            if current_card_type == 'review': new_card_type = 'review'
-
-
-        elif rating == 1:
-            new_lapses += 1
-            new_ease_factor = max(1.3, current_ease_factor - 0.20)
-            new_interval = 1 
-            new_card_type = 'learning' 
-
-        new_ease_factor = max(1.3, min(5.0, new_ease_factor)) 
-        final_interval_days = max(1, int(round(new_interval)))
-        next_due_date = today + timedelta(days=final_interval_days)
+        ease_bonus = get_user_settings(cur, user_id)['ease_bonus']
+        review = write_review(cur, user_id, flashcard, rating, ease_bonus, time_spent_ms)
 
-        cur.execute(
-            """
-            UPDATE flashcards
-            SET
-                card_type = %s, due_date = %s, intervals = %s, ease_factor = %s,
-                reps = %s, lapses = %s, last_reviewed = %s
-            WHERE id = %s
-            """,
-            (new_card_type, next_due_date, final_interval_days, new_ease_factor,
-             new_reps, new_lapses, last_reviewed_dt, flashcard_id)
-        )
+        mysql.connection.commit()
+        release_review_logs(cur, review['log_rows'])
+        finish_review(user_id, session.get('username'), flashcard, review)
+        return jsonify(review_response(flashcard_id, review))
 
-        cur.execute(
-            """
-            INSERT INTO review_logs (flashcard_id, user_id, rating, review_time, intervals_before, intervals_after, ease_factor_before, ease_factor_after)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-            """,
-            (flashcard_id, user_id, rating, last_reviewed_dt, current_interval, final_interval_days, current_ease_factor, new_ease_factor)
-        )
+    except Exception as e:
+        if mysql.connection and hasattr(mysql.connection, 'rollback'):
+            mysql.connection.rollback()
+        traceback.print_exc()
+        return jsonify(success=False, errors={'general': f'An error occurred: {str(e)}'}), 500
+    finally:
+        if cur:
+            cur.close()
+
+FLASHCARD_STATE_COLUMNS = ('card_type', 'due_date', 'intervals', 'ease_factor', 'reps', 'lapses', 'last_reviewed')
+
+def update_flashcard_states(cur, flashcards):
+    # One UPDATE for every card instead of one per review. Unlike an upsert it
+    # can never re-create a card deleted since it was read.
+    whens = ' '.join(['WHEN %s THEN %s'] * len(flashcards))
+    assignments = ', '.join(f"{column} = CASE id {whens} END" for column in FLASHCARD_STATE_COLUMNS)
+    params = [value for column in FLASHCARD_STATE_COLUMNS for f in flashcards for value in (f['id'], f[column])]
+    placeholders = ','.join(['%s'] * len(flashcards))
+    cur.execute(f"UPDATE flashcards SET {assignments} WHERE id IN ({placeholders})",
+                (*params, *(f['id'] for f in flashcards)))
+
+@app.route('/api/study/reviews', methods=['POST'])
+@login_required
+def api_submit_reviews_batch():
+    user_id = session['user_id']
+    data = request.get_json()
+
+    if not data:
+        return jsonify(success=False, errors={'general': 'Invalid request format, JSON expected'}), 400
+
+    items = data.get('reviews')
+    if not isinstance(items, list) or not items:
+        return jsonify(success=False, errors={'reviews': 'A non-empty list of reviews is required'}), 400
+    if len(items) > MAX_REVIEW_BATCH_SIZE:
+        return jsonify(success=False, errors={'reviews': f'At most {MAX_REVIEW_BATCH_SIZE} reviews can be submitted at once'}), 400
+
+    now = datetime.now()
+    reviews = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            return jsonify(success=False, errors={'reviews': f'Review {index} must be an object'}), 400
+
+        flashcard_id = item.get('flashcard_id')
+        if isinstance(flashcard_id, str) and flashcard_id.isdigit():
+            flashcard_id = int(flashcard_id)
+        if not isinstance(flashcard_id, int) or isinstance(flashcard_id, bool) or flashcard_id <= 0:
+            return jsonify(success=False, errors={'reviews': f'Review {index} has an invalid flashcard_id'}), 400
+
+        rating = parse_rating(item.get('rating'))
+        if rating is None:
+            return jsonify(success=False, errors={'reviews': f'Review {index} has an invalid rating. Expected "hard", "good", or "easy".'}), 400
+
+        try:
+            answered_at = parse_answered_at(item.get('answered_at'), now)
+        except ValueError:
+            return jsonify(success=False, errors={'reviews': f'Review {index} has an invalid answered_at timestamp'}), 400
+
+        reviews.append({'index': index, 'flashcard_id': flashcard_id, 'rating': rating, 'answered_at': answered_at,
+                        'time_spent_ms': parse_time_spent_ms(item.get('time_spent_ms'))})
+
+    # Reviews of the same card must be replayed in the order they were answered.
+    reviews.sort(key=lambda r: (r['answered_at'], r['index']))
+
+    cur = None
+    try:
+        cur = mysql.connection.cursor()
+
+        flashcard_ids = sorted({r['flashcard_id'] for r in reviews})
+        placeholders = ','.join(['%s'] * len(flashcard_ids))
+        cur.execute(f"""
+            SELECT f.id, f.note_id, f.deck_id, f.card_type, f.due_date, f.intervals, f.ease_factor, f.reps, f.lapses
+            FROM flashcards f
+            JOIN notes n ON f.note_id = n.id
+            WHERE n.user_id = %s AND f.id IN ({placeholders})
+            FOR UPDATE
+        """, (user_id, *flashcard_ids))
+        # Locked until commit, so two overlapping batches for the same cards (a
+        # pagehide beacon racing a flush) apply one after the other.
+        flashcards = {row['id']: dict(row) for row in cur.fetchall()}
+        counters = Counter()
+        deck_deltas = {}
+        for flashcard in flashcards.values():
+            count_card(counters, flashcard['card_type'], flashcard['ease_factor'], sign=-1)
+            deck_card_delta(deck_deltas, flashcard['deck_id'], flashcard['card_type'], flashcard['ease_factor'],
+                            flashcard['due_date'], sign=-1)
+
+        if not flashcards:
+            return jsonify(success=False, errors={'flashcard': 'Flashcards not found or access denied'}), 404
+
+        ease_bonus = get_user_settings(cur, user_id)['ease_bonus']
+
+        results = {}
+        rejected = []
+        log_rows = []
+        final_states = {}
+        points_awarded = 0
+        last_reviewed_date = None
+        rollup_reviews = []
+
+        for review in reviews:
+            flashcard_id = review['flashcard_id']
+            flashcard = flashcards.get(flashcard_id)
+            if flashcard is None:
+                rejected.append({'index': review['index'], 'flashcard_id': flashcard_id, 'error': 'Flashcard not found or access denied'})
+                continue
+
+            answered_at = review['answered_at']
+            new_state = scheduler.schedule(flashcard, review['rating'], ease_bonus)
+            new_state['due_date'] = answered_at.date() + timedelta(days=new_state['intervals'])
+            new_state['last_reviewed'] = answered_at
+
+            log_rows.append((flashcard_id, user_id, review['rating'], answered_at,
+                             flashcard['intervals'], new_state['intervals'],
+                             flashcard['ease_factor'], new_state['ease_factor']))
+
+            flashcard.update(new_state)
+            final_states[flashcard_id] = flashcard
+            points_awarded += POINTS_BY_RATING[review['rating']]
+            rollup_reviews.append((answered_at.date(), review['rating'], review['time_spent_ms']))
+            if last_reviewed_date is None or answered_at.date() > last_reviewed_date:
+                last_reviewed_date = answered_at.date()
+
+            results[review['index']] = {
+                'flashcard_id': flashcard_id,
+                'points_earned': POINTS_BY_RATING[review['rating']],
+                'new_state': {
+                    'card_type': new_state['card_type'],
+                    'due_date': new_state['due_date'].strftime('%Y-%m-%d'),
+                    'intervals': new_state['intervals'],
+                    'ease_factor': round(new_state['ease_factor'], 2),
+                    'reps': new_state['reps'],
+                    'lapses': new_state['lapses']
+                }
+            }
+
+        if not final_states:
+            return jsonify(success=False, errors={'flashcard': 'Flashcards not found or access denied'}, rejected=rejected), 404
+
+        update_flashcard_states(cur, list(final_states.values()))
+
+        stage_review_logs(cur, log_rows)
+
+        # Cards that were loaded but not reviewed cancel out against the -1 above.
+        for flashcard in flashcards.values():
+            count_card(counters, flashcard['card_type'], flashcard['ease_factor'])
+            deck_card_delta(deck_deltas, flashcard['deck_id'], flashcard['card_type'], flashcard['ease_factor'],
+                            flashcard['due_date'])
+        bump_user_counters(cur, user_id, counters)
+        apply_deck_deltas(cur, deck_deltas, last_studied=max(f['last_reviewed'] for f in final_states.values()))
+        bump_data_versions(cur, user_id, [f['deck_id'] for f in final_states.values()])
 
         cur.execute(
             """
             INSERT INTO user_stats (user_id, points, total_reviews, last_reviewed_date)
-            VALUES (%s, %s, 1, %s)
+            VALUES (%s, %s, %s, %s)
             ON DUPLICATE KEY UPDATE
                 points = points + VALUES(points),
-                total_reviews = total_reviews + 1,
-                last_reviewed_date = VALUES(last_reviewed_date)
+                total_reviews = total_reviews + VALUES(total_reviews),
+                last_reviewed_date = GREATEST(COALESCE(last_reviewed_date, VALUES(last_reviewed_date)), VALUES(last_reviewed_date))
             """,
-            (user_id, points_awarded, today) 
+            (user_id, points_awarded, len(log_rows), last_reviewed_date)
         )
+        bump_review_rollups(cur, user_id, rollup_reviews)
 
         mysql.connection.commit()
+        release_review_logs(cur, log_rows)
+        rank_index.add_points(user_id, points_awarded, session.get('username'))
+        for f in final_states.values():
+            due_queue.upsert_card(f['deck_id'], f['id'], f['card_type'], f['due_date'],
+                                  f['ease_factor'], note_id=f['note_id'])
 
         return jsonify(
             success=True,
-            message=f'Review recorded. You earned {points_awarded} points!',
-            flashcard_id=flashcard_id,
+            message=f'{len(log_rows)} review(s) recorded. You earned {points_awarded} points!',
             points_earned=points_awarded,
-            new_state={
-                'card_type': new_card_type,
-                'due_date': next_due_date.strftime('%Y-%m-%d'),
-                'intervals': final_interval_days,
-                'ease_factor': round(new_ease_factor, 2),
-                'reps': new_reps,
-                'lapses': new_lapses
-            }
+            results=[results[index] for index in sorted(results)],
+            rejected=rejected
         )
 
     except Exception as e:
@@ -1652,11 +2803,12 @@ def api_submit_review(flashcard_id):
         traceback.print_exc()
         return jsonify(success=False, errors={'general': f'An error occurred: {str(e)}'}), 500
     finally:
-        if cur: 
+        if cur:
             cur.close()
-            
+
 @app.route('/api/decks/<int:deck_id>', methods=['GET'])
 @login_required
+@conditional_get(deck_arg='deck_id')
 def api_get_deck_details(deck_id):
     user_id = session['user_id']
     cur = mysql.connection.cursor()
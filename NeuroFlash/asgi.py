@@ -0,0 +1,396 @@
+# asgi.py
+#
+# asyncio serving mode. The hot study endpoints run natively on an aiomysql
+# pool, so a request waiting on MySQL holds a coroutine instead of a worker
+# thread. Every other route is forwarded to the Flask app on a small thread
+# pool, so both kinds of route are served by the same process and share its
+# in-memory indexes (due queue, rank index, study sessions, settings cache).
+#
+#   uvicorn asgi:application --workers 4
+#
+# Native routes take the same parameters and return the same JSON as their
+# Flask views:
+#
+#   GET  /api/study/session/<deck_id>
+#   GET  /api/study/session/<deck_id>/cards
+#   POST /api/study/review/<flashcard_id>
+#   GET  /api/leaderboard
+#
+# Reads that do not depend on each other (deck ownership, settings and the
+# deck's queue rows; a leaderboard page and the caller's rank) go out
+# concurrently on separate pooled connections. The review's writes come from
+# app.write_review(): a StatementRecorder collects them and they are replayed
+# in one transaction. With DB_BACKEND=sqlite every route goes through Flask.
+#
+# Requires aiomysql and a2wsgi (and an ASGI server such as uvicorn).
+
+import asyncio
+import re
+import secrets
+import time
+import traceback
+from contextvars import ContextVar
+from datetime import date
+from urllib.parse import parse_qs
+
+import aiomysql
+from a2wsgi import WSGIMiddleware
+from itsdangerous import BadSignature
+from werkzeug.http import parse_cookie
+
+import app as neuroflash
+import config
+
+flask_app = neuroflash.app
+
+# [statements, seconds] for the request being served, for /metrics.
+_request_sql = ContextVar('request_sql', default=None)
+
+
+class StatementRecorder:
+    """Cursor stand-in that records execute() calls, for the write-only helpers in app.py."""
+
+    rowcount = 0
+
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, query, args=None):
+        self.statements.append((query, args))
+        return self.rowcount
+
+
+class AsyncDatabase:
+    def __init__(self):
+        self.pool = None
+        self._start_lock = asyncio.Lock()
+
+    async def start(self):
+        if self.pool is not None:
+            return
+        async with self._start_lock:
+            if self.pool is not None:
+                return
+            # autocommit: a lone SELECT must not leave a read snapshot open on a
+            # pooled connection. Writes open their transaction explicitly.
+            self.pool = await aiomysql.create_pool(
+                host=config.DB_HOST, port=config.DB_PORT, user=config.DB_USER, password=config.DB_PASSWORD,
+                db=config.DB_NAME, charset='utf8', autocommit=True, cursorclass=aiomysql.DictCursor,
+                minsize=config.ASYNC_DB_POOL_MIN_SIZE, maxsize=config.ASYNC_DB_POOL_MAX_SIZE,
+                pool_recycle=int(config.DB_POOL_MAX_LIFETIME_SECONDS))
+
+    async def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            await self.pool.wait_closed()
+            self.pool = None
+
+    async def fetchall(self, query, args=None):
+        async with self.pool.acquire() as conn, conn.cursor() as cur:
+            await _execute(cur, query, args)
+            return list(await cur.fetchall())
+
+    async def fetchone(self, query, args=None):
+        async with self.pool.acquire() as conn, conn.cursor() as cur:
+            await _execute(cur, query, args)
+            return await cur.fetchone()
+
+    async def run_transaction(self, statements):
+        async with self.pool.acquire() as conn:
+            await conn.begin()
+            try:
+                async with conn.cursor() as cur:
+                    for query, args in statements:
+                        await _execute(cur, query, args)
+                await conn.commit()
+            except BaseException:
+                await conn.rollback()
+                raise
+
+
+async def _execute(cur, query, args):
+    started = time.perf_counter()
+    try:
+        await cur.execute(query, args)
+    finally:
+        totals = _request_sql.get()
+        if totals is not None:
+            totals[0] += 1
+            totals[1] += time.perf_counter() - started
+
+
+async def _none():
+    return None
+
+
+class HTTPRequest:
+    def __init__(self, scope, body):
+        self.method = scope['method']
+        self.path = scope['path']
+        self.headers = {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope['headers']}
+        self.args = {key: values[0] for key, values in
+                     parse_qs(scope.get('query_string', b'').decode('latin-1'), keep_blank_values=True).items()}
+        self.body = body
+        self.session = load_session(self.headers)
+
+    def arg_int(self, name, default=None):
+        # Like request.args.get(name, default, type=int).
+        try:
+            return int(self.args[name])
+        except (KeyError, ValueError):
+            return default
+
+    def get_json(self):
+        if not self.headers.get('content-type', '').startswith('application/json'):
+            return None
+        try:
+            return neuroflash.json_loads(self.body)
+        except ValueError:
+            return None
+
+
+def load_session(headers):
+    """Decode the signed Flask session cookie; an invalid or missing cookie is an empty session."""
+    serializer = flask_app.session_interface.get_signing_serializer(flask_app)
+    cookie = parse_cookie(headers.get('cookie', '')).get(flask_app.config['SESSION_COOKIE_NAME'])
+    if serializer is None or not cookie:
+        return {}
+    try:
+        return serializer.loads(cookie, max_age=int(flask_app.permanent_session_lifetime.total_seconds()))
+    except BadSignature:
+        return {}
+
+
+def error(status, errors):
+    return status, {'success': False, 'errors': errors}
+
+
+class StudyRoutes:
+    def __init__(self, db):
+        self.db = db
+        self._rank_index_lock = asyncio.Lock()
+
+    async def get_user_settings(self, user_id):
+        cached = neuroflash.settings_cache.get(user_id)
+        if cached is not None:
+            return dict(cached)
+        return neuroflash.cache_user_settings(user_id, await self.db.fetchone(neuroflash.USER_SETTINGS_SQL, (user_id,)))
+
+    async def deck_queue_rows(self, deck_id):
+        # Fetched alongside the ownership check, but only indexed once that passes.
+        if neuroflash.due_queue.has_deck(deck_id):
+            return None
+        return await self.db.fetchall(neuroflash.DECK_QUEUE_ROWS_SQL, (deck_id,))
+
+    async def open_study_deck(self, user_id, deck_id, session_id):
+        """Return the shuffled card ids for a session, or None if the deck is not the user's."""
+        deck, user_settings, queue_rows = await asyncio.gather(
+            self.db.fetchone("SELECT id FROM decks WHERE id = %s AND user_id = %s", (deck_id, user_id)),
+            self.get_user_settings(user_id),
+            self.deck_queue_rows(deck_id))
+        if not deck:
+            return None
+
+        today = date.today()
+        limits = (user_settings['new_cards_per_day'], user_settings['max_reviews_per_day'])
+        card_ids = neuroflash.due_queue.cached_session_card_ids(deck_id, today, *limits)
+        if card_ids is None:
+            if queue_rows is None:  # evicted since deck_queue_rows() looked
+                queue_rows = await self.db.fetchall(neuroflash.DECK_QUEUE_ROWS_SQL, (deck_id,))
+            card_ids = neuroflash.due_queue.session_card_ids(deck_id, lambda d_id: queue_rows, today, *limits)
+        new_card_ids, review_card_ids = card_ids
+        return neuroflash.shuffle_study_cards(new_card_ids + review_card_ids, session_id)
+
+    async def load_study_cards(self, user_id, deck_id, flashcard_ids):
+        if not flashcard_ids:
+            return []
+        rows = await self.db.fetchall(*neuroflash.study_cards_query(user_id, deck_id, flashcard_ids))
+        return neuroflash.study_cards_payload(deck_id, rows, flashcard_ids)
+
+    @staticmethod
+    def page_limit(request):
+        limit = request.arg_int('limit', neuroflash.STUDY_PAGE_DEFAULT_SIZE)
+        return min(max(1, limit), neuroflash.STUDY_PAGE_MAX_SIZE)
+
+    async def api_get_study_cards(self, request, deck_id):
+        user_id = request.session['user_id']
+        limit = self.page_limit(request)
+        session_id = secrets.token_hex(neuroflash.STUDY_SESSION_ID_LENGTH // 2)
+        card_ids = await self.open_study_deck(user_id, deck_id, session_id)
+        if card_ids is None:
+            return error(404, {'deck': 'Deck not found or access denied'})
+        neuroflash.study_sessions.set((user_id, deck_id, session_id), card_ids)
+
+        page_ids, next_after = neuroflash.study_page_ids(card_ids, session_id, None, limit)
+        cards_for_study = await self.load_study_cards(user_id, deck_id, page_ids)
+        return 200, {'success': True, 'deck_id': deck_id, 'session_id': session_id, 'card_ids': card_ids,
+                     'cards': cards_for_study, 'next_cursor': next_after}
+
+    async def api_get_study_page(self, request, deck_id):
+        user_id = request.session['user_id']
+        session_id = request.args.get('session', '')
+        after = request.arg_int('cursor')
+        if not neuroflash.is_study_session_id(session_id):
+            return error(400, {'session': 'Invalid study session.'})
+        if after is None and request.args.get('cursor'):
+            return error(400, {'cursor': 'Invalid cursor.'})
+
+        card_ids = neuroflash.study_sessions.get((user_id, deck_id, session_id))
+        if card_ids is None:
+            # Same rebuild from the session id as api_get_study_page in app.py.
+            card_ids = await self.open_study_deck(user_id, deck_id, session_id)
+            if card_ids is None:
+                return error(404, {'deck': 'Deck not found or access denied'})
+            neuroflash.study_sessions.set((user_id, deck_id, session_id), card_ids)
+
+        page_ids, next_after = neuroflash.study_page_ids(card_ids, session_id, after, self.page_limit(request))
+        cards_for_study = await self.load_study_cards(user_id, deck_id, page_ids)
+        return 200, {'success': True, 'deck_id': deck_id, 'cards': cards_for_study, 'next_cursor': next_after}
+
+    async def api_submit_review(self, request, flashcard_id):
+        user_id = request.session['user_id']
+        data = request.get_json()
+        if not data:
+            return error(400, {'general': 'Invalid request format, JSON expected'})
+
+        rating = neuroflash.parse_rating(data.get('rating'))
+        if rating is None:
+            return error(400, {'rating': 'Invalid rating provided. Expected "hard", "good", or "easy".'})
+        time_spent_ms = neuroflash.parse_time_spent_ms(data.get('time_spent_ms'))
+
+        flashcard, user_settings = await asyncio.gather(
+            self.db.fetchone(neuroflash.REVIEW_FLASHCARD_SQL, (flashcard_id,)),
+            self.get_user_settings(user_id))
+        if not flashcard or flashcard['user_id'] != user_id:
+            return error(404, {'flashcard': 'Flashcard not found or access denied'})
+
+        writes = StatementRecorder()
+        review = neuroflash.write_review(writes, user_id, flashcard, rating, user_settings['ease_bonus'], time_spent_ms)
+        await self.db.run_transaction(writes.statements)
+        await self.release_review_logs(review['log_rows'])
+        neuroflash.finish_review(user_id, request.session.get('username'), flashcard, review)
+        return 200, neuroflash.review_response(flashcard_id, review)
+
+    async def release_review_logs(self, rows):
+        # As app.release_review_logs: a full write-behind buffer means writing now.
+        buffer = neuroflash.review_log_buffer
+        if buffer is None or buffer.offer(rows):
+            return
+        writes = StatementRecorder()
+        neuroflash.insert_review_logs(writes, rows)
+        try:
+            await self.db.run_transaction(writes.statements)
+        except Exception:
+            traceback.print_exc()
+
+    async def api_get_leaderboard(self, request):
+        user_id = request.session.get('user_id')
+        page = max(1, request.arg_int('page', 1))
+        limit = max(1, request.arg_int('limit', 50))
+
+        if 'cursor' in request.args:
+            cursor = request.args['cursor'].strip()
+            limit = min(limit, 500)
+            try:
+                after_rank, after_user_id = neuroflash.parse_leaderboard_cursor(cursor)
+            except ValueError:
+                return error(400, {'cursor': 'Invalid cursor.'})
+            rows, current_user_rank_info = await asyncio.gather(
+                self.db.fetchall(neuroflash.LEADERBOARD_SNAPSHOT_PAGE_SQL,
+                                 (after_rank, after_rank, after_user_id, limit + 1)),
+                self.db.fetchone(neuroflash.LEADERBOARD_SNAPSHOT_USER_SQL, (user_id,)) if user_id else _none())
+            return 200, neuroflash.leaderboard_snapshot_payload(rows, cursor, limit, current_user_rank_info)
+
+        rank_index = neuroflash.rank_index
+        if not rank_index.is_loaded():
+            async with self._rank_index_lock:
+                if not rank_index.is_loaded():
+                    rank_index.begin_load()
+                    try:
+                        rows = await self.db.fetchall(neuroflash.LEADERBOARD_ROWS_SQL)
+                    except BaseException:
+                        rank_index.cancel_load()
+                        raise
+                    # Sorting every user is CPU work; keep it off the event loop.
+                    await asyncio.to_thread(rank_index.install, rows)
+        return 200, neuroflash.leaderboard_index_payload(user_id, page, limit)
+
+
+class Application:
+    """ASGI entry point: native async routes first, everything else through Flask."""
+
+    def __init__(self, native_routes=True):
+        self.wsgi = WSGIMiddleware(flask_app, workers=config.ASGI_WSGI_THREADS)
+        self.db = AsyncDatabase() if native_routes else None
+        self.routes = []
+        if native_routes:
+            study = StudyRoutes(self.db)
+            self.routes = [
+                ('GET', re.compile(r'/api/study/session/(\d+)'), study.api_get_study_cards),
+                ('GET', re.compile(r'/api/study/session/(\d+)/cards'), study.api_get_study_page),
+                ('POST', re.compile(r'/api/study/review/(\d+)'), study.api_submit_review),
+                ('GET', re.compile(r'/api/leaderboard'), study.api_get_leaderboard),
+            ]
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] == 'http':
+            for method, pattern, handler in self.routes:
+                match = pattern.fullmatch(scope['path'])
+                if match and scope['method'] == method:
+                    return await self.serve(scope, receive, send, handler, [int(arg) for arg in match.groups()])
+        return await self.wsgi(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    if self.db is not None:
+                        await self.db.start()
+                except Exception as e:
+                    await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                    return
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if self.db is not None:
+                    await self.db.close()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def serve(self, scope, receive, send, handler, args):
+        started = time.perf_counter()
+        totals = [0, 0.0]
+        _request_sql.set(totals)
+        body = bytearray()
+        more_body = True
+        while more_body:
+            message = await receive()
+            body += message.get('body', b'')
+            more_body = message.get('more_body', False)
+
+        request = HTTPRequest(scope, bytes(body))
+        if 'user_id' not in request.session:
+            status, payload = error(401, {'general': 'Authentication required'})
+        else:
+            try:
+                await self.db.start()
+                status, payload = await handler(request, *args)
+            except Exception as e:
+                traceback.print_exc()
+                status, payload = error(500, {'general': f'An error occurred: {str(e)}'})
+
+        response_body = (flask_app.json.dumps(payload) + '\n').encode()
+        await send({'type': 'http.response.start', 'status': status, 'headers': [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(response_body)).encode()),
+        ]})
+        await send({'type': 'http.response.body', 'body': response_body})
+
+        if neuroflash.request_metrics is not None:
+            neuroflash.request_metrics.observe(handler.__name__, scope['method'], status,
+                                               time.perf_counter() - started, totals[0], totals[1])
+
+
+application = Application(native_routes=config.DB_BACKEND == 'mysql')
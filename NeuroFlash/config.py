@@ -10,4 +10,55 @@ DB_USER = os.environ.get("DB_USER")
 DB_PASSWORD = os.environ.get("DB_PASSWORD")
 DB_NAME = os.environ.get("DB_NAME")
 DB_PORT = int(os.environ.get("DB_PORT", 3306))  
-SECRET_KEY = os.environ.get("SECRET_KEY")
\ No newline at end of file
+SECRET_KEY = os.environ.get("SECRET_KEY")
+
+DUE_QUEUE_MAX_AGE_SECONDS = int(os.environ.get("DUE_QUEUE_MAX_AGE_SECONDS", 300))
+DUE_QUEUE_MAX_DECKS = int(os.environ.get("DUE_QUEUE_MAX_DECKS", 1000))
+
+REVIEW_LOG_WRITE_BEHIND = os.environ.get("REVIEW_LOG_WRITE_BEHIND", "false").lower() in ("1", "true", "yes", "on")
+REVIEW_LOG_BUFFER_MAX_ROWS = int(os.environ.get("REVIEW_LOG_BUFFER_MAX_ROWS", 10000))
+REVIEW_LOG_BATCH_SIZE = int(os.environ.get("REVIEW_LOG_BATCH_SIZE", 500))
+REVIEW_LOG_FLUSH_INTERVAL_SECONDS = float(os.environ.get("REVIEW_LOG_FLUSH_INTERVAL_SECONDS", 1.0))
+
+DB_POOL_MIN_SIZE = int(os.environ.get("DB_POOL_MIN_SIZE", 2))
+DB_POOL_MAX_SIZE = int(os.environ.get("DB_POOL_MAX_SIZE", 20))
+DB_POOL_MAX_LIFETIME_SECONDS = float(os.environ.get("DB_POOL_MAX_LIFETIME_SECONDS", 1800))
+DB_POOL_HEALTH_CHECK_AFTER_SECONDS = float(os.environ.get("DB_POOL_HEALTH_CHECK_AFTER_SECONDS", 5))
+DB_POOL_CHECKOUT_TIMEOUT_SECONDS = float(os.environ.get("DB_POOL_CHECKOUT_TIMEOUT_SECONDS", 10))
+
+SETTINGS_CACHE_TTL_SECONDS = float(os.environ.get("SETTINGS_CACHE_TTL_SECONDS", 300))
+SETTINGS_CACHE_MAX_USERS = int(os.environ.get("SETTINGS_CACHE_MAX_USERS", 50000))
+
+# Background reseed of the leaderboard rank index from the database; 0 seeds it once at startup only.
+RANK_INDEX_RESEED_SECONDS = float(os.environ.get("RANK_INDEX_RESEED_SECONDS", 60))
+
+LEADERBOARD_SNAPSHOT_REFRESH_SECONDS = float(os.environ.get("LEADERBOARD_SNAPSHOT_REFRESH_SECONDS", 0))
+LEADERBOARD_SNAPSHOT_SIZE = int(os.environ.get("LEADERBOARD_SNAPSHOT_SIZE", 1000))
+
+NOTE_CONTENT_CACHE_MAX_NOTES = int(os.environ.get("NOTE_CONTENT_CACHE_MAX_NOTES", 100000))
+
+USER_COUNTERS_RECONCILE_SECONDS = float(os.environ.get("USER_COUNTERS_RECONCILE_SECONDS", 0))
+
+STUDY_SESSION_TTL_SECONDS = float(os.environ.get("STUDY_SESSION_TTL_SECONDS", 6 * 3600))
+STUDY_SESSION_MAX_SESSIONS = int(os.environ.get("STUDY_SESSION_MAX_SESSIONS", 20000))
+
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "true").lower() in ("1", "true", "yes", "on")
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN")  # if set, /metrics requires "Authorization: Bearer <token>"
+# /api/admin/* require "Authorization: Bearer <token>"; unset disables them.
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+
+# SQL instrumentation mode (see sql_audit.py); off by default.
+SQL_AUDIT_ENABLED = os.environ.get("SQL_AUDIT_ENABLED", "false").lower() in ("1", "true", "yes", "on")
+SQL_AUDIT_LOG = os.environ.get("SQL_AUDIT_LOG", "-")  # "-" writes to stderr
+SQL_AUDIT_SLOW_MS = float(os.environ.get("SQL_AUDIT_SLOW_MS", 100))
+SQL_AUDIT_REPEAT_THRESHOLD = int(os.environ.get("SQL_AUDIT_REPEAT_THRESHOLD", 10))
+
+# "mysql" (default) or "sqlite" for an embedded single-node database (see sqlite_storage.py).
+DB_BACKEND = os.environ.get("DB_BACKEND", "mysql").lower()
+SQLITE_PATH = os.environ.get("SQLITE_PATH", "neuroflash.sqlite3")
+
+# asgi.py (asyncio serving mode): aiomysql pool for the native study/leaderboard
+# routes, and threads for the Flask routes it forwards.
+ASYNC_DB_POOL_MIN_SIZE = int(os.environ.get("ASYNC_DB_POOL_MIN_SIZE", 2))
+ASYNC_DB_POOL_MAX_SIZE = int(os.environ.get("ASYNC_DB_POOL_MAX_SIZE", 50))
+ASGI_WSGI_THREADS = int(os.environ.get("ASGI_WSGI_THREADS", 16))
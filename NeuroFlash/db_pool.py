@@ -0,0 +1,296 @@
+# db_pool.py
+#
+# Connection pool for MySQLdb and a drop-in replacement for flask_mysqldb.MySQL.
+# flask_mysqldb opened a fresh connection for every app context; PooledMySQL
+# checks a warm connection out of the pool on first use of `mysql.connection`
+# and returns it when the app context tears down.
+
+import threading
+import time
+from collections import deque
+
+from flask import g
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class _TimedCursorMixin:
+    # _query is the single round trip behind execute, executemany and
+    # callproc, so each statement sent to the server is timed exactly once.
+    _query_listeners = ()
+
+    def _query(self, q):
+        if not self._query_listeners:
+            return super()._query(q)
+        started = time.perf_counter()
+        try:
+            return super()._query(q)
+        finally:
+            elapsed = time.perf_counter() - started
+            for listener in self._query_listeners:
+                listener(q, elapsed)
+
+
+class _PooledConnection:
+    __slots__ = ('raw', 'created_at', 'last_used_at')
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.created_at = time.monotonic()
+        self.last_used_at = self.created_at
+
+
+class ConnectionPool:
+    def __init__(self, connect, min_size=2, max_size=20, max_lifetime=1800.0,
+                 health_check_after=5.0, checkout_timeout=10.0):
+        if max_size < 1 or min_size < 0 or min_size > max_size:
+            raise ValueError('pool sizes must satisfy 0 <= min_size <= max_size and max_size >= 1')
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.health_check_after = health_check_after
+        self.checkout_timeout = checkout_timeout
+
+        self._idle = deque()
+        self._size = 0
+        self._in_use = 0
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+
+        self._checkouts_total = 0
+        self._waits_total = 0
+        self._wait_seconds_total = 0.0
+        self._wait_seconds_max = 0.0
+        self._timeouts_total = 0
+        self._created_total = 0
+        self._recycled_total = 0
+        self._health_check_failures_total = 0
+
+    def warm(self):
+        """Open connections until min_size exist. Errors are left to the next checkout."""
+        while True:
+            with self._lock:
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                conn = self._open()
+            except Exception:
+                with self._lock:
+                    self._size -= 1
+                    self._available.notify()
+                return
+            with self._lock:
+                self._idle.append(conn)
+                self._available.notify()
+
+    def acquire(self, timeout=None):
+        timeout = self.checkout_timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        waited = False
+
+        while True:
+            with self._lock:
+                conn = None
+                create = False
+                while conn is None and not create:
+                    if self._idle:
+                        # LIFO keeps the hottest connections in use and lets idle ones age out.
+                        conn = self._idle.pop()
+                    elif self._size < self.max_size:
+                        self._size += 1
+                        create = True
+                    else:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self._timeouts_total += 1
+                            raise PoolTimeout(f'No database connection available after {timeout:.1f}s '
+                                              f'(pool max_size={self.max_size})')
+                        waited = True
+                        self._available.wait(remaining)
+                self._in_use += 1
+
+            if create:
+                try:
+                    conn = self._open()
+                except Exception:
+                    with self._lock:
+                        self._size -= 1
+                        self._in_use -= 1
+                        self._available.notify()
+                    raise
+            elif not self._is_usable(conn):
+                self._close(conn)
+                with self._lock:
+                    self._size -= 1
+                    self._in_use -= 1
+                    self._available.notify()
+                continue
+
+            self._record_checkout(time.monotonic() - started, waited)
+            return conn
+
+    def release(self, conn, discard=False):
+        now = time.monotonic()
+        if not discard and self.max_lifetime and now - conn.created_at > self.max_lifetime:
+            discard = True
+            with self._lock:
+                self._recycled_total += 1
+        if discard:
+            self._close(conn)
+        with self._lock:
+            self._in_use -= 1
+            if discard:
+                self._size -= 1
+            else:
+                conn.last_used_at = now
+                self._idle.append(conn)
+            self._available.notify()
+
+    def close_all(self):
+        with self._lock:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+        for conn in idle:
+            self._close(conn)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._in_use,
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'checkouts_total': self._checkouts_total,
+                'waits_total': self._waits_total,
+                'wait_seconds_total': round(self._wait_seconds_total, 6),
+                'wait_seconds_max': round(self._wait_seconds_max, 6),
+                'timeouts_total': self._timeouts_total,
+                'created_total': self._created_total,
+                'recycled_total': self._recycled_total,
+                'health_check_failures_total': self._health_check_failures_total,
+            }
+
+    def _open(self):
+        conn = _PooledConnection(self._connect())
+        with self._lock:
+            self._created_total += 1
+        return conn
+
+    def _close(self, conn):
+        try:
+            conn.raw.close()
+        except Exception:
+            pass
+
+    def _is_usable(self, conn):
+        now = time.monotonic()
+        if self.max_lifetime and now - conn.created_at > self.max_lifetime:
+            with self._lock:
+                self._recycled_total += 1
+            return False
+        if now - conn.last_used_at >= self.health_check_after:
+            try:
+                conn.raw.ping()
+            except Exception:
+                with self._lock:
+                    self._health_check_failures_total += 1
+                return False
+        return True
+
+    def _record_checkout(self, wait_seconds, waited):
+        with self._lock:
+            self._checkouts_total += 1
+            self._wait_seconds_total += wait_seconds
+            if wait_seconds > self._wait_seconds_max:
+                self._wait_seconds_max = wait_seconds
+            if waited:
+                self._waits_total += 1
+
+
+class PooledMySQL:
+    """Drop-in for flask_mysqldb.MySQL backed by a ConnectionPool."""
+
+    def __init__(self, app=None):
+        self.pool = None
+        self._query_listeners = []
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        # Imported here so ConnectionPool itself does not need the driver.
+        import MySQLdb
+        import MySQLdb.cursors
+
+        app.config.setdefault('MYSQL_HOST', 'localhost')
+        app.config.setdefault('MYSQL_USER', None)
+        app.config.setdefault('MYSQL_PASSWORD', None)
+        app.config.setdefault('MYSQL_DB', None)
+        app.config.setdefault('MYSQL_PORT', 3306)
+        app.config.setdefault('MYSQL_CHARSET', 'utf8')
+        app.config.setdefault('MYSQL_CURSORCLASS', None)
+        app.config.setdefault('MYSQL_POOL_MIN_SIZE', 2)
+        app.config.setdefault('MYSQL_POOL_MAX_SIZE', 20)
+        app.config.setdefault('MYSQL_POOL_MAX_LIFETIME', 1800)
+        app.config.setdefault('MYSQL_POOL_HEALTH_CHECK_AFTER', 5)
+        app.config.setdefault('MYSQL_POOL_CHECKOUT_TIMEOUT', 10)
+
+        connect_kwargs = {
+            'host': app.config['MYSQL_HOST'],
+            'port': app.config['MYSQL_PORT'],
+            'charset': app.config['MYSQL_CHARSET'],
+            'use_unicode': True,
+        }
+        if app.config['MYSQL_USER']:
+            connect_kwargs['user'] = app.config['MYSQL_USER']
+        if app.config['MYSQL_PASSWORD']:
+            connect_kwargs['passwd'] = app.config['MYSQL_PASSWORD']
+        if app.config['MYSQL_DB']:
+            connect_kwargs['db'] = app.config['MYSQL_DB']
+        base_cursorclass = MySQLdb.cursors.Cursor
+        if app.config['MYSQL_CURSORCLASS']:
+            base_cursorclass = getattr(MySQLdb.cursors, app.config['MYSQL_CURSORCLASS'])
+        connect_kwargs['cursorclass'] = type(f'Timed{base_cursorclass.__name__}',
+                                             (_TimedCursorMixin, base_cursorclass),
+                                             {'_query_listeners': self._query_listeners})
+
+        self.pool = ConnectionPool(
+            lambda: MySQLdb.connect(**connect_kwargs),
+            min_size=app.config['MYSQL_POOL_MIN_SIZE'],
+            max_size=app.config['MYSQL_POOL_MAX_SIZE'],
+            max_lifetime=app.config['MYSQL_POOL_MAX_LIFETIME'],
+            health_check_after=app.config['MYSQL_POOL_HEALTH_CHECK_AFTER'],
+            checkout_timeout=app.config['MYSQL_POOL_CHECKOUT_TIMEOUT'],
+        )
+        threading.Thread(target=self.pool.warm, name='mysql-pool-warmup', daemon=True).start()
+        app.teardown_appcontext(self.teardown)
+
+    def add_query_listener(self, listener):
+        """Call listener(statement, seconds) after every statement any pooled cursor runs."""
+        self._query_listeners.append(listener)
+
+    @property
+    def connection(self):
+        pooled = g.get('_mysql_pooled_connection')
+        if pooled is None:
+            pooled = self.pool.acquire()
+            g._mysql_pooled_connection = pooled
+        return pooled.raw
+
+    def teardown(self, exception):
+        pooled = g.pop('_mysql_pooled_connection', None)
+        if pooled is None:
+            return
+        try:
+            # Never hand the next request an open transaction or a stale read snapshot.
+            pooled.raw.rollback()
+        except Exception:
+            self.pool.release(pooled, discard=True)
+            return
+        self.pool.release(pooled)
@@ -0,0 +1,191 @@
+# due_queue.py
+#
+# Process-local index of each deck's study queue. Decks are loaded lazily with a
+# single scan of their flashcards and then kept current by the write paths in
+# app.py, so opening a study session only pops the k cards it needs.
+
+import heapq
+import threading
+import time
+from collections import OrderedDict
+
+
+def _new_key(created_at, flashcard_id):
+    # Newest cards first, mirroring ORDER BY f.created_at DESC.
+    created_ts = created_at.timestamp() if created_at else 0.0
+    return (-created_ts, -flashcard_id, flashcard_id)
+
+
+def _review_key(due_date, ease_factor, flashcard_id):
+    # Mirrors ORDER BY f.due_date ASC, f.ease_factor ASC.
+    due_ordinal = due_date.toordinal() if due_date else 0
+    return (due_ordinal, float(ease_factor or 0.0), flashcard_id)
+
+
+class DeckDueQueue:
+    def __init__(self):
+        self.loaded_at = time.monotonic()
+        self.new_heap = []
+        self.review_heap = []
+        # flashcard_id -> (heap name, key, note_id, created_at); heap entries whose
+        # key no longer matches are stale and dropped when they surface.
+        self.entries = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def upsert(self, flashcard_id, note_id, card_type, due_date, ease_factor, created_at):
+        existing = self.entries.get(flashcard_id)
+        if created_at is None and existing:
+            created_at = existing[3]
+        if note_id is None and existing:
+            note_id = existing[2]
+
+        if card_type == 'new':
+            key = _new_key(created_at, flashcard_id)
+            heapq.heappush(self.new_heap, key)
+            self.entries[flashcard_id] = ('new', key, note_id, created_at)
+        else:
+            key = _review_key(due_date, ease_factor, flashcard_id)
+            heapq.heappush(self.review_heap, key)
+            self.entries[flashcard_id] = ('review', key, note_id, created_at)
+        self._maybe_compact()
+
+    def discard(self, flashcard_id):
+        return self.entries.pop(flashcard_id, None)
+
+    def _is_live(self, heap_name, key):
+        entry = self.entries.get(key[-1])
+        return entry is not None and entry[0] == heap_name and entry[1] == key
+
+    def _take(self, heap, heap_name, limit, accept=None):
+        taken = []
+        while heap and len(taken) < limit:
+            key = heapq.heappop(heap)
+            if not self._is_live(heap_name, key):
+                continue
+            if accept is not None and not accept(key):
+                heapq.heappush(heap, key)
+                break
+            taken.append(key)
+        # Popping is only a peek: the cards stay queued until a review moves them.
+        for key in taken:
+            heapq.heappush(heap, key)
+        return [key[-1] for key in taken]
+
+    def next_new(self, limit):
+        return self._take(self.new_heap, 'new', limit)
+
+    def next_due(self, today, limit):
+        today_ordinal = today.toordinal()
+        return self._take(self.review_heap, 'review', limit, accept=lambda key: key[0] <= today_ordinal)
+
+    def _maybe_compact(self):
+        live = len(self.entries)
+        if len(self.new_heap) + len(self.review_heap) <= 2 * live + 64:
+            return
+        self.new_heap = [key for key in self.new_heap if self._is_live('new', key)]
+        self.review_heap = [key for key in self.review_heap if self._is_live('review', key)]
+        heapq.heapify(self.new_heap)
+        heapq.heapify(self.review_heap)
+
+
+class DueQueueIndex:
+    def __init__(self, max_age_seconds=300, max_decks=1000):
+        self.max_age_seconds = max_age_seconds
+        self.max_decks = max_decks
+        self._lock = threading.Lock()
+        self._decks = OrderedDict()
+        # note_id -> {(deck_id, flashcard_id)} for every loaded deck, so deleting
+        # a note does not have to scan all queues.
+        self._note_cards = {}
+
+    def _track(self, deck_id, flashcard_id, note_id):
+        if note_id is not None:
+            self._note_cards.setdefault(note_id, set()).add((deck_id, flashcard_id))
+
+    def _untrack(self, deck_id, flashcard_id, note_id):
+        cards = self._note_cards.get(note_id)
+        if cards is not None:
+            cards.discard((deck_id, flashcard_id))
+            if not cards:
+                del self._note_cards[note_id]
+
+    def _get_deck(self, deck_id):
+        queue = self._decks.get(deck_id)
+        if queue is None:
+            return None
+        if self.max_age_seconds and time.monotonic() - queue.loaded_at > self.max_age_seconds:
+            self._drop_deck(deck_id)
+            return None
+        self._decks.move_to_end(deck_id)
+        return queue
+
+    def _drop_deck(self, deck_id):
+        queue = self._decks.pop(deck_id, None)
+        if queue is not None:
+            for flashcard_id, entry in queue.entries.items():
+                self._untrack(deck_id, flashcard_id, entry[2])
+
+    def _install(self, deck_id, rows):
+        queue = DeckDueQueue()
+        for row in rows:
+            queue.upsert(row['id'], row.get('note_id'), row['card_type'], row.get('due_date'),
+                         row.get('ease_factor'), row.get('created_at'))
+        self._drop_deck(deck_id)
+        self._decks[deck_id] = queue
+        for flashcard_id, entry in queue.entries.items():
+            self._track(deck_id, flashcard_id, entry[2])
+        while len(self._decks) > self.max_decks:
+            self._drop_deck(next(iter(self._decks)))
+        return queue
+
+    def has_deck(self, deck_id):
+        with self._lock:
+            return self._get_deck(deck_id) is not None
+
+    def cached_session_card_ids(self, deck_id, today, new_limit, review_limit):
+        """Like session_card_ids, but return None instead of loading a deck that is not indexed."""
+        with self._lock:
+            queue = self._get_deck(deck_id)
+            if queue is None:
+                return None
+            return queue.next_new(new_limit), queue.next_due(today, review_limit)
+
+    def session_card_ids(self, deck_id, load_rows, today, new_limit, review_limit):
+        """Return (new_ids, due_ids) for a study session, loading the deck on first use."""
+        cached = self.cached_session_card_ids(deck_id, today, new_limit, review_limit)
+        if cached is not None:
+            return cached
+
+        rows = load_rows(deck_id)
+
+        with self._lock:
+            queue = self._get_deck(deck_id)
+            if queue is None:
+                queue = self._install(deck_id, rows)
+            return queue.next_new(new_limit), queue.next_due(today, review_limit)
+
+    def upsert_card(self, deck_id, flashcard_id, card_type, due_date, ease_factor, note_id=None, created_at=None):
+        with self._lock:
+            queue = self._decks.get(deck_id)
+            if queue is None:
+                return
+            queue.upsert(flashcard_id, note_id, card_type, due_date, ease_factor, created_at)
+            self._track(deck_id, flashcard_id, queue.entries[flashcard_id][2])
+
+    def remove_note(self, note_id):
+        with self._lock:
+            for deck_id, flashcard_id in self._note_cards.pop(note_id, ()):
+                queue = self._decks.get(deck_id)
+                if queue is not None:
+                    queue.discard(flashcard_id)
+
+    def invalidate_deck(self, deck_id):
+        with self._lock:
+            self._drop_deck(deck_id)
+
+    def clear(self):
+        with self._lock:
+            self._decks.clear()
+            self._note_cards.clear()
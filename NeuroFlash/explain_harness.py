@@ -0,0 +1,285 @@
+# explain_harness.py
+#
+# Query-plan regression check. Seeds a realistic dataset into a scratch
+# database, drives the JSON endpoints through Flask's test client while
+# recording every SQL statement app.py sends, then runs EXPLAIN on each one and
+# fails when a statement plans a full table scan (type=ALL) or a filesort that
+# is not listed in ALLOWED_PLANS with a reason.
+#
+#   DB_NAME=neuroflash_test python explain_harness.py
+#
+# The target database must already have the schema (from "database sql
+# schema.txt"); pending migrations are applied before seeding. Because it
+# writes seed data, the harness refuses to run against a database whose name
+# does not contain "test" unless --allow-any-database is given.
+
+import argparse
+import json
+import random
+import sys
+from datetime import date, datetime, timedelta
+
+import MySQLdb
+import MySQLdb.cursors
+
+import config
+import migrate
+import search_index
+
+SEED_USERNAME_PREFIX = 'explain_user_'
+
+# Plans that are expected, with why. `match` is a substring of the statement.
+ALLOWED_PLANS = [
+    {'endpoint': 'GET /api/leaderboard', 'match': 'FROM users u', 'problem': 'full scan',
+     'reason': 'seeds the in-process rank index; runs once per RANK_INDEX_RESEED_SECONDS, not per request'},
+    {'endpoint': 'GET /api/cards/search?query', 'match': 'ORDER BY m.score DESC', 'problem': 'filesort',
+     'reason': 'relevance order only exists after the term postings are merged'},
+    {'endpoint': 'GET /api/cards/search', 'match': 'ORDER BY n.created_at DESC, n.id DESC, f.id DESC', 'problem': 'filesort',
+     'reason': 'ORDER BY spans notes and flashcards; top-N sort over the keyset range'},
+    {'endpoint': None, 'match': 'FROM note_tags nt', 'problem': 'filesort',
+     'reason': 'sorts the tag names of one page of notes'},
+    {'endpoint': 'GET /api/decks', 'match': 'FROM deck_tags dt', 'problem': 'filesort',
+     'reason': "sorts the tag names of the user's decks"},
+    {'endpoint': 'GET /api/tags', 'match': 'UNION', 'problem': 'filesort',
+     'reason': "sorts the user's distinct tags"},
+    {'endpoint': 'GET /api/decks/<id>/cards', 'match': 'ORDER BY n.created_at ASC', 'problem': 'filesort',
+     'reason': "sorts one deck's cards by note creation time"},
+]
+
+_original_execute = MySQLdb.cursors.BaseCursor.execute
+_recorded = None
+
+
+def _recording_execute(self, query, args=None):
+    result = _original_execute(self, query, args)
+    if _recorded is not None:
+        _recorded.append(self._executed)
+    return result
+
+
+def seed(conn, users, decks_per_user, cards_per_deck, reviews_per_card, rng):
+    cur = conn.cursor()
+    vocabulary = [f'word{i}' for i in range(5000)] + ['the', 'cell', 'energy', 'protein', 'history', 'river']
+    tag_names = [f'explain-tag-{i}' for i in range(2000)]
+    today = date.today()
+    now = datetime.now()
+
+    cur.execute("INSERT IGNORE INTO note_types (id, name, fields, templates) VALUES (1, 'Basic', '[\"Front\", \"Back\"]', '{}')")
+    cur.executemany("INSERT IGNORE INTO tags (name) VALUES (%s)", [(name,) for name in tag_names])
+    cur.execute("SELECT id FROM tags WHERE name LIKE %s", ('explain-tag-%',))
+    tag_ids = [row['id'] for row in cur.fetchall()]
+
+    cur.executemany(
+        "INSERT INTO users (username, email, password_hash, created_at) VALUES (%s, %s, 'x', %s)",
+        [(f'{SEED_USERNAME_PREFIX}{i}', f'{SEED_USERNAME_PREFIX}{i}@example.com',
+          now - timedelta(days=rng.randint(0, 720))) for i in range(users)]
+    )
+    cur.execute("SELECT id FROM users WHERE username LIKE %s ORDER BY id", (SEED_USERNAME_PREFIX + '%',))
+    user_ids = [row['id'] for row in cur.fetchall()]
+    cur.executemany("INSERT INTO user_stats (user_id, points) VALUES (%s, %s)",
+                    [(user_id, rng.randint(0, 500000)) for user_id in user_ids])
+
+    for user_id in user_ids:
+        cur.executemany(
+            "INSERT INTO decks (user_id, name, description, created_at) VALUES (%s, %s, '', %s)",
+            [(user_id, f'Deck {d}', now - timedelta(days=rng.randint(0, 365))) for d in range(decks_per_user)]
+        )
+        cur.execute("SELECT id FROM decks WHERE user_id = %s", (user_id,))
+        deck_ids = [row['id'] for row in cur.fetchall()]
+        cur.executemany("INSERT IGNORE INTO deck_tags (deck_id, tag_id) VALUES (%s, %s)",
+                        [(deck_id, rng.choice(tag_ids)) for deck_id in deck_ids])
+
+        notes = []
+        for _ in range(len(deck_ids) * cards_per_deck):
+            field_values = {'Front': ' '.join(rng.choices(vocabulary, k=6)), 'Back': ' '.join(rng.choices(vocabulary, k=12))}
+            notes.append((user_id, json.dumps(field_values), now - timedelta(seconds=rng.randint(0, 365 * 86400))))
+        cur.executemany("INSERT INTO notes (user_id, note_type_id, field_values, created_at) VALUES (%s, 1, %s, %s)", notes)
+        cur.execute("SELECT id, field_values FROM notes WHERE user_id = %s ORDER BY id", (user_id,))
+        note_rows = cur.fetchall()
+
+        cur.executemany(search_index.INSERT_PREFIX + " VALUES (%s, %s, %s, %s)",
+                        [row for note in note_rows
+                         for row in search_index.posting_rows(user_id, note['id'], json.loads(note['field_values']))])
+        cur.executemany("INSERT IGNORE INTO note_tags (note_id, tag_id) VALUES (%s, %s)",
+                        [(note['id'], rng.choice(tag_ids)) for note in note_rows if rng.random() < 0.3])
+
+        flashcards = []
+        for index, note in enumerate(note_rows):
+            card_type = rng.choices(('new', 'learning', 'review'), weights=(4, 2, 4))[0]
+            flashcards.append((note['id'], deck_ids[index % len(deck_ids)], card_type,
+                               today + timedelta(days=rng.randint(-30, 60)), rng.randint(0, 120),
+                               round(rng.uniform(1.3, 3.2), 2), rng.randint(0, 30)))
+        cur.executemany(
+            "INSERT INTO flashcards (note_id, deck_id, card_type, due_date, intervals, ease_factor, reps) "
+            "VALUES (%s, %s, %s, %s, %s, %s, %s)", flashcards)
+        cur.execute("""
+            SELECT f.id FROM flashcards f JOIN notes n ON n.id = f.note_id WHERE n.user_id = %s
+        """, (user_id,))
+        flashcard_ids = [row['id'] for row in cur.fetchall()]
+        cur.executemany(
+            "INSERT INTO review_logs (flashcard_id, user_id, rating, review_time, intervals_before, intervals_after, "
+            "ease_factor_before, ease_factor_after) VALUES (%s, %s, %s, %s, 1, 2, 2.5, 2.6)",
+            [(flashcard_id, user_id, rng.randint(1, 3), now - timedelta(seconds=rng.randint(0, 365 * 86400)))
+             for flashcard_id in flashcard_ids for _ in range(reviews_per_card)]
+        )
+        conn.commit()
+
+    cur.close()
+    return user_ids
+
+
+def analyze(conn):
+    cur = conn.cursor()
+    for table in ('users', 'user_stats', 'decks', 'deck_tags', 'tags', 'notes', 'note_tags', 'note_terms',
+                  'flashcards', 'review_logs', 'deck_aggregates', 'deck_due_counts', 'review_daily_rollups'):
+        cur.execute(f"ANALYZE TABLE {table}")
+        cur.fetchall()
+    cur.close()
+
+
+def endpoint_requests(conn, user_id):
+    cur = conn.cursor()
+    cur.execute("SELECT id FROM decks WHERE user_id = %s ORDER BY id LIMIT 1", (user_id,))
+    deck_id = cur.fetchone()['id']
+    cur.execute("SELECT id FROM flashcards WHERE deck_id = %s ORDER BY id LIMIT 3", (deck_id,))
+    flashcard_ids = [row['id'] for row in cur.fetchall()]
+    cur.close()
+    return [
+        ('GET /api/decks', 'GET', '/api/decks', None),
+        ('GET /api/decks/<id>', 'GET', f'/api/decks/{deck_id}', None),
+        ('GET /api/decks/<id>/cards', 'GET', f'/api/decks/{deck_id}/cards', None),
+        ('GET /api/tags', 'GET', '/api/tags', None),
+        ('GET /api/cards/search', 'GET', '/api/cards/search', None),
+        ('GET /api/cards/search?query', 'GET', '/api/cards/search?query=cell%20energy', None),
+        ('GET /api/stats/dashboard', 'GET', '/api/stats/dashboard', None),
+        ('GET /api/stats/performance', 'GET', '/api/stats/performance?range=365', None),
+        ('GET /api/stats/performance?mode=heatmap', 'GET', '/api/stats/performance?range=all&mode=heatmap', None),
+        ('GET /api/stats/activity', 'GET', '/api/stats/activity', None),
+        ('GET /api/leaderboard', 'GET', '/api/leaderboard', None),
+        ('GET /api/leaderboard?cursor', 'GET', '/api/leaderboard?cursor=', None),
+        ('GET /api/profile', 'GET', '/api/profile', None),
+        ('GET /api/study/session/<id>', 'GET', f'/api/study/session/{deck_id}', None),
+        ('POST /api/study/review/<id>', 'POST', f'/api/study/review/{flashcard_ids[0]}', {'rating': 'good'}),
+        ('POST /api/study/reviews', 'POST', '/api/study/reviews',
+         {'reviews': [{'flashcard_id': fid, 'rating': 'easy'} for fid in flashcard_ids[1:]]}),
+    ]
+
+
+def explainable(sql):
+    head = sql.lstrip().split(None, 1)[0].upper()
+    if head in ('SELECT', 'UPDATE', 'DELETE'):
+        return not sql.lstrip().upper().startswith(('SELECT @@', 'SELECT GET_LOCK', 'SELECT RELEASE_LOCK'))
+    return head == 'INSERT' and ' SELECT ' in sql.upper()
+
+
+def plan_problems(conn, sql):
+    cur = conn.cursor()
+    try:
+        cur.execute('EXPLAIN ' + sql)
+        plan = cur.fetchall()
+    finally:
+        cur.close()
+    problems = []
+    for row in plan:
+        table = row.get('table') or ''
+        extra = row.get('Extra') or ''
+        # Derived tables and union results are temporary tables and always scanned.
+        if row.get('type') == 'ALL' and not table.startswith('<'):
+            problems.append(('full scan', table, row.get('rows')))
+        if 'Using filesort' in extra:
+            problems.append(('filesort', table, row.get('rows')))
+    return problems
+
+
+def allowed(endpoint, sql, problem):
+    for entry in ALLOWED_PLANS:
+        if entry['problem'] == problem and entry['match'] in sql and entry['endpoint'] in (None, endpoint):
+            return entry['reason']
+    return None
+
+
+def main():
+    global _recorded
+    parser = argparse.ArgumentParser(description='EXPLAIN every SQL statement issued by the hot endpoints.')
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--decks-per-user', type=int, default=10)
+    parser.add_argument('--cards-per-deck', type=int, default=200)
+    parser.add_argument('--reviews-per-card', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--allow-any-database', action='store_true')
+    args = parser.parse_args()
+
+    if 'test' not in (config.DB_NAME or '') and not args.allow_any_database:
+        print(f'Refusing to seed database {config.DB_NAME!r}: its name does not contain "test" '
+              '(pass --allow-any-database to override).', file=sys.stderr)
+        return 2
+
+    conn = migrate.connect()
+    migrate.apply_pending(conn)
+
+    cur = conn.cursor()
+    cur.execute("SELECT id FROM users WHERE username = %s", (SEED_USERNAME_PREFIX + '0',))
+    existing = cur.fetchone()
+    cur.close()
+    if existing:
+        print('Seed data already present; reusing it.')
+    else:
+        print(f'Seeding {args.users} users x {args.decks_per_user} decks x {args.cards_per_deck} cards...')
+        seed(conn, args.users, args.decks_per_user, args.cards_per_deck, args.reviews_per_card, random.Random(args.seed))
+
+    # Patch before app is imported so every cursor it creates is recorded.
+    MySQLdb.cursors.BaseCursor.execute = _recording_execute
+    import app as neuroflash
+    if not neuroflash.app.secret_key:
+        neuroflash.app.secret_key = 'explain-harness'
+
+    with neuroflash.app.app_context():
+        app_cur = neuroflash.mysql.connection.cursor()
+        neuroflash.reconcile_all_counters(app_cur)
+        neuroflash.backfill_review_rollups(app_cur, 1, 2 ** 31 - 1, date.today() + timedelta(days=1))
+        neuroflash.mysql.connection.commit()
+        app_cur.close()
+    analyze(conn)
+
+    cur = conn.cursor()
+    cur.execute("SELECT id, username FROM users WHERE username = %s", (SEED_USERNAME_PREFIX + '0',))
+    user = cur.fetchone()
+    cur.close()
+
+    client = neuroflash.app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = user['id']
+        sess['username'] = user['username']
+
+    failures = 0
+    for endpoint, method, path, body in endpoint_requests(conn, user['id']):
+        _recorded = []
+        response = client.open(path, method=method, json=body)
+        statements, _recorded = _recorded, None
+        if response.status_code >= 500:
+            failures += 1
+            print(f'FAIL {endpoint}: HTTP {response.status_code}')
+            continue
+        seen = set()
+        for raw in statements:
+            sql = raw.decode('utf-8', 'replace') if isinstance(raw, bytes) else str(raw)
+            if sql in seen or not explainable(sql):
+                continue
+            seen.add(sql)
+            for problem, table, rows in plan_problems(conn, sql):
+                reason = allowed(endpoint, sql, problem)
+                summary = ' '.join(sql.split())[:160]
+                if reason:
+                    print(f'ok   {endpoint}: {problem} on {table} ({rows} rows) allowed: {reason}')
+                else:
+                    failures += 1
+                    print(f'FAIL {endpoint}: {problem} on {table} ({rows} rows)\n     {summary}')
+        print(f'     {endpoint}: {len(seen)} statement(s) explained')
+
+    conn.close()
+    print('Query plans OK.' if not failures else f'{failures} query plan problem(s).')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
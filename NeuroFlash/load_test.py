@@ -0,0 +1,237 @@
+# load_test.py
+#
+# Replays a realistic traffic mix against a running instance and reports
+# throughput and p50/p95/p99 latency per endpoint. Virtual users log in as
+# accounts created by populate_leaderboard.py and each loops over weighted
+# actions: open the dashboard, start a study session and page through it,
+# submit review batches, search cards and check the leaderboard.
+#
+#   python populate_leaderboard.py --users 2000          # once, against a test DB
+#   python app.py                                        # or gunicorn, in another shell
+#   python load_test.py --concurrency 32 --duration 120
+#
+# Review submissions write to the database, so point it at a test instance.
+# HTTP goes through urllib, so nothing beyond the app's own dependencies is needed.
+
+import argparse
+import http.cookiejar
+import json
+import math
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+
+import populate_leaderboard
+
+# action -> weight; roughly the mix of a weekday evening.
+DEFAULT_MIX = {
+    'dashboard': 20,
+    'study_session': 10,
+    'study_page': 15,
+    'review_submit': 30,
+    'search': 15,
+    'leaderboard': 10,
+}
+REVIEW_BATCH_SIZE = 10
+RATING_NAMES = ('hard', 'good', 'good', 'good', 'easy')
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, endpoint, seconds, ok):
+        with self._lock:
+            self.latencies[endpoint].append(seconds)
+            if not ok:
+                self.errors[endpoint] += 1
+
+
+def percentile(sorted_values, fraction):
+    # Nearest-rank percentile.
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class VirtualUser:
+    def __init__(self, base_url, email, password, rng, recorder, vocabulary):
+        self.base_url = base_url.rstrip('/')
+        self.email = email
+        self.password = password
+        self.rng = rng
+        self.recorder = recorder
+        self.vocabulary = vocabulary
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+        self.deck_ids = []
+        self.study = None  # {'deck_id', 'session_id', 'cursor', 'card_ids'}
+
+    def request(self, endpoint, method, path, body=None, form=None):
+        data = None
+        headers = {'Accept': 'application/json'}
+        if body is not None:
+            data = json.dumps(body).encode()
+            headers['Content-Type'] = 'application/json'
+        elif form is not None:
+            data = urllib.parse.urlencode(form).encode()
+        req = urllib.request.Request(self.base_url + path, data=data, headers=headers, method=method)
+        started = time.perf_counter()
+        status = None
+        payload = None
+        try:
+            with self.opener.open(req, timeout=30) as response:
+                status = response.status
+                raw = response.read()
+        except urllib.error.HTTPError as e:
+            status = e.code
+            raw = e.read()
+        except (urllib.error.URLError, OSError):
+            raw = b''
+        elapsed = time.perf_counter() - started
+        self.recorder.record(endpoint, elapsed, status is not None and status < 400)
+        try:
+            payload = json.loads(raw) if raw else None
+        except ValueError:
+            pass
+        return status, payload
+
+    def login(self):
+        status, payload = self.request('POST /api/login', 'POST', '/api/login',
+                                       form={'email': self.email, 'password': self.password})
+        return status == 200 and bool(payload and payload.get('success'))
+
+    def dashboard(self):
+        status, payload = self.request('GET /api/dashboard/bootstrap', 'GET', '/api/dashboard/bootstrap')
+        if status == 200 and payload:
+            self.deck_ids = [deck['id'] for deck in payload.get('decks', [])]
+
+    def study_session(self):
+        if not self.deck_ids:
+            return self.dashboard()
+        deck_id = self.rng.choice(self.deck_ids)
+        status, payload = self.request('GET /api/study/session/<id>', 'GET', f'/api/study/session/{deck_id}')
+        if status == 200 and payload:
+            self.study = {'deck_id': deck_id, 'session_id': payload.get('session_id'),
+                          'cursor': payload.get('next_cursor'), 'card_ids': payload.get('card_ids', [])}
+
+    def study_page(self):
+        if not self.study or self.study['cursor'] is None:
+            return self.study_session()
+        params = urllib.parse.urlencode({'session': self.study['session_id'], 'cursor': self.study['cursor']})
+        status, payload = self.request('GET /api/study/session/<id>/cards', 'GET',
+                                       f"/api/study/session/{self.study['deck_id']}/cards?{params}")
+        if status == 200 and payload:
+            self.study['cursor'] = payload.get('next_cursor')
+
+    def review_submit(self):
+        if not self.study or not self.study['card_ids']:
+            return self.study_session()
+        card_ids = self.study['card_ids'][:REVIEW_BATCH_SIZE]
+        del self.study['card_ids'][:REVIEW_BATCH_SIZE]
+        reviews = [{'flashcard_id': flashcard_id, 'rating': self.rng.choice(RATING_NAMES),
+                    'time_spent_ms': int(self.rng.lognormvariate(8.5, 0.6))} for flashcard_id in card_ids]
+        self.request('POST /api/study/reviews', 'POST', '/api/study/reviews', body={'reviews': reviews})
+
+    def search(self):
+        # Skewed towards common words, like the dataset itself.
+        term = self.vocabulary[min(int(self.rng.paretovariate(1.2)) - 1, len(self.vocabulary) - 1)]
+        query = urllib.parse.urlencode({'query': term[:self.rng.randint(3, max(3, len(term)))]})
+        self.request('GET /api/cards/search', 'GET', f'/api/cards/search?{query}')
+
+    def leaderboard(self):
+        self.request('GET /api/leaderboard', 'GET', '/api/leaderboard')
+
+
+def run_worker(worker_index, args, mix, recorder, vocabulary, stop_at):
+    rng = random.Random(f'{args.seed}:worker:{worker_index}')
+    actions = list(mix)
+    weights = [mix[action] for action in actions]
+    while time.monotonic() < stop_at:
+        user_index = rng.randrange(args.users)
+        username = f'{args.username_prefix}{user_index}'
+        user = VirtualUser(args.base_url, f'{username}@example.com', populate_leaderboard.PASSWORD,
+                           rng, recorder, vocabulary)
+        if not user.login():
+            time.sleep(1)
+            continue
+        user.dashboard()
+        # A visit is a handful of actions, then another user takes the slot.
+        for _ in range(rng.randint(5, 40)):
+            if time.monotonic() >= stop_at:
+                break
+            getattr(user, rng.choices(actions, weights=weights)[0])()
+            if args.think_ms:
+                time.sleep(rng.expovariate(1000.0 / args.think_ms))
+
+
+def report(recorder, elapsed):
+    rows = []
+    total = 0
+    for endpoint, latencies in sorted(recorder.latencies.items()):
+        latencies.sort()
+        total += len(latencies)
+        rows.append({
+            'endpoint': endpoint,
+            'requests': len(latencies),
+            'errors': recorder.errors.get(endpoint, 0),
+            'rps': len(latencies) / elapsed,
+            'p50_ms': percentile(latencies, 0.50) * 1000,
+            'p95_ms': percentile(latencies, 0.95) * 1000,
+            'p99_ms': percentile(latencies, 0.99) * 1000,
+        })
+    return rows, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay a realistic traffic mix and report per-endpoint latency.')
+    parser.add_argument('--base-url', default='http://127.0.0.1:5000')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=60, help='seconds')
+    parser.add_argument('--users', type=int, default=1000, help='generated users to log in as')
+    parser.add_argument('--username-prefix', default=populate_leaderboard.USERNAME_PREFIX)
+    parser.add_argument('--think-ms', type=float, default=0, help='mean pause between actions')
+    parser.add_argument('--mix', type=json.loads, default=DEFAULT_MIX,
+                        help='JSON object of action weights, e.g. \'{"search": 50, "leaderboard": 50}\'')
+    parser.add_argument('--seed', type=int, default=1, help='must match the populate_leaderboard.py seed')
+    parser.add_argument('--json', dest='json_path', help='also write the results to this file')
+    args = parser.parse_args()
+
+    unknown = set(args.mix) - set(DEFAULT_MIX)
+    if unknown:
+        parser.error(f'unknown actions in --mix: {", ".join(sorted(unknown))}')
+
+    vocabulary = populate_leaderboard.build_vocabulary(args.seed)
+    recorder = Recorder()
+    started = time.monotonic()
+    stop_at = started + args.duration
+    workers = [threading.Thread(target=run_worker, args=(i, args, args.mix, recorder, vocabulary, stop_at), daemon=True)
+               for i in range(args.concurrency)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.monotonic() - started
+
+    rows, total = report(recorder, elapsed)
+    print(f'{total} requests in {elapsed:.1f}s ({total / elapsed:.1f} req/s, concurrency {args.concurrency})')
+    print(f"{'endpoint':<36} {'requests':>9} {'errors':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for row in rows:
+        print(f"{row['endpoint']:<36} {row['requests']:>9} {row['errors']:>7} {row['rps']:>8.1f} "
+              f"{row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f}")
+
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as result_file:
+            json.dump({'duration_seconds': elapsed, 'concurrency': args.concurrency, 'requests': total,
+                       'endpoints': rows}, result_file, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
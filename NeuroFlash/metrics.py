@@ -0,0 +1,158 @@
+# metrics.py
+#
+# In-process request metrics rendered in the Prometheus text format. For each
+# Flask endpoint we keep a latency histogram, request counts by status, and
+# the number and total time of SQL statements the request ran (fed by the
+# PooledMySQL query listener). Everything is plain counters behind one lock,
+# cheap enough to leave on in production; each worker process exposes its own
+# numbers, so scrape every worker.
+
+import threading
+import time
+from collections import defaultdict
+
+from flask import g, has_request_context, request
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SQL_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250, 1000)
+UNMATCHED_ENDPOINT = 'unmatched'
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by a tuple of label values."""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self._series = {}
+
+    def observe(self, labels, value):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+        counts = series[0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+                break
+        series[1] += value
+        series[2] += 1
+
+    def samples(self):
+        for labels, (counts, total, count) in self._series.items():
+            cumulative = 0
+            buckets = []
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                buckets.append((_format_value(bound), cumulative))
+            buckets.append(('+Inf', count))
+            yield labels, buckets, total, count
+
+
+class RequestMetrics:
+    def __init__(self, app=None, mysql=None, extra_gauges=None):
+        # extra_gauges: callable returning {metric_name: (help, value)} at scrape time.
+        self.extra_gauges = extra_gauges
+        self._lock = threading.Lock()
+        self._latency = Histogram(LATENCY_BUCKETS)
+        self._sql_per_request = Histogram(SQL_COUNT_BUCKETS)
+        self._requests = defaultdict(int)
+        self._sql_statements = defaultdict(int)
+        self._sql_seconds = defaultdict(float)
+        if app is not None:
+            self.init_app(app, mysql)
+
+    def init_app(self, app, mysql=None):
+        app.before_request(self._start_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        if mysql is not None:
+            mysql.add_query_listener(self._record_query)
+
+    def _start_request(self):
+        g._metrics_started = time.perf_counter()
+        g._metrics_sql_statements = 0
+        g._metrics_sql_seconds = 0.0
+        g._metrics_status = None
+
+    def _record_query(self, statement, seconds):
+        # Queries from background threads have no request to charge them to.
+        if has_request_context() and '_metrics_started' in g:
+            g._metrics_sql_statements += 1
+            g._metrics_sql_seconds += seconds
+
+    def _after_request(self, response):
+        g._metrics_status = response.status_code
+        return response
+
+    def _teardown_request(self, exception):
+        started = g.pop('_metrics_started', None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        # An unhandled exception skips after_request and becomes a 500.
+        status = g.pop('_metrics_status', None) or 500
+        statements = g.pop('_metrics_sql_statements', 0)
+        sql_seconds = g.pop('_metrics_sql_seconds', 0.0)
+        self.observe(request.endpoint or UNMATCHED_ENDPOINT, request.method, status, elapsed, statements, sql_seconds)
+
+    def observe(self, endpoint, method, status, elapsed, statements=0, sql_seconds=0.0):
+        """Record one finished request; also used by requests served outside Flask (asgi.py)."""
+        with self._lock:
+            self._latency.observe((endpoint, method), elapsed)
+            self._requests[(endpoint, method, str(status))] += 1
+            self._sql_per_request.observe((endpoint,), statements)
+            self._sql_statements[(endpoint,)] += statements
+            self._sql_seconds[(endpoint,)] += sql_seconds
+
+    def render(self):
+        lines = []
+        with self._lock:
+            _render_histogram(lines, 'neuroflash_http_request_duration_seconds',
+                              'Request latency by endpoint.', ('endpoint', 'method'), self._latency)
+            _render_counter(lines, 'neuroflash_http_requests_total',
+                            'Requests by endpoint and status code.', ('endpoint', 'method', 'status'), self._requests)
+            _render_histogram(lines, 'neuroflash_sql_statements_per_request',
+                              'SQL statements issued per request.', ('endpoint',), self._sql_per_request)
+            _render_counter(lines, 'neuroflash_sql_statements_total',
+                            'SQL statements issued, by endpoint.', ('endpoint',), self._sql_statements)
+            _render_counter(lines, 'neuroflash_sql_duration_seconds_total',
+                            'Time spent waiting on SQL statements, by endpoint.', ('endpoint',), self._sql_seconds)
+        if self.extra_gauges is not None:
+            for name, (help_text, value) in self.extra_gauges().items():
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} gauge')
+                lines.append(f'{name} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=''):
+    pairs = [f'{name}="{_escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _render_counter(lines, name, help_text, label_names, values):
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} counter')
+    for labels, value in sorted(values.items()):
+        lines.append(f'{name}{_format_labels(label_names, labels)} {_format_value(value)}')
+
+
+def _render_histogram(lines, name, help_text, label_names, histogram):
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} histogram')
+    for labels, buckets, total, count in sorted(histogram.samples()):
+        for bound, cumulative in buckets:
+            le = f'le="{bound}"'
+            lines.append(f'{name}_bucket{_format_labels(label_names, labels, le)} {cumulative}')
+        lines.append(f'{name}_sum{_format_labels(label_names, labels)} {_format_value(total)}')
+        lines.append(f'{name}_count{_format_labels(label_names, labels)} {count}')
@@ -0,0 +1,112 @@
+# migrate.py
+#
+# Applies the versioned SQL files in migrations/ (NNNN_description.sql, in
+# order) that are not yet recorded in schema_migrations. A fresh database is
+# created from "database sql schema.txt", which already contains every
+# migration, so re-applying them must be harmless: "already exists" errors for
+# tables, columns and indexes, and "doesn't exist" errors when dropping a
+# column, are skipped rather than treated as failures.
+#
+#   python migrate.py            apply pending migrations
+#   python migrate.py --status   list applied and pending migrations
+
+import argparse
+import os
+import re
+
+import MySQLdb
+import MySQLdb.cursors
+
+import config
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+MIGRATION_FILE_RE = re.compile(r'^(\d{4})_[\w-]+\.sql$')
+
+# ER_TABLE_EXISTS_ERROR, ER_DUP_FIELDNAME, ER_DUP_KEYNAME, ER_CANT_DROP_FIELD_OR_KEY
+ALREADY_APPLIED_ERRORS = {1050, 1060, 1061, 1091}
+
+
+def connect():
+    return MySQLdb.connect(host=config.DB_HOST, user=config.DB_USER, passwd=config.DB_PASSWORD,
+                           db=config.DB_NAME, port=config.DB_PORT, charset='utf8',
+                           cursorclass=MySQLdb.cursors.DictCursor)
+
+
+def migration_files():
+    return sorted(name for name in os.listdir(MIGRATIONS_DIR) if MIGRATION_FILE_RE.match(name))
+
+
+def split_statements(sql):
+    # Migrations are plain DDL: one statement per `;` at the end of a line, no procedures.
+    lines = [line for line in sql.splitlines() if not line.lstrip().startswith('--')]
+    statements = re.split(r';\s*$', '\n'.join(lines), flags=re.MULTILINE)
+    return [statement.strip() for statement in statements if statement.strip()]
+
+
+def ensure_migrations_table(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version VARCHAR(255) PRIMARY KEY,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def applied_versions(cur):
+    cur.execute("SELECT version FROM schema_migrations")
+    return {row['version'] for row in cur.fetchall()}
+
+
+def apply_migration(conn, name, log=print):
+    # MySQL commits DDL implicitly, so a migration is not atomic; every
+    # statement has to be safe to re-run after a partial failure.
+    with open(os.path.join(MIGRATIONS_DIR, name), encoding='utf-8') as migration_file:
+        statements = split_statements(migration_file.read())
+    cur = conn.cursor()
+    try:
+        for statement in statements:
+            try:
+                cur.execute(statement)
+            except MySQLdb.OperationalError as e:
+                if e.args[0] not in ALREADY_APPLIED_ERRORS:
+                    raise
+                log(f'  skipped (already applied): {e.args[1]}')
+        cur.execute("INSERT INTO schema_migrations (version) VALUES (%s)", (name,))
+        conn.commit()
+    finally:
+        cur.close()
+
+
+def apply_pending(conn, log=print):
+    cur = conn.cursor()
+    try:
+        ensure_migrations_table(cur)
+        applied = applied_versions(cur)
+    finally:
+        cur.close()
+    pending = [name for name in migration_files() if name not in applied]
+    for name in pending:
+        log(f'Applying {name}')
+        apply_migration(conn, name, log)
+    return pending
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Apply pending NeuroFlash schema migrations.')
+    parser.add_argument('--status', action='store_true', help='list migrations without applying anything')
+    args = parser.parse_args()
+
+    conn = connect()
+    try:
+        if args.status:
+            cur = conn.cursor()
+            ensure_migrations_table(cur)
+            applied = applied_versions(cur)
+            cur.close()
+            for name in migration_files():
+                print(f"{'applied' if name in applied else 'pending'}  {name}")
+        else:
+            pending = apply_pending(conn)
+            print(f'{len(pending)} migration(s) applied.' if pending else 'Database is up to date.')
+    finally:
+        conn.close()
@@ -0,0 +1,55 @@
+-- Tables and columns added to "database sql schema.txt" for the card search
+-- index, the materialized dashboard/deck counters and the daily review rollups.
+-- Databases created from the current schema file already have all of this.
+
+CREATE TABLE IF NOT EXISTS note_terms (
+    user_id INT NOT NULL,
+    term VARCHAR(64) NOT NULL,
+    note_id INT NOT NULL,
+    tf SMALLINT NOT NULL DEFAULT 1,
+    PRIMARY KEY (user_id, term, note_id),
+    KEY idx_note_terms_note (note_id),
+    FOREIGN KEY (note_id) REFERENCES notes(id) ON DELETE CASCADE,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+ALTER TABLE user_stats ADD COLUMN total_decks INT DEFAULT 0;
+ALTER TABLE user_stats ADD COLUMN total_cards INT DEFAULT 0;
+ALTER TABLE user_stats ADD COLUMN cards_mastered INT DEFAULT 0;
+ALTER TABLE user_stats ADD COLUMN new_cards INT DEFAULT 0;
+ALTER TABLE user_stats ADD COLUMN learning_cards INT DEFAULT 0;
+ALTER TABLE user_stats ADD COLUMN review_cards INT DEFAULT 0;
+
+CREATE TABLE IF NOT EXISTS deck_aggregates (
+    deck_id INT PRIMARY KEY,
+    card_count INT NOT NULL DEFAULT 0,
+    mastered_count INT NOT NULL DEFAULT 0,
+    new_count INT NOT NULL DEFAULT 0,
+    last_studied TIMESTAMP NULL DEFAULT NULL,
+    FOREIGN KEY (deck_id) REFERENCES decks(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS deck_due_counts (
+    deck_id INT NOT NULL,
+    due_date DATE NOT NULL,
+    cards INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (deck_id, due_date),
+    FOREIGN KEY (deck_id) REFERENCES decks(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS review_daily_rollups (
+    user_id INT NOT NULL,
+    review_date DATE NOT NULL,
+    review_count INT NOT NULL DEFAULT 0,
+    rating_sum INT NOT NULL DEFAULT 0,
+    rating_1_count INT NOT NULL DEFAULT 0,
+    rating_2_count INT NOT NULL DEFAULT 0,
+    rating_3_count INT NOT NULL DEFAULT 0,
+    rating_4_count INT NOT NULL DEFAULT 0,
+    rating_5_count INT NOT NULL DEFAULT 0,
+    time_spent_ms BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, review_date),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+CREATE INDEX idx_leaderboard_snapshots_rank ON leaderboard_snapshots (`rank`, user_id);
@@ -0,0 +1,14 @@
+-- Composite indexes for the study, stats, deck list and card search queries.
+-- Checked by explain_harness.py.
+
+-- Study queue and due counts: cards of one deck by type and due date.
+CREATE INDEX idx_flashcards_deck_type_due ON flashcards (deck_id, card_type, due_date);
+
+-- Recent activity (ORDER BY review_time DESC LIMIT n) and the rollup backfill.
+CREATE INDEX idx_review_logs_user_time ON review_logs (user_id, review_time);
+
+-- Card browser keyset pagination.
+CREATE INDEX idx_notes_user_created ON notes (user_id, created_at, id);
+
+-- Deck list, newest first.
+CREATE INDEX idx_decks_user_created ON decks (user_id, created_at);
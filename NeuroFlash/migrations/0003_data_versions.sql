@@ -0,0 +1,10 @@
+-- Change counters for conditional GETs. deck_id 0 is the user-wide scope; no
+-- FK on deck_id so the user-wide row can exist and deleted decks need no cleanup.
+
+CREATE TABLE IF NOT EXISTS data_versions (
+    user_id INT NOT NULL,
+    deck_id INT NOT NULL DEFAULT 0,
+    version BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, deck_id),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
@@ -0,0 +1,9 @@
+-- Exact review time in user_stats (total_time_spent_seconds is derived from
+-- it), and the review_daily_rollups rating columns nothing writes: ratings
+-- only run from 1 to 3.
+
+ALTER TABLE user_stats ADD COLUMN total_time_spent_ms BIGINT DEFAULT 0;
+UPDATE user_stats SET total_time_spent_ms = total_time_spent_seconds * 1000 WHERE total_time_spent_ms = 0;
+
+ALTER TABLE review_daily_rollups DROP COLUMN rating_4_count;
+ALTER TABLE review_daily_rollups DROP COLUMN rating_5_count;
@@ -0,0 +1,6 @@
+-- note_terms.term took the server's default collation, which is accent- and
+-- case-insensitive on MySQL 8 (utf8mb4_0900_ai_ci): two tokens of one note
+-- such as "cafe" and "café" collided on the primary key and the write failed.
+-- Terms are compared byte for byte, as the tokenizer produces them.
+
+ALTER TABLE note_terms MODIFY term VARCHAR(64) CHARACTER SET utf8mb4 COLLATE utf8mb4_bin NOT NULL;
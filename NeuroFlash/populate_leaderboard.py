@@ -0,0 +1,357 @@
+# populate_leaderboard.py
+#
+# Deterministic dataset generator for local performance work. Creates users,
+# decks, notes, flashcards, tags and months of review history at production
+# scale, then rebuilds the derived tables (user_stats counters, deck
+# aggregates, review rollups, leaderboard snapshot) with the same functions
+# the app uses.
+#
+#   DB_NAME=neuroflash_test python populate_leaderboard.py --users 20000
+#   DB_BACKEND=sqlite SQLITE_PATH=neuroflash_test.sqlite3 python populate_leaderboard.py --users 2000
+#
+# The same --seed always produces the same rows for a given user index, so
+# runs are reproducible regardless of --batch-users. Card histories are
+# replayed through scheduler.schedule(), which gives due dates, intervals and
+# ease factors the distribution real study produces. Every generated user can
+# log in as <username>@example.com with password "password" (load_test.py
+# relies on this). Like explain_harness.py, it refuses to write to a database
+# (or SQLite file) whose name does not contain "test" unless
+# --allow-any-database is given.
+
+import argparse
+import json
+import math
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+from werkzeug.security import generate_password_hash
+
+import config
+import scheduler
+import search_index
+
+USERNAME_PREFIX = 'gen_user_'
+PASSWORD = 'password'
+NOTE_TYPE_ID = 1
+
+SUBJECTS = ('biology', 'chemistry', 'physics', 'history', 'geography', 'spanish', 'french', 'german',
+            'japanese', 'anatomy', 'pharmacology', 'law', 'economics', 'statistics', 'programming',
+            'music-theory', 'art-history', 'philosophy', 'literature', 'astronomy')
+TAG_LEVELS = ('basics', 'intermediate', 'advanced', 'exam', 'vocab', 'review', 'chapter-1', 'chapter-2',
+              'chapter-3', 'chapter-4', 'chapter-5', 'lab', 'formulas', 'dates', 'definitions')
+SYLLABLES = ('ka', 'lo', 'mi', 'ne', 'ru', 'sa', 'ti', 'vo', 'ze', 'bra', 'cen', 'dor', 'fel', 'gan', 'hil',
+             'jun', 'kor', 'lem', 'mor', 'nix', 'pol', 'qua', 'ris', 'sol', 'tem', 'ul', 'ven', 'wex', 'yar')
+VOCABULARY_SIZE = 20000
+
+# hard / good / easy; each user's weights are drawn around these.
+RATINGS = (scheduler.RATING_HARD, scheduler.RATING_GOOD, scheduler.RATING_EASY)
+MAX_REPS_PER_CARD = 40
+
+
+def build_vocabulary(seed):
+    """Deterministic made-up words, most frequent first (used with Zipf weights)."""
+    rng = random.Random(f'{seed}:vocabulary')
+    words = dict.fromkeys(SUBJECTS)
+    while len(words) < VOCABULARY_SIZE:
+        words[''.join(rng.choices(SYLLABLES, k=rng.randint(2, 4)))] = None
+    return list(words)
+
+
+def zipf_cum_weights(count, exponent=1.05):
+    total = 0.0
+    cum_weights = []
+    for rank in range(1, count + 1):
+        total += 1.0 / rank ** exponent
+        cum_weights.append(total)
+    return cum_weights
+
+
+def lognormal_count(rng, mean, sigma, low, high):
+    # Lognormal with the requested mean, clamped: most users have a few decks, some have many.
+    mu = math.log(max(mean, 1)) - sigma * sigma / 2
+    return max(low, min(high, int(round(rng.lognormvariate(mu, sigma)))))
+
+
+def random_time(rng, day):
+    # Study happens mostly in the evening.
+    hour = min(23, max(6, int(rng.gauss(19, 3))))
+    return datetime(day.year, day.month, day.day, hour, rng.randint(0, 59), rng.randint(0, 59))
+
+
+class IdAllocator:
+    """Hands out explicit primary keys so a whole batch inserts without reading ids back."""
+
+    def __init__(self, conn, tables):
+        cur = conn.cursor()
+        self.next_ids = {}
+        for table in tables:
+            cur.execute(f"SELECT COALESCE(MAX(id), 0) AS max_id FROM {table}")
+            self.next_ids[table] = cur.fetchone()['max_id'] + 1
+        cur.close()
+
+    def take(self, table):
+        next_id = self.next_ids[table]
+        self.next_ids[table] = next_id + 1
+        return next_id
+
+
+class Batch:
+    def __init__(self):
+        self.users = []
+        self.user_stats = []
+        self.decks = []
+        self.deck_tags = []
+        self.notes = []
+        self.note_tags = []
+        self.note_terms = []
+        self.flashcards = []
+        self.review_logs = []
+
+    def counts(self):
+        return {name: len(rows) for name, rows in vars(self).items()}
+
+
+def simulate_card(rng, state, first_day, last_day, rating_weights, lateness):
+    """Replay reviews from first_day until last_day; return (state, reviews, last_review_day)."""
+    reviews = []
+    day = first_day
+    last_review_day = None
+    while day <= last_day and state['reps'] < MAX_REPS_PER_CARD:
+        rating = rng.choices(RATINGS, weights=rating_weights)[0]
+        after = scheduler.schedule(state, rating)
+        reviews.append((day, rating, state['intervals'], after['intervals'],
+                        state['ease_factor'], after['ease_factor']))
+        state = after
+        last_review_day = day
+        day = day + timedelta(days=after['intervals'] + (rng.randint(0, lateness) if rng.random() < 0.3 else 0))
+    return state, reviews, last_review_day
+
+
+def generate_user(index, args, ids, tag_ids, vocabulary, cum_weights, password_hash, points_by_rating, batch):
+    rng = random.Random(f'{args.seed}:user:{index}')
+    today = date.today()
+    history_start = today - timedelta(days=args.days_history)
+
+    user_id = ids.take('users')
+    username = f'{args.username_prefix}{index}'
+    created_day = history_start + timedelta(days=int(rng.betavariate(1.2, 2.0) * args.days_history))
+    # Roughly 60% of users are still active; the rest stopped at some point.
+    if rng.random() < 0.6:
+        last_active_day = today
+    else:
+        last_active_day = created_day + timedelta(days=rng.randint(0, (today - created_day).days))
+    diligence = rng.uniform(0.3, 1.0)
+    hard_weight = rng.uniform(0.05, 0.3)
+    easy_weight = rng.uniform(0.05, 0.35)
+    rating_weights = (hard_weight, 1.0 - hard_weight - easy_weight, easy_weight)
+    lateness = rng.randint(0, 5)
+
+    batch.users.append((user_id, username, f'{username}@example.com', password_hash, random_time(rng, created_day)))
+
+    points = 0
+    review_count = 0
+    review_days = set()
+    for _ in range(lognormal_count(rng, args.decks_per_user, 0.6, 1, 200)):
+        deck_id = ids.take('decks')
+        deck_day = created_day + timedelta(days=rng.randint(0, max(0, (last_active_day - created_day).days)))
+        subject = rng.choice(SUBJECTS)
+        batch.decks.append((deck_id, user_id, f'{subject.replace("-", " ").title()} {rng.randint(1, 9)}',
+                            f'Generated {subject} deck', random_time(rng, deck_day)))
+        deck_tag_ids = rng.sample(tag_ids, k=rng.randint(0, 3))
+        batch.deck_tags.extend((deck_id, tag_id) for tag_id in deck_tag_ids)
+
+        for _ in range(lognormal_count(rng, args.cards_per_deck, 0.8, 1, 5000)):
+            note_id = ids.take('notes')
+            note_day = deck_day + timedelta(days=rng.randint(0, max(0, (last_active_day - deck_day).days)))
+            field_values = {
+                'Front': ' '.join(rng.choices(vocabulary, cum_weights=cum_weights, k=rng.randint(2, 8))),
+                'Back': ' '.join([subject] + rng.choices(vocabulary, cum_weights=cum_weights, k=rng.randint(3, 25))),
+            }
+            batch.notes.append((note_id, user_id, NOTE_TYPE_ID, json.dumps(field_values), random_time(rng, note_day)))
+            batch.note_terms.extend(search_index.posting_rows(user_id, note_id, field_values))
+            if deck_tag_ids and rng.random() < 0.4:
+                batch.note_tags.append((note_id, rng.choice(deck_tag_ids)))
+
+            flashcard_id = ids.take('flashcards')
+            state = {'card_type': 'new', 'intervals': 0, 'ease_factor': 2.5, 'reps': 0, 'lapses': 0}
+            reviews = []
+            last_review_day = None
+            if rng.random() < diligence:
+                first_day = note_day + timedelta(days=int(rng.expovariate(1 / 3)))
+                state, reviews, last_review_day = simulate_card(rng, state, first_day, last_active_day,
+                                                                rating_weights, lateness)
+            if last_review_day is None:
+                due_date = note_day
+                last_reviewed = None
+            else:
+                due_date = last_review_day + timedelta(days=state['intervals'])
+                last_reviewed = random_time(rng, last_review_day)
+            batch.flashcards.append((flashcard_id, note_id, deck_id, state['card_type'], due_date, state['intervals'],
+                                     round(state['ease_factor'], 2), state['reps'], state['lapses'], last_reviewed,
+                                     random_time(rng, note_day)))
+
+            for review_day, rating, interval_before, interval_after, ease_before, ease_after in reviews:
+                batch.review_logs.append((ids.take('review_logs'), flashcard_id, user_id, rating,
+                                          random_time(rng, review_day), interval_before, interval_after,
+                                          round(ease_before, 2), round(ease_after, 2)))
+                points += points_by_rating[rating]
+                review_count += 1
+                review_days.add(review_day)
+
+    last_reviewed_date = max(review_days) if review_days else None
+    streak = 0
+    if last_reviewed_date is not None and (today - last_reviewed_date).days <= 1:
+        day = last_reviewed_date
+        while day in review_days:
+            streak += 1
+            day -= timedelta(days=1)
+    streak_start = last_reviewed_date - timedelta(days=streak - 1) if streak else None
+    batch.user_stats.append((user_id, points, review_count, last_reviewed_date, streak, streak_start))
+
+
+INSERTS = (
+    ('users', "INSERT INTO users (id, username, email, password_hash, created_at) VALUES (%s, %s, %s, %s, %s)"),
+    ('user_stats', "INSERT INTO user_stats (user_id, points, total_reviews, last_reviewed_date, review_streak_days, "
+                   "current_streak_start) VALUES (%s, %s, %s, %s, %s, %s)"),
+    ('decks', "INSERT INTO decks (id, user_id, name, description, created_at) VALUES (%s, %s, %s, %s, %s)"),
+    ('deck_tags', "INSERT IGNORE INTO deck_tags (deck_id, tag_id) VALUES (%s, %s)"),
+    ('notes', "INSERT INTO notes (id, user_id, note_type_id, field_values, created_at) VALUES (%s, %s, %s, %s, %s)"),
+    ('note_tags', "INSERT IGNORE INTO note_tags (note_id, tag_id) VALUES (%s, %s)"),
+    ('note_terms', search_index.INSERT_PREFIX + " VALUES (%s, %s, %s, %s)"),
+    ('flashcards', "INSERT INTO flashcards (id, note_id, deck_id, card_type, due_date, intervals, ease_factor, reps, "
+                   "lapses, last_reviewed, created_at) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"),
+    ('review_logs', "INSERT INTO review_logs (id, flashcard_id, user_id, rating, review_time, intervals_before, "
+                    "intervals_after, ease_factor_before, ease_factor_after) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)"),
+)
+
+
+def write_batch(conn, batch, rows_per_statement):
+    # executemany() folds each chunk into one multi-row INSERT.
+    cur = conn.cursor()
+    try:
+        for table, sql in INSERTS:
+            rows = getattr(batch, table)
+            for start in range(0, len(rows), rows_per_statement):
+                cur.executemany(sql, rows[start:start + rows_per_statement])
+        conn.commit()
+    finally:
+        cur.close()
+
+
+def ensure_reference_rows(conn):
+    cur = conn.cursor()
+    cur.execute("INSERT IGNORE INTO note_types (id, name, fields, templates) VALUES (%s, 'Basic', %s, '{}')",
+                (NOTE_TYPE_ID, json.dumps(['Front', 'Back'])))
+    tag_names = [f'{subject}-{level}' for subject in SUBJECTS for level in TAG_LEVELS]
+    cur.executemany("INSERT IGNORE INTO tags (name) VALUES (%s)", [(name,) for name in tag_names])
+    placeholders = ','.join(['%s'] * len(tag_names))
+    cur.execute(f"SELECT id FROM tags WHERE name IN ({placeholders}) ORDER BY name", tuple(tag_names))
+    tag_ids = [row['id'] for row in cur.fetchall()]
+    conn.commit()
+    cur.close()
+    return tag_ids
+
+
+def rebuild_derived_tables(neuroflash):
+    with neuroflash.app.app_context():
+        cur = neuroflash.mysql.connection.cursor()
+        try:
+            print('Reconciling user_stats counters and deck aggregates...')
+            neuroflash.reconcile_all_counters(cur)
+            neuroflash.mysql.connection.commit()
+            print('Backfilling review_daily_rollups...')
+            neuroflash.backfill_review_rollups(cur, 1, 2 ** 31 - 1, date.today() + timedelta(days=1))
+            neuroflash.mysql.connection.commit()
+            print('Refreshing the leaderboard snapshot...')
+            neuroflash.refresh_leaderboard_snapshot(cur)
+            neuroflash.mysql.connection.commit()
+        finally:
+            cur.close()
+
+
+def open_database():
+    # Returns (connection, statement toggling FK/unique checks as a format string).
+    if config.DB_BACKEND == 'sqlite':
+        import sqlite_storage
+        sqlite_storage.create_schema(config.SQLITE_PATH)
+        return sqlite_storage.SQLiteConnection(config.SQLITE_PATH), "PRAGMA foreign_keys = {}"
+    import migrate
+    conn = migrate.connect()
+    migrate.apply_pending(conn)
+    return conn, "SET SESSION foreign_key_checks = {0}, unique_checks = {0}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a deterministic NeuroFlash dataset at production scale.')
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--decks-per-user', type=float, default=6, help='mean; lognormally distributed')
+    parser.add_argument('--cards-per-deck', type=float, default=120, help='mean; lognormally distributed')
+    parser.add_argument('--days-history', type=int, default=180, help='how far back accounts and reviews go')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--username-prefix', default=USERNAME_PREFIX)
+    parser.add_argument('--batch-users', type=int, default=100, help='users generated and committed per batch')
+    parser.add_argument('--rows-per-statement', type=int, default=5000)
+    parser.add_argument('--skip-derived', action='store_true', help='do not rebuild counters, rollups and snapshot')
+    parser.add_argument('--allow-any-database', action='store_true')
+    args = parser.parse_args()
+
+    database = config.SQLITE_PATH if config.DB_BACKEND == 'sqlite' else config.DB_NAME
+    if 'test' not in (database or '') and not args.allow_any_database:
+        print(f'Refusing to populate database {database!r}: its name does not contain "test" '
+              '(pass --allow-any-database to override).', file=sys.stderr)
+        return 2
+
+    conn, set_checks = open_database()
+
+    cur = conn.cursor()
+    cur.execute("SELECT id FROM users WHERE username = %s", (f'{args.username_prefix}0',))
+    existing = cur.fetchone()
+    cur.close()
+    if existing:
+        print(f'Users with prefix {args.username_prefix!r} already exist; pick another --username-prefix.',
+              file=sys.stderr)
+        return 1
+
+    import app as neuroflash
+
+    tag_ids = ensure_reference_rows(conn)
+    vocabulary = build_vocabulary(args.seed)
+    cum_weights = zipf_cum_weights(len(vocabulary))
+    password_hash = generate_password_hash(PASSWORD)
+    ids = IdAllocator(conn, ('users', 'decks', 'notes', 'flashcards', 'review_logs'))
+
+    # The generated rows are consistent by construction, so skip per-row FK and unique checks.
+    cur = conn.cursor()
+    cur.execute(set_checks.format(0))
+    cur.close()
+
+    totals = {}
+    started = time.perf_counter()
+    for first in range(0, args.users, args.batch_users):
+        batch = Batch()
+        for index in range(first, min(first + args.batch_users, args.users)):
+            generate_user(index, args, ids, tag_ids, vocabulary, cum_weights, password_hash,
+                          neuroflash.POINTS_BY_RATING, batch)
+        write_batch(conn, batch, args.rows_per_statement)
+        for table, count in batch.counts().items():
+            totals[table] = totals.get(table, 0) + count
+        elapsed = time.perf_counter() - started
+        print(f'{min(first + args.batch_users, args.users)}/{args.users} users, '
+              f'{totals["flashcards"]} cards, {totals["review_logs"]} reviews ({elapsed:.0f}s)')
+
+    cur = conn.cursor()
+    cur.execute(set_checks.format(1))
+    cur.close()
+    conn.close()
+
+    if not args.skip_derived:
+        rebuild_derived_tables(neuroflash)
+
+    print('Rows inserted: ' + ', '.join(f'{table}={count}' for table, count in totals.items()))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,244 @@
+# rank_index.py
+#
+# In-memory order-statistics index over (points, user_id) for the leaderboard.
+# Users are kept in a bucketed sorted list ordered by points DESC, username ASC
+# (the leaderboard's display order) with a Fenwick tree over bucket sizes, so
+# rank lookups, page fetches and point updates are all O(log n) plus the size
+# of one bucket.
+
+import threading
+import time
+from bisect import bisect_left, insort
+
+_BUCKET_LOAD = 512
+
+
+class _Fenwick:
+    def __init__(self, sizes):
+        self._tree = [0] * (len(sizes) + 1)
+        for i, size in enumerate(sizes):
+            self.add(i, size)
+
+    def add(self, index, delta):
+        index += 1
+        while index < len(self._tree):
+            self._tree[index] += delta
+            index += index & -index
+
+    def prefix(self, count):
+        # Sum of the first `count` bucket sizes.
+        total = 0
+        while count > 0:
+            total += self._tree[count]
+            count -= count & -count
+        return total
+
+    def find(self, position):
+        # Bucket holding the element at `position`, and that element's offset in it.
+        index = 0
+        step = 1 << (len(self._tree).bit_length())
+        while step:
+            nxt = index + step
+            if nxt < len(self._tree) and self._tree[nxt] <= position:
+                index = nxt
+                position -= self._tree[nxt]
+            step >>= 1
+        return index, position
+
+
+class SortedKeyList:
+    def __init__(self, keys=()):
+        keys = sorted(keys)
+        self._buckets = [keys[i:i + _BUCKET_LOAD] for i in range(0, len(keys), _BUCKET_LOAD)]
+        self._len = len(keys)
+        self._rebuild()
+
+    def __len__(self):
+        return self._len
+
+    def _rebuild(self):
+        self._maxes = [bucket[-1] for bucket in self._buckets]
+        self._fenwick = _Fenwick([len(bucket) for bucket in self._buckets])
+
+    def add(self, key):
+        if not self._buckets:
+            self._buckets.append([key])
+            self._len = 1
+            self._rebuild()
+            return
+        index = min(bisect_left(self._maxes, key), len(self._buckets) - 1)
+        bucket = self._buckets[index]
+        insort(bucket, key)
+        self._maxes[index] = bucket[-1]
+        self._len += 1
+        if len(bucket) > 2 * _BUCKET_LOAD:
+            self._buckets[index:index + 1] = [bucket[:_BUCKET_LOAD], bucket[_BUCKET_LOAD:]]
+            self._rebuild()
+        else:
+            self._fenwick.add(index, 1)
+
+    def remove(self, key):
+        index = bisect_left(self._maxes, key)
+        if index == len(self._buckets):
+            raise KeyError(key)
+        bucket = self._buckets[index]
+        position = bisect_left(bucket, key)
+        if position == len(bucket) or bucket[position] != key:
+            raise KeyError(key)
+        del bucket[position]
+        self._len -= 1
+        if not bucket:
+            del self._buckets[index]
+            self._rebuild()
+        else:
+            self._maxes[index] = bucket[-1]
+            self._fenwick.add(index, -1)
+
+    def count_less(self, key):
+        """Number of stored keys strictly less than `key`."""
+        index = bisect_left(self._maxes, key)
+        if index == len(self._buckets):
+            return self._len
+        return self._fenwick.prefix(index) + bisect_left(self._buckets[index], key)
+
+    def slice(self, start, stop):
+        start = max(0, start)
+        stop = min(stop, self._len)
+        if start >= stop:
+            return []
+        index, offset = self._fenwick.find(start)
+        result = []
+        remaining = stop - start
+        while remaining and index < len(self._buckets):
+            chunk = self._buckets[index][offset:offset + remaining]
+            result.extend(chunk)
+            remaining -= len(chunk)
+            index += 1
+            offset = 0
+        return result
+
+
+class LeaderboardRankIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._keys = SortedKeyList()
+        self._users = {}
+        self._loaded_at = None
+        # Updates made while a load is reading rows, replayed by install().
+        self._pending = None
+
+    @staticmethod
+    def _key(user_id, points, username):
+        return (-points, username or '', user_id)
+
+    def is_loaded(self):
+        return self._loaded_at is not None
+
+    def ensure_loaded(self, load_rows):
+        """Seed from `load_rows()` (user_id, username, points) on first use."""
+        if self.is_loaded():
+            return
+        with self._load_lock:
+            if self.is_loaded():
+                return
+            self._load(load_rows)
+
+    def reseed(self, load_rows):
+        """Rebuild from `load_rows()` if seeded; readers keep the old index until the swap."""
+        if not self.is_loaded():
+            return
+        with self._load_lock:
+            self._load(load_rows)
+
+    def _load(self, load_rows):
+        self.begin_load()
+        try:
+            rows = load_rows()
+        except BaseException:
+            self.cancel_load()
+            raise
+        self.install(rows)
+
+    def begin_load(self):
+        """Call before reading rows for install(); updates from then on are replayed onto them."""
+        with self._lock:
+            self._pending = []
+
+    def cancel_load(self):
+        with self._lock:
+            self._pending = None
+
+    def install(self, rows):
+        """Replace the index with `rows` (user_id, username, points) loaded by the caller."""
+        users = {row['user_id']: (row['points'], row['username']) for row in rows if row['points'] > 0}
+        keys = SortedKeyList(self._key(user_id, points, username) for user_id, (points, username) in users.items())
+        with self._lock:
+            self._users = users
+            self._keys = keys
+            # Points earned while the rows were being read may not be in them.
+            for update, args in self._pending or ():
+                update(*args)
+            self._pending = None
+            self._loaded_at = time.monotonic()
+
+    def _set(self, user_id, points, username):
+        existing = self._users.get(user_id)
+        if existing is not None:
+            self._keys.remove(self._key(user_id, *existing))
+            del self._users[user_id]
+        if points > 0:
+            self._users[user_id] = (points, username)
+            self._keys.add(self._key(user_id, points, username))
+
+    def _add_points(self, user_id, delta, username):
+        existing = self._users.get(user_id)
+        points = (existing[0] if existing else 0) + delta
+        self._set(user_id, points, existing[1] if existing else username)
+
+    def _rename(self, user_id, username):
+        existing = self._users.get(user_id)
+        if existing is not None:
+            self._set(user_id, existing[0], username)
+
+    def _update(self, update, *args):
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((update, args))
+            if self._loaded_at is not None:
+                update(*args)
+
+    def add_points(self, user_id, delta, username):
+        self._update(self._add_points, user_id, delta, username)
+
+    def rename(self, user_id, username):
+        self._update(self._rename, user_id, username)
+
+    def total(self):
+        with self._lock:
+            return len(self._keys)
+
+    def _rank(self, points):
+        # RANK() OVER (ORDER BY points DESC): 1 + users with strictly more points.
+        return self._keys.count_less((-points,)) + 1
+
+    def page(self, offset, limit):
+        with self._lock:
+            rows = []
+            previous_points = None
+            rank = None
+            for position, (neg_points, username, user_id) in enumerate(self._keys.slice(offset, offset + limit), offset):
+                points = -neg_points
+                if points != previous_points:
+                    rank = self._rank(points) if previous_points is None else position + 1
+                    previous_points = points
+                rows.append({'user_id': user_id, 'username': username, 'points': points, 'rank': rank})
+            return rows
+
+    def rank_of(self, user_id):
+        with self._lock:
+            existing = self._users.get(user_id)
+            if existing is None:
+                return None
+            points, username = existing
+            return {'user_id': user_id, 'username': username, 'points': points, 'rank': self._rank(points)}
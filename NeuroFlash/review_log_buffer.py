@@ -0,0 +1,138 @@
+# review_log_buffer.py
+#
+# Opt-in write-behind buffer for review_logs rows. Requests hand their rows to
+# offer() and return immediately; a daemon thread drains the buffer with
+# multi-row INSERTs whenever batch_size rows are waiting or flush_interval
+# seconds have passed. Rows still buffered when the process is killed without a
+# clean shutdown are lost, which is the trade-off of write-behind.
+
+import threading
+import time
+import traceback
+from collections import deque
+
+
+class ReviewLogBuffer:
+    def __init__(self, write_rows, max_rows=10000, batch_size=500, flush_interval=1.0, retry_delay=5.0):
+        self._write_rows = write_rows
+        self.max_rows = max_rows
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retry_delay = retry_delay
+
+        self._rows = deque()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._stopping = False
+
+        self._enqueued_total = 0
+        self._rejected_total = 0
+        self._flushed_total = 0
+        self._flush_batches_total = 0
+        self._flush_failures_total = 0
+        self._last_flush_at = None
+        self._last_flush_seconds = None
+        self._last_flush_failed = False
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name='review-log-flusher', daemon=True)
+            self._thread.start()
+
+    def offer(self, rows):
+        """Queue rows for a later INSERT. Returns False, queueing nothing, when the buffer is full."""
+        rows = list(rows)
+        with self._lock:
+            if self._stopping or len(self._rows) + len(rows) > self.max_rows:
+                self._rejected_total += len(rows)
+                return False
+            enqueued_at = time.time()
+            self._rows.extend((enqueued_at, row) for row in rows)
+            self._enqueued_total += len(rows)
+            if len(self._rows) >= self.batch_size:
+                self._wakeup.notify()
+        return True
+
+    def flush(self):
+        """Synchronously write everything that is currently buffered."""
+        while self._flush_batch():
+            pass
+        with self._lock:
+            return len(self._rows) == 0
+
+    def stop(self, timeout=10.0):
+        with self._lock:
+            self._stopping = True
+            self._wakeup.notify()
+            thread = self._thread
+            self._thread = None
+        if thread is not None:
+            thread.join(timeout)
+        self.flush()
+
+    def stats(self):
+        with self._lock:
+            depth = len(self._rows)
+            oldest_age = time.time() - self._rows[0][0] if depth else 0.0
+            return {
+                'running': self._thread is not None,
+                'depth': depth,
+                'capacity': self.max_rows,
+                'oldest_row_age_seconds': round(oldest_age, 3),
+                'enqueued_total': self._enqueued_total,
+                'rejected_total': self._rejected_total,
+                'flushed_total': self._flushed_total,
+                'flush_batches_total': self._flush_batches_total,
+                'flush_failures_total': self._flush_failures_total,
+                'last_flush_at': self._last_flush_at,
+                'last_flush_seconds': self._last_flush_seconds,
+                'last_flush_failed': self._last_flush_failed,
+            }
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._stopping and len(self._rows) < self.batch_size:
+                    self._wakeup.wait(self.flush_interval)
+                if self._stopping:
+                    return
+            while self._flush_batch():
+                with self._lock:
+                    if self._stopping or len(self._rows) < self.batch_size:
+                        break
+            with self._lock:
+                if self._last_flush_failed and not self._stopping:
+                    self._wakeup.wait(self.retry_delay)
+
+    def _flush_batch(self):
+        # Serialise flushes so a shutdown flush cannot interleave with the thread.
+        with self._flush_lock:
+            with self._lock:
+                if not self._rows:
+                    return False
+                batch = [self._rows.popleft() for _ in range(min(self.batch_size, len(self._rows)))]
+
+            started = time.perf_counter()
+            try:
+                self._write_rows([row for _, row in batch])
+            except Exception:
+                traceback.print_exc()
+                with self._lock:
+                    # Put the batch back in front so ordering is preserved for the retry.
+                    self._rows.extendleft(reversed(batch))
+                    self._flush_failures_total += 1
+                    self._last_flush_failed = True
+                return False
+
+            with self._lock:
+                self._flushed_total += len(batch)
+                self._flush_batches_total += 1
+                self._last_flush_at = time.time()
+                self._last_flush_seconds = round(time.perf_counter() - started, 4)
+                self._last_flush_failed = False
+            return True
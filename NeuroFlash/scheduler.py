@@ -0,0 +1,220 @@
+# scheduler.py
+#
+# SM-2 style scheduling used by the review endpoints. schedule() handles one
+# card; schedule_batch() applies the same rules to whole arrays with NumPy for
+# bulk work (replays, migrations, simulations). Run this module directly for a
+# scalar vs vectorized micro-benchmark.
+
+import argparse
+import random
+import time
+from datetime import date, timedelta
+
+try:
+    import numpy as np
+except ImportError:  # numpy is only needed for the batch kernel
+    np = None
+
+RATING_HARD = 1
+RATING_GOOD = 2
+RATING_EASY = 3
+
+CARD_TYPES = ('new', 'learning', 'review')
+CARD_TYPE_CODES = {name: code for code, name in enumerate(CARD_TYPES)}
+
+MIN_EASE_FACTOR = 1.3
+MAX_EASE_FACTOR = 5.0
+EASY_EASE_STEP = 0.15
+HARD_EASE_STEP = 0.20
+LEARNING_GROWTH = 1.2
+NEW_EASY_INTERVAL = 4
+DEFAULT_EASE_BONUS = 1.3
+
+
+def schedule(card, rating, ease_bonus=DEFAULT_EASE_BONUS):
+    """Return the card's state after one review.
+
+    ``card`` is any mapping with card_type, intervals, ease_factor, reps and
+    lapses (a flashcards row works as-is).
+    """
+    current_interval = card['intervals']
+    current_ease_factor = card['ease_factor']
+    current_card_type = card['card_type']
+
+    new_reps = card['reps'] + 1
+    new_lapses = card['lapses']
+    new_card_type = current_card_type
+    new_ease_factor = current_ease_factor
+    new_interval = current_interval
+
+    if rating == RATING_EASY:
+        if current_card_type == 'new':
+            new_interval = NEW_EASY_INTERVAL
+        elif current_card_type == 'learning':
+            new_interval = 1
+        else:
+            new_interval = round(current_interval * current_ease_factor * ease_bonus)
+        new_ease_factor = current_ease_factor + EASY_EASE_STEP
+        new_card_type = 'review'
+
+    elif rating == RATING_GOOD:
+        if current_card_type == 'new':
+            new_interval = 1
+            new_card_type = 'learning'
+        elif current_card_type == 'learning':
+            new_interval = max(1, round(current_interval * LEARNING_GROWTH))
+            new_card_type = 'learning'
+        else:
+            new_interval = round(current_interval * current_ease_factor)
+
+    elif rating == RATING_HARD:
+        new_lapses += 1
+        new_ease_factor = max(MIN_EASE_FACTOR, current_ease_factor - HARD_EASE_STEP)
+        new_interval = 1
+        new_card_type = 'learning'
+
+    return {
+        'card_type': new_card_type,
+        'intervals': max(1, int(round(new_interval))),
+        'ease_factor': max(MIN_EASE_FACTOR, min(MAX_EASE_FACTOR, new_ease_factor)),
+        'reps': new_reps,
+        'lapses': new_lapses
+    }
+
+
+def encode_card_types(card_types):
+    """Map card_type strings to the integer codes used by schedule_batch()."""
+    _require_numpy()
+    try:
+        return np.fromiter((CARD_TYPE_CODES[t] for t in card_types), dtype=np.int8)
+    except KeyError as e:
+        raise ValueError(f'Unknown card type: {e.args[0]!r}') from None
+
+
+def decode_card_types(codes):
+    return [CARD_TYPES[code] for code in codes]
+
+
+def schedule_batch(intervals, ease_factors, card_types, ratings, ease_bonus=DEFAULT_EASE_BONUS,
+                   reps=None, lapses=None, today=None):
+    """Vectorized schedule() over arrays of cards.
+
+    ``card_types`` may be integer codes (see CARD_TYPE_CODES) or strings.
+    ``ease_bonus`` may be a scalar or a per-card array. Returns a dict of
+    arrays with the same keys as schedule(), plus ``due_date`` as
+    datetime64[D] when ``today`` is given.
+    """
+    _require_numpy()
+
+    interval = np.asarray(intervals, dtype=np.float64)
+    ease = np.asarray(ease_factors, dtype=np.float64)
+    rating = np.asarray(ratings, dtype=np.int8)
+    bonus = np.asarray(ease_bonus, dtype=np.float64)
+
+    type_codes = np.asarray(card_types)
+    if type_codes.dtype.kind in 'UO':
+        type_codes = encode_card_types(type_codes)
+    type_codes = type_codes.astype(np.int8, copy=False)
+
+    if not (interval.shape == ease.shape == rating.shape == type_codes.shape):
+        raise ValueError('intervals, ease_factors, card_types and ratings must have the same shape')
+    if np.any((rating < RATING_HARD) | (rating > RATING_EASY)):
+        raise ValueError('ratings must be 1 (hard), 2 (good) or 3 (easy)')
+    if np.any((type_codes < 0) | (type_codes >= len(CARD_TYPES))):
+        raise ValueError('card_types contains an unknown card type code')
+
+    is_new = type_codes == CARD_TYPE_CODES['new']
+    is_learning = type_codes == CARD_TYPE_CODES['learning']
+    is_review = ~(is_new | is_learning)
+    easy = rating == RATING_EASY
+    good = rating == RATING_GOOD
+    hard = rating == RATING_HARD
+
+    # np.round rounds half to even, exactly like Python's round() in schedule().
+    new_interval = np.select(
+        [easy & is_new, easy & is_learning, easy & is_review,
+         good & is_new, good & is_learning, good & is_review,
+         hard],
+        [NEW_EASY_INTERVAL, 1, np.round(interval * ease * bonus),
+         1, np.maximum(1, np.round(interval * LEARNING_GROWTH)), np.round(interval * ease),
+         1],
+        default=interval
+    )
+    new_interval = np.maximum(1, np.round(new_interval)).astype(np.int64)
+
+    new_ease = np.where(easy, ease + EASY_EASE_STEP, ease)
+    new_ease = np.where(hard, np.maximum(MIN_EASE_FACTOR, ease - HARD_EASE_STEP), new_ease)
+    new_ease = np.clip(new_ease, MIN_EASE_FACTOR, MAX_EASE_FACTOR)
+
+    new_type = np.where(easy | (good & is_review), CARD_TYPE_CODES['review'], CARD_TYPE_CODES['learning'])
+    new_type = new_type.astype(np.int8)
+
+    result = {
+        'card_type': new_type,
+        'intervals': new_interval,
+        'ease_factor': new_ease,
+    }
+    if reps is not None:
+        result['reps'] = np.asarray(reps, dtype=np.int64) + 1
+    if lapses is not None:
+        result['lapses'] = np.asarray(lapses, dtype=np.int64) + hard
+    if today is not None:
+        result['due_date'] = np.datetime64(today, 'D') + new_interval.astype('timedelta64[D]')
+    return result
+
+
+def _require_numpy():
+    if np is None:
+        raise RuntimeError('numpy is required for batch scheduling; install it with "pip install numpy"')
+
+
+def _benchmark(count, seed):
+    rng = random.Random(seed)
+    card_types = [rng.choice(CARD_TYPES) for _ in range(count)]
+    intervals = [0 if t == 'new' else rng.randint(1, 365) for t in card_types]
+    ease_factors = [round(rng.uniform(MIN_EASE_FACTOR, 3.5), 2) for _ in range(count)]
+    ratings = [rng.choice((RATING_HARD, RATING_GOOD, RATING_EASY)) for _ in range(count)]
+    today = date.today()
+
+    cards = [{'card_type': t, 'intervals': i, 'ease_factor': e, 'reps': 0, 'lapses': 0}
+             for t, i, e in zip(card_types, intervals, ease_factors)]
+    started = time.perf_counter()
+    scalar = []
+    for card, rating in zip(cards, ratings):
+        state = schedule(card, rating)
+        state['due_date'] = today + timedelta(days=state['intervals'])
+        scalar.append(state)
+    scalar_seconds = time.perf_counter() - started
+
+    type_codes = encode_card_types(card_types)
+    interval_array = np.asarray(intervals, dtype=np.int64)
+    ease_array = np.asarray(ease_factors, dtype=np.float64)
+    rating_array = np.asarray(ratings, dtype=np.int8)
+    started = time.perf_counter()
+    batch = schedule_batch(interval_array, ease_array, type_codes, rating_array,
+                           reps=np.zeros(count, dtype=np.int64), lapses=np.zeros(count, dtype=np.int64),
+                           today=today)
+    batch_seconds = time.perf_counter() - started
+
+    mismatches = sum(
+        1 for k, state in enumerate(scalar)
+        if state['intervals'] != batch['intervals'][k]
+        or CARD_TYPE_CODES[state['card_type']] != batch['card_type'][k]
+        or abs(state['ease_factor'] - batch['ease_factor'][k]) > 1e-9
+    )
+
+    print(f'cards:      {count}')
+    print(f'scalar:     {scalar_seconds:.3f}s ({count / scalar_seconds:,.0f} cards/s)')
+    print(f'vectorized: {batch_seconds:.3f}s ({count / batch_seconds:,.0f} cards/s)')
+    print(f'speedup:    {scalar_seconds / batch_seconds:.1f}x')
+    print(f'mismatches: {mismatches}')
+    return mismatches
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare scalar and vectorized SM-2 scheduling.')
+    parser.add_argument('--cards', type=int, default=1_000_000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    _require_numpy()
+    raise SystemExit(1 if _benchmark(args.cards, args.seed) else 0)
@@ -0,0 +1,281 @@
+-- SQLite version of "database sql schema.txt" (including every migration), used by
+-- sqlite_storage.py to create an embedded database on first start. Keep the two
+-- in sync: AUTO_INCREMENT ids become INTEGER PRIMARY KEY AUTOINCREMENT, ENUMs
+-- become CHECK constraints and inline indexes become CREATE INDEX statements.
+
+
+-- USERS TABLE
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username VARCHAR(50) UNIQUE NOT NULL,
+    email VARCHAR(100) UNIQUE,
+    password_hash VARCHAR(255) NOT NULL,
+    date_of_birth Date,
+    gender TEXT CHECK (gender IN ('Male', 'Female', 'Other')) DEFAULT 'Other',
+    country VARCHAR(100),
+    city VARCHAR(100),
+    created_at TIMESTAMP DEFAULT (datetime('now', 'localtime'))
+);
+
+-- DECKS TABLE
+CREATE TABLE IF NOT EXISTS decks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INT NOT NULL,
+    name VARCHAR(100) NOT NULL,
+    description TEXT,
+    created_at TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS idx_decks_user_created ON decks (user_id, created_at); -- deck list, newest first
+
+-- NOTE TYPES TABLE
+CREATE TABLE IF NOT EXISTS note_types (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name VARCHAR(100) NOT NULL,
+    fields TEXT, -- Stores JSON or comma-separated values
+    templates TEXT -- Stores JSON with front/back templates
+);
+
+-- NOTES TABLE
+CREATE TABLE IF NOT EXISTS notes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INT NOT NULL,
+    note_type_id INT NOT NULL,
+    field_values TEXT NOT NULL, -- Stores JSON or delimited data
+    created_at TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    FOREIGN KEY (note_type_id) REFERENCES note_types(id) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS idx_notes_user_created ON notes (user_id, created_at, id); -- card browser keyset pagination
+
+-- FLASHCARDS TABLE
+CREATE TABLE IF NOT EXISTS flashcards (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    note_id INT NOT NULL,
+    deck_id INT NOT NULL,
+    template_name VARCHAR(100) DEFAULT NULL,
+    card_type TEXT CHECK (card_type IN ('new', 'learning', 'review')) DEFAULT 'new',
+    due_date DATE DEFAULT NULL,
+    intervals INT DEFAULT 0,  -- (renamed from "intervels" for clarity)
+    ease_factor FLOAT DEFAULT 2.5,
+    reps INT DEFAULT 0,
+    lapses INT DEFAULT 0,
+    last_reviewed TIMESTAMP NULL DEFAULT NULL,
+    is_suspended BOOLEAN DEFAULT FALSE,
+    is_buried BOOLEAN DEFAULT FALSE,
+    flag_color TEXT CHECK (flag_color IN ('none', 'red', 'orange', 'green', 'blue')) DEFAULT 'none',
+    created_at TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+    FOREIGN KEY (note_id) REFERENCES notes(id) ON DELETE CASCADE,
+    FOREIGN KEY (deck_id) REFERENCES decks(id) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS idx_flashcards_deck_type_due ON flashcards (deck_id, card_type, due_date); -- study queue and due counts
+
+-- TAGS TABLE
+CREATE TABLE IF NOT EXISTS tags (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name VARCHAR(50) UNIQUE NOT NULL
+);
+
+-- NOTE_TAGS TABLE (Many-to-Many relationship between notes and tags)
+CREATE TABLE IF NOT EXISTS note_tags (
+    note_id INT NOT NULL,
+    tag_id INT NOT NULL,
+    PRIMARY KEY (note_id, tag_id),
+    FOREIGN KEY (note_id) REFERENCES notes(id) ON DELETE CASCADE,
+    FOREIGN KEY (tag_id) REFERENCES tags(id) ON DELETE CASCADE
+);
+
+-- NOTE_TERMS TABLE (Inverted index over note Front/Back text for card search)
+CREATE TABLE IF NOT EXISTS note_terms (
+    user_id INT NOT NULL,
+    term VARCHAR(64) COLLATE BINARY NOT NULL,
+    note_id INT NOT NULL,
+    tf SMALLINT NOT NULL DEFAULT 1,
+    PRIMARY KEY (user_id, term, note_id),
+    FOREIGN KEY (note_id) REFERENCES notes(id) ON DELETE CASCADE,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS idx_note_terms_note ON note_terms (note_id);
+
+-- DECK_TAGS TABLE (Many-to-Many relationship between decks and tags)
+CREATE TABLE IF NOT EXISTS deck_tags (
+    deck_id INT NOT NULL,
+    tag_id INT NOT NULL,
+    PRIMARY KEY (deck_id, tag_id),
+    FOREIGN KEY (deck_id) REFERENCES decks(id) ON DELETE CASCADE,
+    FOREIGN KEY (tag_id) REFERENCES tags(id) ON DELETE CASCADE
+);
+
+-- FLASHCARD_TAGS TABLE (Many-to-Many relationship between flashcards and tags)
+CREATE TABLE IF NOT EXISTS flashcard_tags (
+    flashcard_id INT NOT NULL,
+    tag_id INT NOT NULL,
+    PRIMARY KEY (flashcard_id, tag_id),
+    FOREIGN KEY (flashcard_id) REFERENCES flashcards(id) ON DELETE CASCADE,
+    FOREIGN KEY (tag_id) REFERENCES tags(id) ON DELETE CASCADE
+);
+
+-- USER SETTINGS
+CREATE TABLE IF NOT EXISTS settings (
+    user_id INT PRIMARY KEY,
+    new_cards_per_day INT DEFAULT 20,
+    max_reviews_per_day INT DEFAULT 100,
+    learning_steps VARCHAR(100) DEFAULT '1,10',
+    ease_bonus FLOAT DEFAULT 1.3,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+-- REVIEW LOGS
+CREATE TABLE IF NOT EXISTS review_logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    flashcard_id INT NOT NULL,
+    user_id INT NOT NULL,
+    rating INT CHECK (rating BETWEEN 1 AND 5),
+    review_time TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+    intervals_before INT,
+    intervals_after INT,
+    ease_factor_before FLOAT,
+    ease_factor_after FLOAT,
+    FOREIGN KEY (flashcard_id) REFERENCES flashcards(id) ON DELETE CASCADE,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS idx_review_logs_user_time ON review_logs (user_id, review_time); -- recent activity and rollup backfill
+
+-- REVIEW DAILY ROLLUPS: Per-user per-day review totals for the performance charts
+CREATE TABLE IF NOT EXISTS review_daily_rollups (
+    user_id INT NOT NULL,
+    review_date DATE NOT NULL,
+    review_count INT NOT NULL DEFAULT 0,
+    rating_sum INT NOT NULL DEFAULT 0,
+    rating_1_count INT NOT NULL DEFAULT 0,
+    rating_2_count INT NOT NULL DEFAULT 0,
+    rating_3_count INT NOT NULL DEFAULT 0,
+    time_spent_ms BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, review_date),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+-- DECK-SPECIFIC SETTINGS
+CREATE TABLE IF NOT EXISTS deck_settings (
+    deck_id INT PRIMARY KEY,
+    new_cards_per_day INT DEFAULT 20,
+    max_reviews_per_day INT DEFAULT 100,
+    learning_steps VARCHAR(100) DEFAULT '1,10',
+    ease_bonus FLOAT DEFAULT 1.3,
+    FOREIGN KEY (deck_id) REFERENCES decks(id) ON DELETE CASCADE
+);
+
+-- FILTERED DECKS
+CREATE TABLE IF NOT EXISTS filtered_decks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INT NOT NULL,
+    name VARCHAR(100) NOT NULL,
+    search_query TEXT NOT NULL,
+    is_active BOOLEAN DEFAULT TRUE,
+    created_at TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS filtered_deck_cards (
+    filtered_deck_id INT NOT NULL,
+    flashcard_id INT NOT NULL,
+    PRIMARY KEY (filtered_deck_id, flashcard_id),
+    FOREIGN KEY (filtered_deck_id) REFERENCES filtered_decks(id) ON DELETE CASCADE,
+    FOREIGN KEY (flashcard_id) REFERENCES flashcards(id) ON DELETE CASCADE
+);
+
+-- SHARED DECKS
+CREATE TABLE IF NOT EXISTS shared_decks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    deck_id INT NOT NULL,
+    shared_by INT NOT NULL,
+    title VARCHAR(100) NOT NULL,
+    description TEXT,
+    is_public BOOLEAN DEFAULT TRUE,
+    shared_at TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+    FOREIGN KEY (deck_id) REFERENCES decks(id) ON DELETE CASCADE,
+    FOREIGN KEY (shared_by) REFERENCES users(id) ON DELETE CASCADE
+);
+
+-- USER REVIEWS (App Feedback)
+CREATE TABLE IF NOT EXISTS user_reviews (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INT NOT NULL,
+    rating INT CHECK (rating BETWEEN 1 AND 5),
+    feedback TEXT,
+    submitted_at TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+-- USER PROGRESS: Tracks cumulative stats per user
+CREATE TABLE IF NOT EXISTS user_stats (
+    user_id INT PRIMARY KEY,
+    total_reviews INT DEFAULT 0,
+    total_cards_learned INT DEFAULT 0,
+    total_time_spent_seconds INT DEFAULT 0,
+    total_time_spent_ms BIGINT DEFAULT 0,  -- exact total; the seconds column is derived from it
+    review_streak_days INT DEFAULT 0,
+    current_streak_start DATE DEFAULT NULL,
+    last_reviewed_date DATE DEFAULT NULL,
+    points INT DEFAULT 0,
+    -- Dashboard counters, maintained incrementally by the write paths
+    total_decks INT DEFAULT 0,
+    total_cards INT DEFAULT 0,
+    cards_mastered INT DEFAULT 0,
+    new_cards INT DEFAULT 0,
+    learning_cards INT DEFAULT 0,
+    review_cards INT DEFAULT 0,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+-- DECK AGGREGATES: Per-deck counters for the deck list, maintained by the card and review write paths
+CREATE TABLE IF NOT EXISTS deck_aggregates (
+    deck_id INT PRIMARY KEY,
+    card_count INT NOT NULL DEFAULT 0,
+    mastered_count INT NOT NULL DEFAULT 0,
+    new_count INT NOT NULL DEFAULT 0,
+    last_studied TIMESTAMP NULL DEFAULT NULL,
+    FOREIGN KEY (deck_id) REFERENCES decks(id) ON DELETE CASCADE
+);
+
+-- DECK DUE COUNTS: Learning/review cards per deck and due date (due today = sum over due_date <= today)
+CREATE TABLE IF NOT EXISTS deck_due_counts (
+    deck_id INT NOT NULL,
+    due_date DATE NOT NULL,
+    cards INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (deck_id, due_date),
+    FOREIGN KEY (deck_id) REFERENCES decks(id) ON DELETE CASCADE
+);
+
+-- DATA VERSIONS: Per-user (deck_id = 0) and per-deck change counters behind the read endpoints' ETags
+CREATE TABLE IF NOT EXISTS data_versions (
+    user_id INT NOT NULL,
+    deck_id INT NOT NULL DEFAULT 0,
+    version BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, deck_id),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+-- REVIEW SESSIONS: Logs each session for time tracking and detailed analysis
+CREATE TABLE IF NOT EXISTS review_sessions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INT NOT NULL,
+    session_start TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+    session_end TIMESTAMP NULL,
+    cards_reviewed INT DEFAULT 0,
+    cards_learned INT DEFAULT 0,
+    time_spent_seconds INT DEFAULT 0,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+-- LEADERBOARD SNAPSHOTS: Cached leaderboard data for fast global ranking
+CREATE TABLE IF NOT EXISTS leaderboard_snapshots (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    captured_at TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+    user_id INT NOT NULL,
+    username VARCHAR(50) NOT NULL,
+    points INT NOT NULL,
+    rank INT NOT NULL,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS idx_leaderboard_snapshots_rank ON leaderboard_snapshots (rank, user_id); -- keyset pagination cursor
\ No newline at end of file
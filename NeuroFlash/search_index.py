@@ -0,0 +1,72 @@
+# search_index.py
+#
+# Tokenizer and query builder for the note_terms inverted index used by card
+# search. Each row of note_terms is one (user_id, term, note_id) posting with
+# the term's frequency in the note's Front/Back text; the write paths in app.py
+# keep it current and search_match_subquery() turns a search box string into a
+# prefix, multi-term AND match ranked by relevance.
+
+import re
+from collections import Counter
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+MAX_TERM_LENGTH = 64
+MAX_QUERY_TERMS = 8
+MAX_TERM_FREQUENCY = 32767  # note_terms.tf is a SMALLINT
+INDEXED_FIELDS = ('Front', 'Back')
+
+INSERT_PREFIX = "INSERT INTO note_terms (user_id, term, note_id, tf)"
+
+
+def tokenize(text):
+    if not isinstance(text, str):
+        return []
+    return [token[:MAX_TERM_LENGTH] for token in TOKEN_RE.findall(text.lower())]
+
+
+def term_frequencies(field_values):
+    counts = Counter()
+    if isinstance(field_values, dict):
+        for field in INDEXED_FIELDS:
+            counts.update(tokenize(field_values.get(field)))
+    return counts
+
+
+def posting_rows(user_id, note_id, field_values):
+    return [(user_id, term, note_id, min(tf, MAX_TERM_FREQUENCY))
+            for term, tf in term_frequencies(field_values).items()]
+
+
+def query_terms(search_text):
+    # Distinct terms in the order typed; extra terms beyond MAX_QUERY_TERMS are ignored.
+    return list(dict.fromkeys(tokenize(search_text)))[:MAX_QUERY_TERMS]
+
+
+def _escape_like(term):
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def search_match_subquery(user_id, terms):
+    """Return (sql, params) selecting (note_id, score) for notes matching every term.
+
+    Every term matches as a prefix (so the search box works while typing). An
+    exact term match counts double towards the score.
+    """
+    parts = []
+    params = []
+    for term in terms:
+        parts.append("""
+            SELECT note_id, SUM(CASE WHEN term = %s THEN 2 * tf ELSE tf END) AS score
+            FROM note_terms
+            WHERE user_id = %s AND term LIKE %s
+            GROUP BY note_id
+        """)
+        params.extend([term, user_id, _escape_like(term) + '%'])
+    sql = f"""
+        SELECT matched.note_id, SUM(matched.score) AS score
+        FROM ({' UNION ALL '.join(parts)}) AS matched
+        GROUP BY matched.note_id
+        HAVING COUNT(*) = %s
+    """
+    params.append(len(terms))
+    return sql, params
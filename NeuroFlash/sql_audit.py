@@ -0,0 +1,187 @@
+# sql_audit.py
+#
+# SQL instrumentation mode for finding slow statements and N+1 loops. Every
+# statement the pooled cursors send is fingerprinted (literals replaced by ?,
+# IN lists and multi-row VALUES collapsed) and two kinds of JSON lines are
+# written:
+#
+#   {"event": "slow_query", ...}  a statement slower than SQL_AUDIT_SLOW_MS
+#   {"event": "repeated_query", ...}  a request that ran one fingerprint more
+#                                      than SQL_AUDIT_REPEAT_THRESHOLD times
+#
+# MySQLdb interpolates parameters client-side, so the "params" shape (e.g.
+# "num*120,str") is recovered from the literals in the statement text.
+#
+# To check a seeded database in CI, run the EXPLAIN harness with auditing on
+# and summarize the log:
+#
+#   SQL_AUDIT_ENABLED=true SQL_AUDIT_LOG=sql_audit.jsonl DB_NAME=neuroflash_test python explain_harness.py
+#   python sql_audit.py sql_audit.jsonl --fail-on repeated_query
+
+import argparse
+import json
+import re
+import sys
+import threading
+import time
+from collections import defaultdict
+
+from flask import g, has_request_context, request
+
+# One pass, so quotes inside comments and comment markers inside strings
+# are both read correctly.
+_LITERAL_RE = re.compile(r"""
+    (?P<comment>/\*.*?\*/|--\s[^\n]*|\#[^\n]*)
+  | (?P<str>(?:_binary\s*)?'(?:[^'\\]|\\.|'')*')
+  | (?P<hex>\b0x[0-9a-f]+\b|\bx'[0-9a-f]*')
+  | (?P<num>(?<![\w.`])\d+(?:\.\d+)?(?:e[+-]?\d+)?(?![\w`]))
+  | (?P<null>(?<!IS\s)(?<!NOT\s)\bNULL\b)
+""", re.IGNORECASE | re.VERBOSE | re.DOTALL)
+_IN_LIST_RE = re.compile(r'\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', re.IGNORECASE)
+_TUPLE = r'\(\s*\?(?:\s*,\s*\?)*\s*\)'
+_VALUES_ROWS_RE = re.compile(rf'({_TUPLE})(?:\s*,\s*{_TUPLE})+')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+_LITERAL_KINDS = {'str': 'str', 'hex': 'bytes', 'num': 'num', 'null': 'null'}
+
+
+def _run_length(kinds):
+    parts = []
+    for kind in kinds:
+        if parts and parts[-1][0] == kind:
+            parts[-1][1] += 1
+        else:
+            parts.append([kind, 1])
+    return ','.join(kind if count == 1 else f'{kind}*{count}' for kind, count in parts)
+
+
+def fingerprint(statement):
+    """Return (fingerprint, params_shape) for an executed SQL statement."""
+    if isinstance(statement, bytes):
+        statement = statement.decode('utf-8', 'replace')
+    kinds = []
+
+    def replace_literal(match):
+        if match.lastgroup == 'comment':
+            return ' '
+        kinds.append(_LITERAL_KINDS[match.lastgroup])
+        return '?'
+
+    sql = _LITERAL_RE.sub(replace_literal, statement)
+    sql = _IN_LIST_RE.sub('IN (?+)', sql)
+    sql = _VALUES_ROWS_RE.sub(r'\1, ...', sql)
+    sql = _WHITESPACE_RE.sub(' ', sql).strip()
+    return sql, _run_length(kinds)
+
+
+class JsonLinesWriter:
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._stream = sys.stderr if path in (None, '', '-') else open(path, 'a', encoding='utf-8', buffering=1)
+
+    def write(self, record):
+        line = json.dumps(record, separators=(',', ':'), default=str)
+        with self._lock:
+            self._stream.write(line + '\n')
+
+
+class SqlAudit:
+    def __init__(self, app=None, mysql=None, log_path=None, slow_ms=100.0, repeat_threshold=10):
+        self.slow_ms = slow_ms
+        self.repeat_threshold = repeat_threshold
+        self.writer = JsonLinesWriter(log_path)
+        if app is not None:
+            self.init_app(app, mysql)
+
+    def init_app(self, app, mysql):
+        app.before_request(self._start_request)
+        app.teardown_request(self._finish_request)
+        mysql.add_query_listener(self._record_query)
+
+    def _start_request(self):
+        # fingerprint -> [count, total_ms, params shape of the first run]
+        g._sql_audit = {}
+
+    def _record_query(self, statement, seconds):
+        in_request = has_request_context() and '_sql_audit' in g
+        elapsed_ms = seconds * 1000.0
+        if not in_request and elapsed_ms < self.slow_ms:
+            return
+        sql, params = fingerprint(statement)
+        if in_request:
+            seen = g._sql_audit.get(sql)
+            if seen is None:
+                g._sql_audit[sql] = [1, elapsed_ms, params]
+            else:
+                seen[0] += 1
+                seen[1] += elapsed_ms
+        if elapsed_ms >= self.slow_ms:
+            self.writer.write({
+                'event': 'slow_query',
+                'ts': time.time(),
+                'endpoint': request.endpoint if in_request else None,
+                'method': request.method if in_request else None,
+                'fingerprint': sql,
+                'params': params,
+                'duration_ms': round(elapsed_ms, 3),
+            })
+
+    def _finish_request(self, exception):
+        statements = g.pop('_sql_audit', None)
+        if not statements:
+            return
+        for sql, (count, total_ms, params) in statements.items():
+            if count > self.repeat_threshold:
+                self.writer.write({
+                    'event': 'repeated_query',
+                    'ts': time.time(),
+                    'endpoint': request.endpoint,
+                    'method': request.method,
+                    'path': request.path,
+                    'fingerprint': sql,
+                    'params': params,
+                    'count': count,
+                    'total_ms': round(total_ms, 3),
+                    'statements_in_request': sum(entry[0] for entry in statements.values()),
+                })
+
+
+def summarize(records):
+    """Group audit records by (event, endpoint, fingerprint), worst first."""
+    groups = defaultdict(lambda: {'occurrences': 0, 'max_count': 0, 'max_ms': 0.0, 'total_ms': 0.0})
+    for record in records:
+        key = (record['event'], record.get('endpoint'), record['fingerprint'])
+        group = groups[key]
+        group['occurrences'] += 1
+        group['max_count'] = max(group['max_count'], record.get('count', 1))
+        duration_ms = record.get('duration_ms', record.get('total_ms', 0.0))
+        group['max_ms'] = max(group['max_ms'], duration_ms)
+        group['total_ms'] += duration_ms
+    return sorted(groups.items(), key=lambda item: item[1]['total_ms'], reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Summarize a SQL audit JSON-lines log.')
+    parser.add_argument('log', help='file written with SQL_AUDIT_LOG')
+    parser.add_argument('--fail-on', action='append', default=[], choices=['slow_query', 'repeated_query'],
+                        help='exit non-zero if any record of this event is present')
+    args = parser.parse_args()
+
+    with open(args.log, encoding='utf-8') as log_file:
+        records = [json.loads(line) for line in log_file if line.strip()]
+
+    failing = 0
+    for (event, endpoint, sql), group in summarize(records):
+        if event in args.fail_on:
+            failing += 1
+        print(f"{event:<15} {endpoint or '-':<32} x{group['occurrences']:<5} "
+              f"max_count={group['max_count']:<5} max_ms={group['max_ms']:.1f} total_ms={group['total_ms']:.1f}")
+        print(f'    {sql[:200]}')
+
+    if not records:
+        print('No slow or repeated statements recorded.')
+    return 1 if failing else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,467 @@
+# sqlite_storage.py
+#
+# Embedded SQLite backend for single-node and test deployments. SQLiteStorage
+# is a drop-in for PooledMySQL: `connection` hands out a per-app-context
+# connection whose cursors return dict rows, take %s placeholders and speak
+# the MySQL dialect app.py is written in, so the same endpoints run against
+# either database.
+#
+# The few MySQL-only constructs app.py uses are rewritten on the way in
+# (INSERT IGNORE, ON DUPLICATE KEY UPDATE, GROUP_CONCAT ... SEPARATOR,
+# multi-table DELETE, CREATE TABLE ... LIKE, AUTO_INCREMENT and inline indexes
+# in CREATE TABLE, RENAME TABLE) and CURDATE, NOW, GREATEST, LEAST, FLOOR,
+# GET_LOCK and RELEASE_LOCK are registered as functions. SELECT ... FOR UPDATE
+# takes the database write lock.
+# Translations are memoized per statement text, and connections are kept
+# open between requests so SQLite's prepared-statement cache stays warm.
+#
+# The database runs in WAL mode: readers never block the single writer, and
+# write transactions start IMMEDIATE so two requests never deadlock upgrading
+# a read lock. GET_LOCK always succeeds, which is only correct with one
+# process; run several workers against MySQL.
+
+import math
+import os
+import re
+import secrets
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import date, datetime
+from decimal import Decimal
+from functools import lru_cache
+
+from flask import g
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'schema_sqlite.sql')
+STATEMENT_CACHE_SIZE = 512
+BUSY_TIMEOUT_SECONDS = 10.0
+PRAGMAS = (
+    'PRAGMA journal_mode = WAL',
+    'PRAGMA synchronous = NORMAL',  # durable at checkpoints; a crash can only lose the last commits
+    'PRAGMA foreign_keys = ON',
+    'PRAGMA temp_store = MEMORY',
+    'PRAGMA cache_size = -65536',  # KiB, i.e. 64 MiB of page cache per connection
+    'PRAGMA mmap_size = 268435456',
+)
+
+
+def _convert_date(value):
+    try:
+        return date.fromisoformat(value[:10].decode())
+    except ValueError:
+        return value.decode()
+
+
+def _convert_datetime(value):
+    try:
+        return datetime.fromisoformat(value.decode())
+    except ValueError:
+        return value.decode()
+
+
+sqlite3.register_adapter(date, date.isoformat)
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(' '))
+sqlite3.register_adapter(Decimal, float)
+sqlite3.register_converter('DATE', _convert_date)
+sqlite3.register_converter('TIMESTAMP', _convert_datetime)
+sqlite3.register_converter('DATETIME', _convert_datetime)
+
+
+def _dict_row(cursor, row):
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+
+def _greatest(*values):
+    # Like MySQL, any NULL argument makes the result NULL.
+    return None if any(value is None for value in values) else max(values)
+
+
+def _least(*values):
+    return None if any(value is None for value in values) else min(values)
+
+
+def _floor(value):
+    return None if value is None else math.floor(value)
+
+
+class _GroupConcatDistinct:
+    def __init__(self):
+        self.values = []
+        self.separator = ','
+
+    def step(self, value, separator):
+        self.separator = separator
+        if value is not None and value not in self.values:
+            self.values.append(value)
+
+    def finalize(self):
+        return self.separator.join(str(value) for value in self.values) if self.values else None
+
+
+# --- MySQL dialect -> SQLite -------------------------------------------------
+
+_PLACEHOLDER_RE = re.compile(r'%\((\w+)\)s|%s|%%')
+_INSERT_IGNORE_RE = re.compile(r'\bINSERT\s+IGNORE\b', re.IGNORECASE)
+_ON_DUPLICATE_RE = re.compile(r'\bON\s+DUPLICATE\s+KEY\s+UPDATE\b', re.IGNORECASE)
+_VALUES_FUNC_RE = re.compile(r'\bVALUES\s*\(\s*`?(\w+)`?\s*\)', re.IGNORECASE)
+_GROUP_CONCAT_RE = re.compile(
+    r"\bGROUP_CONCAT\(\s*DISTINCT\s+(.+?)\s+SEPARATOR\s+('(?:[^']|'')*')\s*\)", re.IGNORECASE | re.DOTALL)
+_SESSION_VAR_RE = re.compile(r'@@SESSION\.auto_increment_increment', re.IGNORECASE)
+_DELETE_JOIN_RE = re.compile(r'^\s*DELETE\s+(\w+)\s+FROM\s+(\w+)\s+(?:AS\s+)?(\w+)\b(.*)$',
+                             re.IGNORECASE | re.DOTALL)
+_CREATE_LIKE_RE = re.compile(r'^\s*CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?`?(\w+)`?\s+LIKE\s+`?(\w+)`?\s*;?\s*$',
+                             re.IGNORECASE)
+_RENAME_TABLE_RE = re.compile(r'^\s*RENAME\s+TABLE\s+(.+?)\s*;?\s*$', re.IGNORECASE | re.DOTALL)
+_RENAME_PAIR_RE = re.compile(r'^`?(\w+)`?\s+TO\s+`?(\w+)`?$', re.IGNORECASE)
+_CREATE_TABLE_NAME_RE = re.compile(r'^\s*CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?("?\w+"?|`\w+`)',
+                                   re.IGNORECASE)
+_CREATE_INDEX_RE = re.compile(
+    r'^\s*CREATE\s+(UNIQUE\s+)?INDEX\s+(?:IF\s+NOT\s+EXISTS\s+)?"?(\w+)"?\s+ON\s+"?\w+"?\s*(\(.*)$',
+    re.IGNORECASE | re.DOTALL)
+_COPIED_INDEX_SUFFIX_RE = re.compile(r'_[0-9a-f]{8}$')
+_AUTO_INCREMENT_PK_RE = re.compile(r'\bINT\s+AUTO_INCREMENT\s+PRIMARY\s+KEY\b', re.IGNORECASE)
+_INLINE_INDEX_RE = re.compile(r',\s*(UNIQUE\s+)?(?:INDEX|KEY)\s+`?(\w+)`?\s*(\([^)]*\))', re.IGNORECASE)
+_SELECT_RE = re.compile(r'\bSELECT\b', re.IGNORECASE)
+_SELECT_TAIL_RE = re.compile(r'\b(?:WHERE|GROUP\s+BY|HAVING|ORDER\s+BY|LIMIT)\b', re.IGNORECASE)
+_INSERT_RE = re.compile(r'^\s*(INSERT|REPLACE)\b', re.IGNORECASE)
+_FOR_UPDATE_RE = re.compile(r'\s+FOR\s+UPDATE\s*$', re.IGNORECASE)
+
+
+def _placeholder(match):
+    if match.group(1):
+        return ':' + match.group(1)
+    return '?' if match.group(0) == '%s' else '%'
+
+
+@lru_cache(maxsize=4096)
+def translate(query, has_params=True):
+    """Rewrite one MySQL statement as SQLite. Without params, %s and %% are left alone, as MySQLdb does."""
+    sql = query
+    if has_params:
+        sql = _PLACEHOLDER_RE.sub(_placeholder, sql)
+    sql = _INSERT_IGNORE_RE.sub('INSERT OR IGNORE', sql)
+    sql = _GROUP_CONCAT_RE.sub(r'GROUP_CONCAT_DISTINCT(\1, \2)', sql)
+    sql = _SESSION_VAR_RE.sub('1', sql)
+    sql = _FOR_UPDATE_RE.sub('', sql)
+
+    duplicate = _ON_DUPLICATE_RE.search(sql)
+    if duplicate:
+        head, updates = sql[:duplicate.start()], sql[duplicate.end():]
+        # "WHERE true" keeps an INSERT ... SELECT from reading ON CONFLICT as a join constraint.
+        if _SELECT_RE.search(head) and not _SELECT_TAIL_RE.search(head):
+            head = head.rstrip() + ' WHERE true'
+        updates = _VALUES_FUNC_RE.sub(r'excluded.\1', updates)
+        sql = f'{head.rstrip()} ON CONFLICT DO UPDATE SET {updates}'
+
+    delete = _DELETE_JOIN_RE.match(sql)
+    if delete and delete.group(1) == delete.group(3):
+        alias, table, rest = delete.group(1), delete.group(2), delete.group(4)
+        sql = f'DELETE FROM {table} WHERE rowid IN (SELECT {alias}.rowid FROM {table} {alias}{rest})'
+    return sql
+
+
+def _copied_index_name(name):
+    # Index names are global in SQLite and RENAME keeps them, so copies get a fresh suffix.
+    return f'{_COPIED_INDEX_SUFFIX_RE.sub("", name)}_{secrets.token_hex(4)}'
+
+
+def _create_table_statements(query):
+    # MySQL CREATE TABLE with AUTO_INCREMENT ids and inline INDEX/KEY clauses.
+    table = _CREATE_TABLE_NAME_RE.match(query)
+    if not table or not (_AUTO_INCREMENT_PK_RE.search(query) or _INLINE_INDEX_RE.search(query)):
+        return None
+    name = table.group(1).strip('`"')
+    indexes = [f'CREATE {unique or ""}INDEX {_copied_index_name(index)} ON {name} {columns}'
+               for unique, index, columns in _INLINE_INDEX_RE.findall(query)]
+    sql = _AUTO_INCREMENT_PK_RE.sub('INTEGER PRIMARY KEY AUTOINCREMENT', _INLINE_INDEX_RE.sub('', query))
+    return [sql] + indexes
+
+
+def _ddl_statements(cursor, query):
+    """Expand the table DDL SQLite lacks into native statements, or return None."""
+    like = _CREATE_LIKE_RE.match(query)
+    if like:
+        new_table, source = like.groups()
+        cursor.execute("SELECT type, sql FROM sqlite_master WHERE tbl_name = ? AND sql IS NOT NULL "
+                       "ORDER BY type = 'index'", (source,))
+        statements = []
+        for row in cursor.fetchall():
+            ddl = row['sql']
+            if row['type'] == 'table':
+                statements.append(_CREATE_TABLE_NAME_RE.sub(f'CREATE TABLE {new_table}', ddl, count=1))
+                continue
+            index = _CREATE_INDEX_RE.match(ddl)
+            if index:
+                unique, name, columns = index.groups()
+                statements.append(f'CREATE {unique or ""}INDEX {_copied_index_name(name)} ON {new_table} {columns}')
+        if not statements:
+            raise sqlite3.OperationalError(f'no such table: {source}')
+        return statements
+
+    rename = _RENAME_TABLE_RE.match(query)
+    if rename:
+        statements = []
+        for pair in rename.group(1).split(','):
+            names = _RENAME_PAIR_RE.match(pair.strip())
+            if not names:
+                raise sqlite3.OperationalError(f'cannot translate RENAME TABLE clause: {pair.strip()}')
+            statements.append(f'ALTER TABLE {names.group(1)} RENAME TO {names.group(2)}')
+        return statements
+    return _create_table_statements(query)
+
+
+# --- DB-API wrappers ----------------------------------------------------------
+
+class SQLiteCursor:
+    """Buffered cursor with MySQLdb semantics: rowcount after SELECT, first id of a multi-row INSERT."""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self._cursor = connection.raw.cursor()
+        self._rows = deque()
+        self.description = None
+        self.rowcount = -1
+        self.lastrowid = None
+
+    def execute(self, query, args=None):
+        if isinstance(query, bytes):
+            query = query.decode()
+        started = time.perf_counter()
+        try:
+            ddl = _ddl_statements(self._cursor, query)
+            if ddl is not None:
+                for statement in ddl:
+                    self._cursor.execute(statement)
+            else:
+                if _FOR_UPDATE_RE.search(query) and not self.connection.raw.in_transaction:
+                    # SQLite locks the whole database, not rows: take the write lock
+                    # before reading, as SELECT ... FOR UPDATE would on the rows.
+                    self._cursor.execute('BEGIN IMMEDIATE')
+                self._cursor.execute(translate(query, args is not None), _params(args))
+            self._collect(query)
+        finally:
+            self.connection.notify(query, time.perf_counter() - started)
+        return self.rowcount
+
+    def executemany(self, query, args):
+        args = [_params(row) for row in args]
+        if not args:
+            return 0
+        started = time.perf_counter()
+        try:
+            self._cursor.executemany(translate(query, True), args)
+            self._collect(query)
+        finally:
+            self.connection.notify(query, time.perf_counter() - started)
+        return self.rowcount
+
+    def _collect(self, query):
+        self.description = self._cursor.description
+        if self.description is not None:
+            self._rows = deque(self._cursor.fetchall())
+            self.rowcount = len(self._rows)
+            self.lastrowid = None
+            return
+        self._rows = deque()
+        self.rowcount = self._cursor.rowcount
+        if _INSERT_RE.match(query) and self._cursor.lastrowid is not None:
+            # SQLite reports the last id of a multi-row INSERT; MySQL reports the first.
+            self.lastrowid = self._cursor.lastrowid - self.rowcount + 1 if self.rowcount > 0 else 0
+        else:
+            self.lastrowid = None
+
+    def fetchone(self):
+        return self._rows.popleft() if self._rows else None
+
+    def fetchmany(self, size=1):
+        return [self._rows.popleft() for _ in range(min(size, len(self._rows)))]
+
+    def fetchall(self):
+        rows = list(self._rows)
+        self._rows.clear()
+        return rows
+
+    def __iter__(self):
+        while self._rows:
+            yield self._rows.popleft()
+
+    def close(self):
+        self._rows.clear()
+        self._cursor.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _params(args):
+    if args is None:
+        return ()
+    if isinstance(args, dict):
+        return args
+    return tuple(args)
+
+
+class SQLiteConnection:
+    def __init__(self, path, query_listeners=()):
+        self.raw = connect(path)
+        self.query_listeners = query_listeners
+        self.created_at = time.monotonic()
+
+    def notify(self, statement, seconds):
+        for listener in self.query_listeners:
+            listener(statement, seconds)
+
+    def cursor(self):
+        return SQLiteCursor(self)
+
+    def commit(self):
+        self.raw.commit()
+
+    def rollback(self):
+        self.raw.rollback()
+
+    def ping(self, reconnect=False):
+        pass
+
+    def close(self):
+        self.raw.close()
+
+
+def connect(path):
+    """Open a tuned SQLite connection with the MySQL compatibility functions registered."""
+    raw = sqlite3.connect(path, timeout=BUSY_TIMEOUT_SECONDS, detect_types=sqlite3.PARSE_DECLTYPES,
+                          isolation_level='IMMEDIATE', check_same_thread=False,
+                          cached_statements=STATEMENT_CACHE_SIZE)
+    raw.row_factory = _dict_row
+    for pragma in PRAGMAS:
+        raw.execute(pragma)
+    raw.create_function('CURDATE', 0, lambda: date.today().isoformat())
+    raw.create_function('NOW', 0, lambda: datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+    raw.create_function('GREATEST', -1, _greatest, deterministic=True)
+    raw.create_function('LEAST', -1, _least, deterministic=True)
+    raw.create_function('FLOOR', 1, _floor, deterministic=True)
+    raw.create_function('GET_LOCK', 2, lambda name, timeout: 1)
+    raw.create_function('RELEASE_LOCK', 1, lambda name: 1)
+    raw.create_aggregate('GROUP_CONCAT_DISTINCT', 2, _GroupConcatDistinct)
+    return raw
+
+
+def create_schema(path, schema_path=SCHEMA_PATH):
+    """Create any missing tables and indexes. Safe to run on every start."""
+    with open(schema_path, encoding='utf-8') as schema_file:
+        script = schema_file.read()
+    raw = connect(path)
+    try:
+        raw.executescript(script)
+        raw.commit()
+    finally:
+        raw.close()
+
+
+class SQLiteConnectionPool:
+    """Keeps connections open between app contexts; SQLite connections are cheap but their statement caches are not."""
+
+    def __init__(self, path, query_listeners, max_idle=32):
+        self.path = path
+        self.query_listeners = query_listeners
+        self.max_idle = max_idle
+        self._idle = deque()
+        self._size = 0
+        self._in_use = 0
+        self._checkouts_total = 0
+        self._created_total = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+            self._in_use += 1
+            self._checkouts_total += 1
+            if conn is None:
+                self._size += 1
+                self._created_total += 1
+        if conn is None:
+            try:
+                conn = SQLiteConnection(self.path, self.query_listeners)
+            except Exception:
+                with self._lock:
+                    self._size -= 1
+                    self._in_use -= 1
+                raise
+        return conn
+
+    def release(self, conn, discard=False):
+        with self._lock:
+            self._in_use -= 1
+            if not discard and len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+            self._size -= 1
+        conn.close()
+
+    def close_all(self):
+        with self._lock:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+        for conn in idle:
+            conn.close()
+
+    def stats(self):
+        # Same keys as db_pool.ConnectionPool.stats() that /metrics reads; checkouts never wait.
+        with self._lock:
+            return {
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._in_use,
+                'checkouts_total': self._checkouts_total,
+                'wait_seconds_total': 0.0,
+                'created_total': self._created_total,
+            }
+
+
+class SQLiteStorage:
+    """Drop-in for PooledMySQL backed by an embedded SQLite database file."""
+
+    def __init__(self, app=None):
+        self.pool = None
+        self._query_listeners = []
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('SQLITE_PATH', 'neuroflash.sqlite3')
+        app.config.setdefault('SQLITE_MAX_IDLE_CONNECTIONS', 32)
+        path = app.config['SQLITE_PATH']
+        create_schema(path)
+        self.pool = SQLiteConnectionPool(path, self._query_listeners,
+                                         max_idle=app.config['SQLITE_MAX_IDLE_CONNECTIONS'])
+        app.teardown_appcontext(self.teardown)
+
+    def add_query_listener(self, listener):
+        """Call listener(statement, seconds) after every statement any cursor runs."""
+        self._query_listeners.append(listener)
+
+    @property
+    def connection(self):
+        conn = g.get('_sqlite_connection')
+        if conn is None:
+            conn = self.pool.acquire()
+            g._sqlite_connection = conn
+        return conn
+
+    def teardown(self, exception):
+        conn = g.pop('_sqlite_connection', None)
+        if conn is None:
+            return
+        try:
+            conn.rollback()
+        except Exception:
+            self.pool.release(conn, discard=True)
+            return
+        self.pool.release(conn)
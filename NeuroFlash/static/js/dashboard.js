@@ -275,6 +275,19 @@ document.addEventListener("DOMContentLoaded", () => {
     }
   }
 
+  function renderDecks(decks) {
+    decksGrid.innerHTML = ""; // Clear loading message
+    if (decks.length === 0) {
+      decksGrid.innerHTML = "<p>No decks found. Create your first deck!</p>";
+    } else {
+      decks.forEach((deck, index) => {
+        const deckCardElement = createDeckCardElement(deck);
+        deckCardElement.style.animationDelay = `${index * 0.05}s`;
+        decksGrid.appendChild(deckCardElement);
+      });
+    }
+  }
+
   async function loadDecks() {
     if (!decksGrid) {
         console.warn("decksGrid element not found. Cannot load decks.");
@@ -293,16 +306,7 @@ document.addEventListener("DOMContentLoaded", () => {
       const result = await response.json();
 
       if (result.success && result.decks) {
-        decksGrid.innerHTML = ""; // Clear loading message
-        if (result.decks.length === 0) {
-          decksGrid.innerHTML = "<p>No decks found. Create your first deck!</p>";
-        } else {
-          result.decks.forEach((deck, index) => {
-            const deckCardElement = createDeckCardElement(deck);
-            deckCardElement.style.animationDelay = `${index * 0.05}s`;
-            decksGrid.appendChild(deckCardElement);
-          });
-        }
+        renderDecks(result.decks);
       } else {
         decksGrid.innerHTML = `<p>Error loading decks: ${escapeHtml(result.errors?.general) || 'Unknown error'}</p>`;
       }
@@ -312,6 +316,15 @@ document.addEventListener("DOMContentLoaded", () => {
     }
   }
 
+  function renderDashboardStats(stats) {
+    if (statsTotalDecksElement) statsTotalDecksElement.textContent = stats.total_decks !== undefined ? stats.total_decks : 'N/A';
+    if (statsCardsMasteredElement) statsCardsMasteredElement.textContent = stats.cards_mastered !== undefined ? stats.cards_mastered : 'N/A';
+    
+    if (statsUserPointsElement) {
+        statsUserPointsElement.textContent = stats.points !== undefined ? stats.points.toLocaleString() : 'N/A';
+    }
+  }
+
   async function loadDashboardStats() {
     // console.log("loadDashboardStats called");
     if (statsTotalDecksElement) statsTotalDecksElement.textContent = '...';
@@ -335,14 +348,7 @@ document.addEventListener("DOMContentLoaded", () => {
       // console.log("Dashboard stats API result:", result);
 
       if (result.success && result.stats) {
-        const stats = result.stats;
-        // console.log("Stats object:", stats);
-        if (statsTotalDecksElement) statsTotalDecksElement.textContent = stats.total_decks !== undefined ? stats.total_decks : 'N/A';
-        if (statsCardsMasteredElement) statsCardsMasteredElement.textContent = stats.cards_mastered !== undefined ? stats.cards_mastered : 'N/A';
-        
-        if (statsUserPointsElement) {
-            statsUserPointsElement.textContent = stats.points !== undefined ? stats.points.toLocaleString() : 'N/A';
-        }
+        renderDashboardStats(result.stats);
       } else {
         console.error("API returned error for dashboard stats:", result);
         if (statsTotalDecksElement) statsTotalDecksElement.textContent = 'Error';
@@ -358,6 +364,24 @@ document.addEventListener("DOMContentLoaded", () => {
   }
 
   // --- Card Browser Tab Functions ---
+  function renderTagFilterOptions(tags) {
+    tagFilterSelect.innerHTML = '';
+    if (tags.length === 0) {
+        const noTagsOption = document.createElement('option');
+        noTagsOption.textContent = "No tags available";
+        noTagsOption.disabled = true; 
+        tagFilterSelect.appendChild(noTagsOption);
+    } else {
+        tags.forEach(tag => {
+            const option = document.createElement('option');
+            option.value = tag.id;
+            option.textContent = escapeHtml(tag.name);
+            tagFilterSelect.appendChild(option);
+        });
+    }
+    tagsLoadedSuccessfully = true;
+  }
+
   async function loadTagsForFilter() {
     if (!tagFilterSelect) {
         console.warn("tagFilterSelect element not found.");
@@ -379,21 +403,7 @@ document.addEventListener("DOMContentLoaded", () => {
         tagFilterSelect.innerHTML = ''; 
 
         if (result.success && result.tags) {
-            if (result.tags.length === 0) {
-                const noTagsOption = document.createElement('option');
-                noTagsOption.textContent = "No tags available";
-                noTagsOption.disabled = true; 
-                tagFilterSelect.appendChild(noTagsOption);
-            } else {
-                result.tags.forEach(tag => {
-                    const option = document.createElement('option');
-                    option.value = tag.id;
-                    option.textContent = escapeHtml(tag.name);
-                    tagFilterSelect.appendChild(option);
-                });
-            }
-            // console.log("Tags loaded and populated into select:", result.tags.length);
-            tagsLoadedSuccessfully = true;
+            renderTagFilterOptions(result.tags);
         } else {
             console.error("API error fetching tags:", result.errors);
             tagFilterSelect.innerHTML = '<option value="" disabled selected>Error: No tags or API issue</option>';
@@ -406,6 +416,18 @@ document.addEventListener("DOMContentLoaded", () => {
     }
   }
 
+  function renderDeckFilterOptions(decks) {
+    deckFilterSelect.innerHTML = '<option value="">All Decks</option>';
+    decks.forEach(deck => {
+        const option = document.createElement('option');
+        option.value = deck.id;
+        option.textContent = escapeHtml(deck.name);
+        deckFilterSelect.appendChild(option);
+    });
+    deckFilterSelect.value = "";
+    decksLoadedSuccessfully = true;
+  }
+
   async function loadDecksForFilter() {
     if (!deckFilterSelect) {
         console.warn("deckFilterSelect element not found.");
@@ -428,21 +450,12 @@ document.addEventListener("DOMContentLoaded", () => {
         deckFilterSelect.innerHTML = defaultAllDecksOptionHTML; 
 
         if (result.success && result.decks) {
-            if (result.decks.length > 0) {
-                result.decks.forEach(deck => {
-                    const option = document.createElement('option');
-                    option.value = deck.id;
-                    option.textContent = escapeHtml(deck.name);
-                    deckFilterSelect.appendChild(option);
-                });
-            }
-            // console.log("Decks loaded for filter:", result.decks.length);
-            decksLoadedSuccessfully = true;
+            renderDeckFilterOptions(result.decks);
         } else {
             console.error("API error fetching decks for filter:", result.errors);
             decksLoadedSuccessfully = false;
+            deckFilterSelect.value = ""; 
         }
-        deckFilterSelect.value = ""; 
     } catch (error) {
         console.error("Error in loadDecksForFilter:", error);
         deckFilterSelect.innerHTML = defaultAllDecksOptionHTML + '<option value="" disabled>Server error for decks</option>';
@@ -710,6 +723,35 @@ document.addEventListener("DOMContentLoaded", () => {
   }
   
   // --- Initial Load Logic ---
+  // First paint fetches decks, stats and tags in one request; the individual
+  // loaders above are still used to refresh after changes.
+  async function loadDashboardBootstrap() {
+    if (decksGrid) decksGrid.innerHTML = "<p>Loading decks...</p>";
+    try {
+      const response = await fetch("/api/dashboard/bootstrap");
+      if (!response.ok) {
+        if (response.status === 401) {
+          window.location.href = '/auth?tab=login&next=' + encodeURIComponent(window.location.pathname);
+          return;
+        }
+        throw new Error(`HTTP error! status: ${response.status}`);
+      }
+      const result = await response.json();
+      if (!result.success) {
+        throw new Error(result.errors?.general || 'Unknown error');
+      }
+      if (decksGrid) renderDecks(result.decks);
+      renderDashboardStats(result.stats);
+      if (tagFilterSelect) renderTagFilterOptions(result.tags);
+      if (deckFilterSelect) renderDeckFilterOptions(result.decks);
+    } catch (error) {
+      // Fall back to the individual endpoints so one failure doesn't blank the page.
+      console.error("Failed to load dashboard bootstrap:", error);
+      if (decksGrid) loadDecks();
+      loadDashboardStats();
+    }
+  }
+
   function initializeDashboard() {
     const initialActiveTabButton = document.querySelector(".tab-button.active") || document.querySelector('.tab-button[data-tab="decks"]');
     if (initialActiveTabButton) {
@@ -741,8 +783,7 @@ document.addEventListener("DOMContentLoaded", () => {
                 cardBrowserInitialMessage.style.display = 'block';
             }
         } else if (initialTargetTab === 'decks') {
-            if(decksGrid) loadDecks();
-            loadDashboardStats();
+            loadDashboardBootstrap();
         }
     } else { 
         // Fallback if no tab is initially marked active
@@ -751,8 +792,7 @@ document.addEventListener("DOMContentLoaded", () => {
         if (decksContent && decksButton) {
             decksButton.classList.add('active');
             decksContent.classList.add('active');
-            if(decksGrid) loadDecks();
-            loadDashboardStats();
+            loadDashboardBootstrap();
         } else {
             console.error("Default 'decks' tab or its button not found for fallback initialization.");
         }
@@ -9,8 +9,16 @@ document.addEventListener("DOMContentLoaded", () => {
     const difficultyButtons = document.querySelectorAll(".study-controls .control-btn");
     const deckSelectElement = document.getElementById("deck-select");
 
+    // A session holds every due card id, but content arrives a page at a
+    // time: studyCards only has the pages fetched so far.
     let studyCards = [];
+    let sessionCardIds = [];
+    let studySessionId = null;
+    let nextStudyCursor = null;
+    let studyPageRequest = null;
+    const STUDY_PREFETCH_REMAINING = 3;
     let currentCardIndex = 0;
+    let cardShownAt = null; // When the current card was displayed, for per-review time spent
     let currentDeckId = null; // This will now be updated by the dropdown listener
 
     function escapeHtml(unsafe) {
@@ -31,10 +39,17 @@ document.addEventListener("DOMContentLoaded", () => {
     async function fetchStudyCards(deckId) {
         console.log("fetchStudyCards called for deck ID:", deckId); // Log which deck ID is being fetched
 
+        // Make sure reviews from the previous deck are saved before its due cards are recomputed.
+        await flushPendingReviews();
+
         // Update global state BEFORE fetch completes, so UI reflects *attempt* to load new deck
         currentDeckId = deckId;
         currentCardIndex = 0; // Reset index for new deck
         studyCards = []; // Clear previous cards
+        sessionCardIds = [];
+        studySessionId = null;
+        nextStudyCursor = null;
+        studyPageRequest = null;
 
 
         // Reset UI to loading state
@@ -69,6 +84,9 @@ document.addEventListener("DOMContentLoaded", () => {
 
             if (result.success && result.cards) {
                 studyCards = result.cards;
+                sessionCardIds = result.card_ids || [];
+                studySessionId = result.session_id;
+                nextStudyCursor = result.next_cursor;
                 console.log("Fetched Study Cards:", studyCards);
 
                 if (studyCards.length === 0) {
@@ -98,6 +116,38 @@ document.addEventListener("DOMContentLoaded", () => {
         }
     }
   
+    function fetchNextStudyPage() {
+        if (!studySessionId || nextStudyCursor === null) return Promise.resolve();
+        if (studyPageRequest) return studyPageRequest;
+
+        const deckId = currentDeckId;
+        const sessionId = studySessionId;
+        studyPageRequest = (async () => {
+            try {
+                const params = new URLSearchParams({ session: sessionId, cursor: nextStudyCursor });
+                const response = await fetch(`/api/study/session/${deckId}/cards?${params}`);
+                const result = await response.json();
+                // Ignore pages for a session the user has already left.
+                if (sessionId !== studySessionId) return;
+                if (response.ok && result.success) {
+                    studyCards = studyCards.concat(result.cards);
+                    nextStudyCursor = result.next_cursor;
+                } else {
+                    console.error("Error loading study page:", result);
+                }
+            } catch (error) {
+                console.error("Failed to load study page:", error);
+            } finally {
+                if (sessionId === studySessionId) studyPageRequest = null;
+            }
+        })();
+        return studyPageRequest;
+    }
+
+    function sessionCardCount() {
+        return Math.max(sessionCardIds.length, studyCards.length);
+    }
+
     async function fetchDeckName(deckId) {
        console.log("fetchDeckName called for deck ID:", deckId); // Log which deck ID is being fetched
        try {
@@ -137,9 +187,10 @@ document.addEventListener("DOMContentLoaded", () => {
         flashcardElement.classList.remove("flipped");
         cardFrontElement.innerHTML = `<p>${escapeHtml(cardData.front)}</p>`;
         cardBackElement.innerHTML = `<p>${escapeHtml(cardData.back)}</p>`;
-        cardCounterElement.textContent = `Card ${currentCardIndex + 1} of ${studyCards.length}`;
-        progressBar.style.width = `${((currentCardIndex + 1) / studyCards.length) * 100}%`;
+        cardCounterElement.textContent = `Card ${currentCardIndex + 1} of ${sessionCardCount()}`;
+        progressBar.style.width = `${((currentCardIndex + 1) / sessionCardCount()) * 100}%`;
         flashcardElement.dataset.flashcardId = cardData.flashcard_id;
+        cardShownAt = Date.now();
     }
 
     flashcardElement.addEventListener("click", () => flashcardElement.classList.toggle("flipped"));
@@ -164,76 +215,150 @@ document.addEventListener("DOMContentLoaded", () => {
         });
     });
 
-    async function submitReview(flashcardId, ratingString) {
-        // Add loading indicator to the specific button
-        const clickedButton = document.querySelector(`.study-controls .control-btn[data-difficulty="${ratingString}"]`);
-        let originalButtonContent = null;
-        if (clickedButton) {
-             originalButtonContent = clickedButton.innerHTML;
-             clickedButton.innerHTML = '<span class="btn-loader"></span>'; // Use innerHTML for loader
+    // Reviews are queued locally and sent to /api/study/reviews in batches,
+    // so a study session costs a handful of requests instead of one per card.
+    const REVIEW_BATCH_SIZE = 10;
+    let pendingReviews = [];
+    let reviewFlushInFlight = null;
+
+    async function flushPendingReviews() {
+        if (reviewFlushInFlight) {
+            await reviewFlushInFlight;
         }
+        if (pendingReviews.length === 0) return true;
+
+        const batch = pendingReviews;
+        pendingReviews = [];
+
+        reviewFlushInFlight = (async () => {
+            try {
+                const response = await fetch('/api/study/reviews', {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json', 'Accept': 'application/json' },
+                    body: JSON.stringify({ reviews: batch }),
+                    // Lets a batch already on the wire finish if the user navigates away.
+                    keepalive: true,
+                });
+                const result = await response.json();
+                console.log("Submit Reviews API Result:", result);
+
+                if (response.ok && result.success) {
+                    if (result.rejected && result.rejected.length > 0) {
+                        reportRejectedReviews(result.rejected.length,
+                            [...new Set(result.rejected.map(r => r.error))].join(' '), result);
+                    }
+                    return true;
+                }
+                if (response.status >= 500) {
+                    // Server-side failure: keep the reviews so the next flush retries them.
+                    pendingReviews = batch.concat(pendingReviews);
+                    console.error("Error submitting reviews:", result);
+                } else {
+                    // The server rejected the batch; retrying would fail the same way.
+                    const reason = Object.values(result.errors || {}).join(' ') || `HTTP ${response.status}`;
+                    reportRejectedReviews(batch.length, reason, result);
+                }
+                return false;
+            } catch (error) {
+                console.error("Failed to submit reviews (catch):", error);
+                pendingReviews = batch.concat(pendingReviews);
+                return false;
+            } finally {
+                reviewFlushInFlight = null;
+            }
+        })();
+        return reviewFlushInFlight;
+    }
 
+    function reportRejectedReviews(count, reason, result) {
+        console.error(`Server rejected ${count} review(s):`, result);
+        alert(`${count} review(s) could not be saved: ${reason}`);
+    }
 
-        try {
-            const response = await fetch(`/api/study/review/${flashcardId}`, {
+    // On the way out there is no time to wait for a flush already in flight:
+    // hand whatever is still queued to the browser in one request it will
+    // deliver after the page is gone.
+    function sendPendingReviewsOnExit() {
+        if (pendingReviews.length === 0) return;
+        const body = JSON.stringify({ reviews: pendingReviews });
+        pendingReviews = [];
+
+        const queued = typeof navigator.sendBeacon === 'function' &&
+            navigator.sendBeacon('/api/study/reviews', new Blob([body], { type: 'application/json' }));
+        if (!queued) {
+            fetch('/api/study/reviews', {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json', 'Accept': 'application/json' },
-                body: JSON.stringify({ rating: ratingString }),
-            });
-            const result = await response.json();
-            console.log("Submit Review API Result:", result); // Log review result
+                body: body,
+                keepalive: true,
+            }).catch(error => console.error("Failed to submit reviews on exit:", error));
+        }
+    }
 
-            if (response.ok && result.success) {
-                currentCardIndex++;
-                if (currentCardIndex < studyCards.length) {
-                    loadCard(studyCards[currentCardIndex]);
-                } else {
-                    // --- End of study session ---
-                    cardCounterElement.textContent = `Completed ${studyCards.length} cards!`;
-                    progressBar.style.width = "100%";
-                    flashcardElement.classList.remove('flipped');
-                    cardFrontElement.innerHTML = `
-                        <div style="text-align: center; padding: 20px;">
-                            <h2>Session Complete!</h2>
-                            <p>You've reviewed all cards in this batch. Great job!</p>
-                            <p style="margin-top: 15px;">Select another deck above to continue studying.</p>
-                             <button class="btn secondary-btn" id="backToDashboardBtn" style="margin-top: 10px;">Back to Dashboard</button>
-                        </div>`;
-                    cardBackElement.innerHTML = "";
-                    document.querySelector('.study-controls').style.display = 'none';
+    async function submitReview(flashcardId, ratingString) {
+        pendingReviews.push({
+            flashcard_id: parseInt(flashcardId, 10),
+            rating: ratingString,
+            answered_at: new Date().toISOString(),
+            time_spent_ms: cardShownAt ? Date.now() - cardShownAt : null,
+        });
 
-                    // Focus/open dropdown
-                    if (deckSelectElement) {
-                         // Reset dropdown to prompt selection if it was pre-selected from URL
-                         deckSelectElement.value = ""; // Select the default option
-
-                        deckSelectElement.focus();
-                        if (typeof deckSelectElement.showPicker === 'function') {
-                            deckSelectElement.showPicker();
-                        } else {
-                            console.log("Select dropdown focused.");
-                        }
-                    }
-                    document.getElementById('backToDashboardBtn').addEventListener('click', () => {
-                        window.location.href = '/dashboard';
-                    });
+        try {
+            currentCardIndex++;
+            if (currentCardIndex >= studyCards.length) {
+                await fetchNextStudyPage();
+            }
+            if (currentCardIndex < studyCards.length) {
+                loadCard(studyCards[currentCardIndex]);
+                if (studyCards.length - currentCardIndex <= STUDY_PREFETCH_REMAINING) {
+                    fetchNextStudyPage();
+                }
+                if (pendingReviews.length >= REVIEW_BATCH_SIZE) {
+                    flushPendingReviews();
                 }
             } else {
-                console.error("Error submitting review:", result);
-                alert(`Error submitting review: ${result.errors?.general || result.message || 'Unknown error'}`);
+                // --- End of study session ---
+                await flushPendingReviews();
+                if (pendingReviews.length > 0) {
+                    alert("Some reviews could not be saved yet. They will be retried when you continue studying.");
+                }
+                cardCounterElement.textContent = `Completed ${currentCardIndex} cards!`;
+                progressBar.style.width = "100%";
+                flashcardElement.classList.remove('flipped');
+                cardFrontElement.innerHTML = `
+                    <div style="text-align: center; padding: 20px;">
+                        <h2>Session Complete!</h2>
+                        <p>You've reviewed all cards in this batch. Great job!</p>
+                        <p style="margin-top: 15px;">Select another deck above to continue studying.</p>
+                         <button class="btn secondary-btn" id="backToDashboardBtn" style="margin-top: 10px;">Back to Dashboard</button>
+                    </div>`;
+                cardBackElement.innerHTML = "";
+                document.querySelector('.study-controls').style.display = 'none';
+
+                // Focus/open dropdown
+                if (deckSelectElement) {
+                     // Reset dropdown to prompt selection if it was pre-selected from URL
+                     deckSelectElement.value = ""; // Select the default option
+
+                    deckSelectElement.focus();
+                    if (typeof deckSelectElement.showPicker === 'function') {
+                        deckSelectElement.showPicker();
+                    } else {
+                        console.log("Select dropdown focused.");
+                    }
+                }
+                document.getElementById('backToDashboardBtn').addEventListener('click', () => {
+                    window.location.href = '/dashboard';
+                });
             }
-        } catch (error) {
-            console.error("Failed to submit review (catch):", error);
-            alert("An unexpected error occurred while submitting the review.");
         } finally {
             difficultyButtons.forEach(b => b.disabled = false);
-            // Restore original content only to the button that was clicked if available
-            if (clickedButton && originalButtonContent !== null) {
-                 clickedButton.innerHTML = originalButtonContent;
-            }
         }
     }
 
+    // Send whatever is still queued when the user leaves the page.
+    window.addEventListener("pagehide", sendPendingReviewsOnExit);
+
     async function populateDeckSelector() {
         console.log("Attempting to populate deck selector...");
         try {
@@ -282,6 +407,9 @@ document.addEventListener("DOMContentLoaded", () => {
                console.log("Selected default option. Clearing current study session.");
                currentDeckId = null; // Reset global state
                studyCards = [];
+               sessionCardIds = [];
+               studySessionId = null;
+               nextStudyCursor = null;
                currentCardIndex = 0;
                // Reset UI to initial state
                deckTitleElement.textContent = "NeuroFlash Study";
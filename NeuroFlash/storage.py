@@ -0,0 +1,23 @@
+# storage.py
+#
+# Chooses the database backend from DB_BACKEND. Both backends have the
+# PooledMySQL interface app.py relies on: `connection` (a per-app-context
+# connection whose cursors return dict rows and accept MySQL-dialect SQL with
+# %s placeholders), add_query_listener(), pool.stats() and teardown on
+# app-context exit. Each backend is imported lazily, so an SQLite deployment
+# does not need MySQLdb installed.
+
+import config
+
+BACKENDS = ('mysql', 'sqlite')
+
+
+def create_storage(app):
+    if config.DB_BACKEND == 'sqlite':
+        from sqlite_storage import SQLiteStorage
+        app.config['SQLITE_PATH'] = config.SQLITE_PATH
+        return SQLiteStorage(app)
+    if config.DB_BACKEND != 'mysql':
+        raise ValueError(f'DB_BACKEND must be one of {", ".join(BACKENDS)}, not {config.DB_BACKEND!r}')
+    from db_pool import PooledMySQL
+    return PooledMySQL(app)
@@ -0,0 +1,72 @@
+# conftest.py
+#
+# The suite runs against the embedded SQLite backend, so it needs neither a
+# MySQL server nor MySQLdb. app.py reads config at import time, so the
+# environment is set here before any test module imports it.
+
+import itertools
+import os
+import sys
+import tempfile
+
+import pytest
+
+_DATA_DIR = tempfile.mkdtemp(prefix='neuroflash-tests-')
+os.environ.update(
+    DB_BACKEND='sqlite',
+    SQLITE_PATH=os.path.join(_DATA_DIR, 'neuroflash.sqlite3'),
+    SECRET_KEY='test-secret',
+    SQL_AUDIT_ENABLED='false',
+    REVIEW_LOG_WRITE_BEHIND='false',
+    ADMIN_TOKEN='test-admin-token',
+)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_user_numbers = itertools.count(1)
+
+
+@pytest.fixture(scope='session')
+def flask_app():
+    import app as neuroflash
+    neuroflash.app.config['TESTING'] = True
+    return neuroflash.app
+
+
+@pytest.fixture
+def admin_headers():
+    return {'Authorization': f"Bearer {os.environ['ADMIN_TOKEN']}"}
+
+
+@pytest.fixture
+def make_client(flask_app):
+    """Return a factory for test clients, each signed in as a freshly created user."""
+    def make():
+        client = flask_app.test_client()
+        number = next(_user_numbers)
+        email = f'user{number}@example.com'
+        response = client.post('/api/signup', data={
+            'name': f'user{number}', 'email': email, 'password': 'Passw0rd!1',
+            'dob': '2000-01-01', 'gender': 'Other', 'country': 'PK', 'city': 'Lahore',
+        })
+        assert response.status_code in (200, 201), response.get_data(as_text=True)
+        response = client.post('/api/login', data={'email': email, 'password': 'Passw0rd!1'})
+        assert response.status_code == 200, response.get_data(as_text=True)
+        return client
+    return make
+
+
+@pytest.fixture
+def client(make_client):
+    """A test client signed in as a freshly created user."""
+    return make_client()
+
+
+@pytest.fixture
+def deck(client):
+    """Create a five-card deck for the signed-in user and return its id."""
+    response = client.post('/api/decks', json={
+        'name': 'Biology', 'description': 'Cells', 'tags': ['bio'],
+        'cards': [{'front': f'front {i}', 'back': f'back {i}'} for i in range(5)],
+    })
+    assert response.status_code in (200, 201), response.get_data(as_text=True)
+    return response.get_json()['deck']['id']
@@ -0,0 +1,40 @@
+import pytest
+
+ADMIN_ENDPOINTS = [
+    ('GET', '/api/admin/review-log-buffer'),
+    ('GET', '/api/admin/db-pool'),
+    ('POST', '/api/admin/search-index/rebuild?user_id=1'),
+    ('POST', '/api/admin/stats/reconcile'),
+    ('POST', '/api/admin/stats/backfill-review-rollups'),
+]
+
+
+@pytest.mark.parametrize('method, path', ADMIN_ENDPOINTS)
+def test_ordinary_user_is_refused(client, method, path):
+    response = client.open(path, method=method)
+
+    assert response.status_code == 403
+
+
+@pytest.mark.parametrize('method, path', ADMIN_ENDPOINTS)
+def test_wrong_token_is_refused(client, method, path):
+    response = client.open(path, method=method, headers={'Authorization': 'Bearer not-the-token'})
+
+    assert response.status_code == 403
+
+
+@pytest.mark.parametrize('method, path', ADMIN_ENDPOINTS)
+def test_admin_token_is_accepted(client, admin_headers, method, path):
+    response = client.open(path, method=method, headers=admin_headers)
+
+    assert response.status_code == 200, response.get_data(as_text=True)
+    assert response.get_json()['success']
+
+
+def test_admin_endpoints_are_disabled_without_a_token(client, admin_headers, monkeypatch):
+    import config
+
+    monkeypatch.setattr(config, 'ADMIN_TOKEN', None)
+
+    for method, path in ADMIN_ENDPOINTS:
+        assert client.open(path, method=method, headers=admin_headers).status_code == 403
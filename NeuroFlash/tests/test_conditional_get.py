@@ -0,0 +1,53 @@
+from datetime import date, timedelta
+
+
+def get_with_etag(client, url, etag=None):
+    headers = {'If-None-Match': etag} if etag else {}
+    return client.get(url, headers=headers)
+
+
+def test_unchanged_data_answers_304(client, deck):
+    first = get_with_etag(client, f'/api/decks/{deck}')
+    assert first.status_code == 200
+    assert first.headers['Cache-Control'] == 'private, no-cache'
+
+    second = get_with_etag(client, f'/api/decks/{deck}', first.headers['ETag'])
+
+    assert second.status_code == 304
+    assert second.headers['ETag'] == first.headers['ETag']
+    assert second.get_data() == b''
+
+
+def test_write_changes_the_etag(client, deck):
+    etag = get_with_etag(client, '/api/decks').headers['ETag']
+    deck_etag = get_with_etag(client, f'/api/decks/{deck}/cards').headers['ETag']
+
+    response = client.post(f'/api/decks/{deck}/cards', json={'front': 'new front', 'back': 'new back'})
+    assert response.status_code in (200, 201), response.get_data(as_text=True)
+
+    assert get_with_etag(client, '/api/decks', etag).status_code == 200
+    refreshed = get_with_etag(client, f'/api/decks/{deck}/cards', deck_etag)
+    assert refreshed.status_code == 200
+    assert len(refreshed.get_json()['cards']) == 6
+
+
+def test_etag_changes_at_midnight(client, deck, monkeypatch):
+    import app as neuroflash
+
+    etag = get_with_etag(client, f'/api/decks/{deck}').headers['ETag']
+
+    class Tomorrow(date):
+        @classmethod
+        def today(cls):
+            return date.today() + timedelta(days=1)
+
+    monkeypatch.setattr(neuroflash, 'date', Tomorrow)
+
+    assert get_with_etag(client, f'/api/decks/{deck}', etag).status_code == 200
+
+
+def test_etag_is_per_user(client, make_client):
+    # Both users are at data version 0, so only the user id tells them apart.
+    etag = get_with_etag(client, '/api/decks').headers['ETag']
+
+    assert get_with_etag(make_client(), '/api/decks', etag).status_code == 200
@@ -0,0 +1,122 @@
+import pytest
+
+
+def dashboard_stats(client):
+    response = client.get('/api/stats/dashboard')
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return response.get_json()['stats']
+
+
+@pytest.fixture
+def assert_counters_match_reconcile(admin_headers):
+    def check(client):
+        # The write paths maintain user_stats incrementally; a full recount must agree.
+        maintained = dashboard_stats(client)
+        assert client.post('/api/admin/stats/reconcile', headers=admin_headers).status_code == 200
+        assert dashboard_stats(client) == maintained
+        return maintained
+    return check
+
+
+def note_ids(client, deck_id):
+    return [card['note_id'] for card in client.get(f'/api/decks/{deck_id}/cards').get_json()['cards']]
+
+
+@pytest.fixture
+def ignore_deletes(flask_app):
+    """Make DELETEs on `table` affect no rows, as if another request got there first."""
+    import app as neuroflash
+
+    def execute(statement):
+        with flask_app.app_context():
+            cur = neuroflash.mysql.connection.cursor()
+            cur.execute(statement)
+            neuroflash.mysql.connection.commit()
+            cur.close()
+
+    tables = []
+
+    def install(table):
+        execute(f"CREATE TRIGGER ignore_{table}_delete BEFORE DELETE ON {table} BEGIN SELECT RAISE(IGNORE); END")
+        tables.append(table)
+
+    yield install
+    for table in tables:
+        execute(f"DROP TRIGGER ignore_{table}_delete")
+
+
+def test_counters_after_create(client, deck, assert_counters_match_reconcile):
+    stats = assert_counters_match_reconcile(client)
+    assert (stats['total_decks'], stats['total_cards'], stats['new_cards']) == (1, 5, 5)
+
+
+def test_counters_after_review(client, deck, assert_counters_match_reconcile):
+    card_ids = client.get(f'/api/study/session/{deck}').get_json()['card_ids']
+    response = client.post('/api/study/reviews', json={'reviews': [
+        {'flashcard_id': card_ids[0], 'rating': 'easy'},
+        {'flashcard_id': card_ids[1], 'rating': 'hard'},
+    ]})
+    assert response.status_code == 200, response.get_data(as_text=True)
+
+    stats = assert_counters_match_reconcile(client)
+    assert stats['new_cards'] == 3
+    assert stats['learning_cards'] + stats['review_cards'] == 2
+    assert stats['points'] == 550
+
+
+def test_counters_after_note_delete(client, deck, assert_counters_match_reconcile):
+    response = client.delete(f'/api/notes/{note_ids(client, deck)[0]}')
+    assert response.status_code == 200, response.get_data(as_text=True)
+
+    stats = assert_counters_match_reconcile(client)
+    assert (stats['total_cards'], stats['new_cards']) == (4, 4)
+    assert client.get(f'/api/decks/{deck}').get_json()['deck']['card_count'] == 4
+
+
+def test_counters_after_deck_delete(client, deck, assert_counters_match_reconcile):
+    response = client.delete(f'/api/decks/{deck}')
+    assert response.status_code == 200, response.get_data(as_text=True)
+
+    stats = assert_counters_match_reconcile(client)
+    assert (stats['total_decks'], stats['total_cards'], stats['new_cards']) == (0, 0, 0)
+
+
+def test_deck_already_deleted_leaves_counters(client, deck, ignore_deletes):
+    before = dashboard_stats(client)
+    ignore_deletes('decks')
+
+    response = client.delete(f'/api/decks/{deck}')
+
+    assert response.status_code == 400
+    assert dashboard_stats(client) == before
+
+
+def test_note_already_deleted_leaves_counters(client, deck, ignore_deletes):
+    before = dashboard_stats(client)
+    ignore_deletes('notes')
+
+    response = client.delete(f'/api/notes/{note_ids(client, deck)[0]}')
+
+    assert response.status_code == 400
+    assert dashboard_stats(client) == before
+
+
+def test_card_at_mastered_ease_counts_the_same_everywhere(flask_app, client, deck, admin_headers,
+                                                          assert_counters_match_reconcile):
+    import app as neuroflash
+
+    with flask_app.app_context():
+        cur = neuroflash.mysql.connection.cursor()
+        cur.execute("SELECT id FROM flashcards WHERE deck_id = %s ORDER BY id LIMIT 1", (deck,))
+        flashcard_id = cur.fetchone()['id']
+        cur.execute("UPDATE flashcards SET card_type = 'review', ease_factor = %s WHERE id = %s",
+                    (neuroflash.MASTERED_EASE_FACTOR, flashcard_id))
+        neuroflash.mysql.connection.commit()
+        cur.close()
+    assert client.post('/api/admin/stats/reconcile', headers=admin_headers).status_code == 200
+    assert dashboard_stats(client)['cards_mastered'] == 1
+
+    # The review path subtracts the old state with the Python check; a recount must still agree.
+    response = client.post('/api/study/reviews', json={'reviews': [{'flashcard_id': flashcard_id, 'rating': 'hard'}]})
+    assert response.status_code == 200, response.get_data(as_text=True)
+    assert assert_counters_match_reconcile(client)['cards_mastered'] == 0
@@ -0,0 +1,125 @@
+import threading
+
+import pytest
+
+from db_pool import ConnectionPool, PoolTimeout
+
+
+class FakeConnection:
+    def __init__(self, number):
+        self.number = number
+        self.closed = False
+        self.healthy = True
+
+    def ping(self):
+        if not self.healthy:
+            raise OSError('server has gone away')
+
+    def close(self):
+        self.closed = True
+
+
+class FakeDriver:
+    def __init__(self):
+        self.opened = []
+
+    def connect(self):
+        conn = FakeConnection(len(self.opened) + 1)
+        self.opened.append(conn)
+        return conn
+
+
+@pytest.fixture
+def driver():
+    return FakeDriver()
+
+
+def make_pool(driver, **kwargs):
+    options = {'min_size': 0, 'max_size': 2, 'checkout_timeout': 0.05}
+    options.update(kwargs)
+    return ConnectionPool(driver.connect, **options)
+
+
+def test_checkout_reuses_released_connections(driver):
+    pool = make_pool(driver)
+
+    first = pool.acquire()
+    pool.release(first)
+    second = pool.acquire()
+
+    assert second is first
+    assert len(driver.opened) == 1
+    stats = pool.stats()
+    assert (stats['size'], stats['in_use'], stats['checkouts_total']) == (1, 1, 2)
+
+
+def test_warm_opens_min_size(driver):
+    pool = make_pool(driver, min_size=2)
+
+    pool.warm()
+
+    assert pool.stats()['idle'] == 2
+    assert len(driver.opened) == 2
+
+
+def test_checkout_times_out_when_exhausted(driver):
+    pool = make_pool(driver, max_size=1)
+    pool.acquire()
+
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+
+    stats = pool.stats()
+    assert (stats['timeouts_total'], stats['size'], len(driver.opened)) == (1, 1, 1)
+
+
+def test_waiting_checkout_gets_the_released_connection(driver):
+    pool = make_pool(driver, max_size=1, checkout_timeout=5)
+    held = pool.acquire()
+    acquired = []
+    waiter = threading.Thread(target=lambda: acquired.append(pool.acquire()))
+    waiter.start()
+
+    pool.release(held)
+    waiter.join(timeout=5)
+
+    assert acquired == [held]
+    assert pool.stats()['timeouts_total'] == 0
+
+
+def test_connections_past_max_lifetime_are_recycled(driver):
+    pool = make_pool(driver, max_lifetime=60)
+    conn = pool.acquire()
+    conn.created_at -= 61
+
+    pool.release(conn)
+
+    assert conn.raw.closed
+    assert pool.acquire().raw is not conn.raw
+    stats = pool.stats()
+    assert (stats['recycled_total'], stats['size']) == (1, 1)
+
+
+def test_idle_connection_failing_ping_is_replaced(driver):
+    pool = make_pool(driver, health_check_after=0)
+    conn = pool.acquire()
+    pool.release(conn)
+    conn.raw.healthy = False
+
+    replacement = pool.acquire()
+
+    assert replacement.raw is not conn.raw
+    assert conn.raw.closed
+    assert pool.stats()['health_check_failures_total'] == 1
+
+
+def test_failed_connect_frees_the_slot(driver):
+    def connect():
+        raise OSError('connection refused')
+
+    pool = ConnectionPool(connect, min_size=0, max_size=1, checkout_timeout=0.05)
+
+    with pytest.raises(OSError):
+        pool.acquire()
+
+    assert (pool.stats()['size'], pool.stats()['in_use']) == (0, 0)
@@ -0,0 +1,75 @@
+import time
+
+import pytest
+
+from rank_index import LeaderboardRankIndex
+
+
+def snapshot_table_definition(flask_app):
+    import app as neuroflash
+
+    with flask_app.app_context():
+        cur = neuroflash.mysql.connection.cursor()
+        cur.execute("SELECT * FROM pragma_foreign_key_list('leaderboard_snapshots')")
+        foreign_keys = [(row['from'], row['table'], row['to']) for row in cur.fetchall()]
+        cur.execute("SELECT name FROM pragma_index_list('leaderboard_snapshots')")
+        indexes = [row['name'] for row in cur.fetchall()]
+        cur.close()
+    return foreign_keys, indexes
+
+
+def test_snapshot_refresh_keeps_foreign_key_and_index(flask_app, client, deck):
+    card_id = client.get(f'/api/study/session/{deck}').get_json()['card_ids'][0]
+    client.post('/api/study/reviews', json={'reviews': [{'flashcard_id': card_id, 'rating': 'easy'}]})
+
+    for _ in range(2):
+        response = client.post('/api/admin/populate-leaderboard')
+        assert response.status_code == 200, response.get_data(as_text=True)
+
+    foreign_keys, indexes = snapshot_table_definition(flask_app)
+    assert foreign_keys == [('user_id', 'users', 'id')]
+    assert any(name.startswith('idx_leaderboard_snapshots_rank') for name in indexes)
+    assert client.get('/api/leaderboard?cursor=').get_json()['leaderboard']
+
+
+def test_rank_index_seeded_at_startup(flask_app):
+    import app as neuroflash
+
+    deadline = time.monotonic() + 5
+    while not neuroflash.rank_index.is_loaded() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert neuroflash.rank_index.is_loaded()
+
+
+@pytest.mark.parametrize('load', ['ensure_loaded', 'reseed'])
+def test_rank_index_load_replays_points_added_meanwhile(load):
+    index = LeaderboardRankIndex()
+    if load == 'reseed':
+        index.install([])
+
+    def load_rows():
+        # A review commits and bumps the index after these rows were read.
+        index.add_points(1, 5, 'alice')
+        index.rename(2, 'bobby')
+        return [{'user_id': 1, 'username': 'alice', 'points': 10},
+                {'user_id': 2, 'username': 'bob', 'points': 20}]
+
+    getattr(index, load)(load_rows)
+    assert index.rank_of(1) == {'user_id': 1, 'username': 'alice', 'points': 15, 'rank': 2}
+    assert index.rank_of(2)['username'] == 'bobby'
+
+    index.add_points(1, 1, 'alice')
+    assert index.rank_of(1)['points'] == 16
+
+
+def test_rank_index_failed_load_stops_recording():
+    index = LeaderboardRankIndex()
+
+    def load_rows():
+        raise RuntimeError('database down')
+
+    with pytest.raises(RuntimeError):
+        index.ensure_loaded(load_rows)
+    index.add_points(1, 5, 'alice')
+    index.install([{'user_id': 1, 'username': 'alice', 'points': 10}])
+    assert index.rank_of(1)['points'] == 10
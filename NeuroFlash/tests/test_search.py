@@ -0,0 +1,53 @@
+def search(client, query):
+    response = client.get('/api/cards/search', query_string={'query': query})
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return response.get_json()
+
+
+def test_accented_and_plain_tokens_in_one_note(client):
+    response = client.post('/api/decks', json={
+        'name': 'French', 'description': '', 'tags': [],
+        'cards': [{'front': 'café', 'back': 'cafe'}],
+    })
+    assert response.status_code == 201, response.get_data(as_text=True)
+    deck_id = response.get_json()['deck']['id']
+
+    response = client.post(f'/api/decks/{deck_id}/cards', json={'front': 'Café au lait', 'back': 'cafe au lait'})
+    assert response.status_code in (200, 201), response.get_data(as_text=True)
+
+    note_id = client.get(f'/api/decks/{deck_id}/cards').get_json()['cards'][0]['note_id']
+    response = client.put(f'/api/notes/{note_id}', json={'front': 'résumé', 'back': 'resume café cafe'})
+    assert response.status_code == 200, response.get_data(as_text=True)
+
+    assert search(client, 'café')['cards']
+    assert search(client, 'résumé')['cards']
+    assert search(client, 'resume')['cards']
+
+
+def test_mysql_schema_compares_terms_byte_for_byte():
+    # SQLite compares text byte for byte already; MySQL 8 would fold "café"
+    # into "cafe" and reject the second posting as a duplicate key.
+    import os
+    import re
+
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    with open(os.path.join(root, 'database sql schema.txt'), encoding='utf-8') as schema_file:
+        schema = schema_file.read()
+    note_terms = re.search(r'CREATE TABLE note_terms \((.*?)\);', schema, re.DOTALL).group(1)
+    assert re.search(r'^\s*term VARCHAR\(64\) CHARACTER SET utf8mb4 COLLATE utf8mb4_bin\b', note_terms, re.MULTILINE)
+
+
+def test_rebuild_reindexes_the_given_user(client, deck, admin_headers):
+    user_id = client.get('/api/profile').get_json()['profile']['id']
+
+    response = client.post(f'/api/admin/search-index/rebuild?user_id={user_id}', headers=admin_headers)
+
+    assert response.status_code == 200, response.get_data(as_text=True)
+    assert response.get_json()['notes_indexed'] == 5
+    assert search(client, 'front')['cards']
+
+
+def test_rebuild_needs_a_user(client, admin_headers):
+    response = client.post('/api/admin/search-index/rebuild', headers=admin_headers)
+
+    assert response.status_code == 400
@@ -0,0 +1,33 @@
+import pytest
+
+from sql_audit import fingerprint
+
+
+@pytest.mark.parametrize('statement, expected', [
+    ("SELECT * FROM users WHERE id = 42 AND email = 'a@b.c'",
+     ('SELECT * FROM users WHERE id = ? AND email = ?', 'num,str')),
+    ("SELECT id FROM flashcards WHERE id IN (1, 2, 3) AND deck_id = 7",
+     ('SELECT id FROM flashcards WHERE id IN (?+) AND deck_id = ?', 'num*4')),
+    ("INSERT INTO t (a, b) VALUES (1, 'x'), (2, 'y'), (3, NULL)",
+     ('INSERT INTO t (a, b) VALUES (?, ?), ...', 'num,str,num,str,num,null')),
+    ("SELECT x FROM t WHERE h = 0x1f AND f = 1.5e3",
+     ('SELECT x FROM t WHERE h = ? AND f = ?', 'bytes,num')),
+    ("SELECT `rank` FROM t2 WHERE note IS NULL AND t2.col1 = 5",
+     ('SELECT `rank` FROM t2 WHERE note IS NULL AND t2.col1 = ?', 'num')),
+])
+def test_fingerprint(statement, expected):
+    assert fingerprint(statement) == expected
+
+
+def test_fingerprint_reads_quotes_and_comments_together():
+    statement = "SELECT * FROM t WHERE s = 'it''s -- not a comment' /* 'quoted' */ AND v = 'a\\'b' -- 'x'\n LIMIT 10"
+
+    assert fingerprint(statement) == ('SELECT * FROM t WHERE s = ? AND v = ? LIMIT ?', 'str*2,num')
+
+
+def test_fingerprint_groups_calls_that_differ_only_in_literals():
+    first = fingerprint("SELECT * FROM notes WHERE id IN (1, 2) AND user_id = 3")
+    second = fingerprint(b"SELECT  *\nFROM notes WHERE id IN (10,20,30,40) AND user_id = 99")
+
+    assert first[0] == second[0]
+    assert (first[1], second[1]) == ('num*3', 'num*5')
@@ -0,0 +1,47 @@
+from datetime import date
+
+
+def review_cards(client, deck_id, count=2):
+    session = client.get(f'/api/study/session/{deck_id}').get_json()
+    reviews = [{'flashcard_id': card_id, 'rating': 'good', 'time_spent_ms': 1500}
+               for card_id in session['card_ids'][:count]]
+    response = client.post('/api/study/reviews', json={'reviews': reviews})
+    assert response.status_code == 200, response.get_data(as_text=True)
+
+
+def test_performance_heatmap_all_time(client, deck):
+    review_cards(client, deck)
+
+    response = client.get('/api/stats/performance?range=all&mode=heatmap')
+
+    assert response.status_code == 200, response.get_data(as_text=True)
+    body = response.get_json()
+    today = date.today().isoformat()
+    assert body['period'] == {'range': 'all', 'start': today, 'end': today}
+    assert body['heatmap'] == [{'date': today, 'count': 2, 'time_spent_seconds': 3}]
+
+
+def test_performance_all_time_without_reviews(client):
+    response = client.get('/api/stats/performance?range=all')
+
+    assert response.status_code == 200, response.get_data(as_text=True)
+    assert response.get_json()['totals']['reviews'] == 0
+
+
+def test_time_spent_carries_sub_second_reviews(flask_app, client, deck):
+    import app as neuroflash
+
+    card_ids = client.get(f'/api/study/session/{deck}').get_json()['card_ids']
+    for card_id in card_ids[:3]:
+        response = client.post('/api/study/reviews', json={'reviews': [
+            {'flashcard_id': card_id, 'rating': 'good', 'time_spent_ms': 600}]})
+        assert response.status_code == 200, response.get_data(as_text=True)
+
+    with flask_app.app_context():
+        cur = neuroflash.mysql.connection.cursor()
+        cur.execute("SELECT user_id FROM flashcards f JOIN notes n ON f.note_id = n.id WHERE f.id = %s", (card_ids[0],))
+        user_id = cur.fetchone()['user_id']
+        cur.execute("SELECT total_time_spent_seconds, total_time_spent_ms FROM user_stats WHERE user_id = %s", (user_id,))
+        stats = cur.fetchone()
+        cur.close()
+    assert (stats['total_time_spent_seconds'], stats['total_time_spent_ms']) == (1, 1800)
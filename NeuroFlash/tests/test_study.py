@@ -0,0 +1,150 @@
+from datetime import date, timedelta
+
+
+def open_session(client, deck_id):
+    response = client.get(f'/api/study/session/{deck_id}')
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return response.get_json()
+
+
+def test_card_reviewed_on_another_worker_is_not_served(flask_app, client, deck):
+    import app as neuroflash
+
+    card_ids = open_session(client, deck)['card_ids']
+    assert neuroflash.due_queue.has_deck(deck)
+
+    # Another worker reviews the first card: the database moves on, this
+    # process's due queue does not.
+    reviewed_id = card_ids[0]
+    with flask_app.app_context():
+        cur = neuroflash.mysql.connection.cursor()
+        cur.execute("UPDATE flashcards SET card_type = 'review', due_date = %s WHERE id = %s",
+                    (date.today() + timedelta(days=3), reviewed_id))
+        neuroflash.mysql.connection.commit()
+        cur.close()
+
+    served = [card['flashcard_id'] for card in open_session(client, deck)['cards']]
+    assert reviewed_id not in served
+    assert not neuroflash.due_queue.has_deck(deck)
+
+    assert reviewed_id not in open_session(client, deck)['card_ids']
+
+
+def test_batch_review_records_every_review(client, deck):
+    card_ids = open_session(client, deck)['card_ids']
+    reviews = [
+        {'flashcard_id': card_ids[0], 'rating': 'good', 'time_spent_ms': 1200},
+        {'flashcard_id': card_ids[1], 'rating': 'easy', 'time_spent_ms': 800},
+        {'flashcard_id': card_ids[0], 'rating': 'hard', 'time_spent_ms': 500},
+    ]
+
+    response = client.post('/api/study/reviews', json={'reviews': reviews})
+
+    assert response.status_code == 200, response.get_data(as_text=True)
+    body = response.get_json()
+    assert body['points_earned'] == 200 + 500 + 50
+    assert [result['flashcard_id'] for result in body['results']] == [card_ids[0], card_ids[1], card_ids[0]]
+    assert body['rejected'] == []
+    stats = client.get('/api/stats/performance?range=30').get_json()['totals']
+    assert stats['reviews'] == 3
+    assert card_ids[1] not in open_session(client, deck)['card_ids']
+
+
+def test_batch_review_reports_unknown_cards(client, deck):
+    card_ids = open_session(client, deck)['card_ids']
+
+    response = client.post('/api/study/reviews', json={'reviews': [
+        {'flashcard_id': card_ids[0], 'rating': 'good'},
+        {'flashcard_id': 10 ** 9, 'rating': 'good'},
+    ]})
+
+    assert response.status_code == 200, response.get_data(as_text=True)
+    body = response.get_json()
+    assert [result['flashcard_id'] for result in body['results']] == [card_ids[0]]
+    assert [(item['index'], item['flashcard_id']) for item in body['rejected']] == [(1, 10 ** 9)]
+
+
+def test_batch_review_with_only_unknown_cards(client, deck):
+    response = client.post('/api/study/reviews', json={'reviews': [{'flashcard_id': 10 ** 9, 'rating': 'good'}]})
+
+    assert response.status_code == 404
+
+
+def test_batch_review_validation(client, deck):
+    import app as neuroflash
+
+    card_id = open_session(client, deck)['card_ids'][0]
+    invalid = [
+        {'reviews': []},
+        {'reviews': [{'flashcard_id': card_id, 'rating': 'perfect'}]},
+        {'reviews': [{'flashcard_id': 'abc', 'rating': 'good'}]},
+        {'reviews': [{'flashcard_id': card_id, 'rating': 'good', 'answered_at': 'yesterday'}]},
+        {'reviews': [{'flashcard_id': card_id, 'rating': 'good'}] * (neuroflash.MAX_REVIEW_BATCH_SIZE + 1)},
+    ]
+    for payload in invalid:
+        response = client.post('/api/study/reviews', json=payload)
+        assert response.status_code == 400, payload
+
+    stats = client.get('/api/stats/dashboard').get_json()['stats']
+    assert (stats['points'], stats['new_cards']) == (0, 5)
+
+
+def test_overlapping_batches_for_one_card_both_apply(flask_app, client, deck, monkeypatch):
+    import threading
+
+    import app as neuroflash
+
+    card_id = open_session(client, deck)['card_ids'][0]
+    other = flask_app.test_client()
+    cookie_name = flask_app.config['SESSION_COOKIE_NAME']
+    other.set_cookie(cookie_name, client.get_cookie(cookie_name).value)
+
+    # Hold each batch between reading the card and writing it back, long
+    # enough for the other one to read the same state if nothing stops it.
+    barrier = threading.Barrier(2)
+    get_user_settings = neuroflash.get_user_settings
+
+    def held_get_user_settings(cur, user_id):
+        try:
+            barrier.wait(timeout=1)
+        except threading.BrokenBarrierError:
+            pass
+        return get_user_settings(cur, user_id)
+
+    monkeypatch.setattr(neuroflash, 'get_user_settings', held_get_user_settings)
+    statuses = []
+
+    def submit(test_client):
+        response = test_client.post('/api/study/reviews', json={'reviews': [{'flashcard_id': card_id, 'rating': 'easy'}]})
+        statuses.append(response.status_code)
+
+    threads = [threading.Thread(target=submit, args=(c,)) for c in (client, other)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=30)
+
+    assert statuses == [200, 200]
+    with flask_app.app_context():
+        cur = neuroflash.mysql.connection.cursor()
+        cur.execute("SELECT reps FROM flashcards WHERE id = %s", (card_id,))
+        assert cur.fetchone()['reps'] == 2
+        cur.close()
+    stats = client.get('/api/stats/dashboard').get_json()['stats']
+    assert (stats['points'], stats['new_cards'], stats['total_cards']) == (1000, 4, 5)
+
+
+def test_review_state_update_never_inserts(flask_app, client, deck):
+    import app as neuroflash
+
+    with flask_app.app_context():
+        cur = neuroflash.mysql.connection.cursor()
+        neuroflash.update_flashcard_states(cur, [{
+            'id': 10 ** 9, 'card_type': 'review', 'due_date': date.today(), 'intervals': 3,
+            'ease_factor': 2.5, 'reps': 1, 'lapses': 0, 'last_reviewed': None,
+        }])
+        assert cur.rowcount == 0
+        cur.execute("SELECT COUNT(*) AS cards FROM flashcards WHERE id = %s", (10 ** 9,))
+        assert cur.fetchone()['cards'] == 0
+        neuroflash.mysql.connection.rollback()
+        cur.close()